@@ -0,0 +1,24 @@
+import gzip
+import json
+import os
+from typing import Any, Dict
+
+import pytest
+
+from tests.conftest import mock_server  # noqa: F401
+from tests.mock_server import make_graph_json
+
+RECORDED_GRAPH_PATH = os.path.join(
+    os.path.dirname(__file__), "fixtures", "large_graph.json.gz"
+)
+
+
+@pytest.fixture(scope="session")
+def large_graph_json() -> Dict[str, Any]:
+    """A large graph_json payload: the recorded fixture if there is one, or else
+    a synthetic graph of a similar shape (see record_graph.py)."""
+    if os.path.exists(RECORDED_GRAPH_PATH):
+        with gzip.open(RECORDED_GRAPH_PATH, "rt") as f:
+            recorded: Dict[str, Any] = json.load(f)
+            return recorded
+    return make_graph_json("f" * 40, num_nodes=2000, edges_per_node=8)
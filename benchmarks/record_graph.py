@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Record the graph_json of a paper into the fixture used by the benchmarks."""
+
+import argparse
+import asyncio
+import dataclasses
+import gzip
+import json
+import sys
+
+from benchmarks.conftest import RECORDED_GRAPH_PATH
+from connectedpapers import ConnectedPapersClient
+from connectedpapers.consts import ACCESS_TOKEN
+
+
+async def record(paper_id: str, api_key: str) -> int:
+    async with ConnectedPapersClient(access_token=api_key) as client:
+        response = await client.get_graph_async(paper_id)
+    if response.graph_json is None:
+        print(f"No graph available, status: {response.status.value}")
+        return 1
+    # The fields of the graph classes are named after the keys of graph_json
+    graph_json = dataclasses.asdict(response.graph_json)
+    with gzip.open(RECORDED_GRAPH_PATH, "wt") as f:
+        json.dump(graph_json, f)
+    print(f"Recorded {len(graph_json['nodes'])} papers")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("paper_id", help="The paper ID (Semantic Scholar SHA)")
+    parser.add_argument("--api-key", default=ACCESS_TOKEN)
+    args = parser.parse_args()
+    return asyncio.run(record(args.paper_id, args.api_key))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
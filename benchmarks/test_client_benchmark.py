@@ -0,0 +1,111 @@
+import gc
+import json
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar, cast
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from connectedpapers import ConnectedPapersClient
+from connectedpapers.connected_papers_client import (
+    GraphResponse,
+    GraphResponseStatuses,
+    decode_graph_response,
+)
+from connectedpapers.polling import FixedPolling
+from tests.mock_server import MockConnectedPapersServer, make_build_script
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+BATCH_IDS = [f"{i:040x}" for i in range(200)]
+
+T = TypeVar("T")
+
+
+def pedantic(
+    benchmark: BenchmarkFixture,
+    function: Callable[..., T],
+    *args: Any,
+    rounds: int,
+    setup: Optional[Callable[[], None]] = None,
+) -> T:
+    """Run a benchmark for a fixed number of rounds, one call per round."""
+    result = benchmark.pedantic(  # type: ignore[no-untyped-call]
+        function, args, setup=setup, rounds=rounds, iterations=1
+    )
+    return cast(T, result)
+
+
+@pytest.fixture
+def client(mock_server: MockConnectedPapersServer) -> Iterator[ConnectedPapersClient]:
+    with ConnectedPapersClient(
+        server_addr=mock_server.url, polling=FixedPolling(0.01)
+    ) as client:
+        yield client
+
+
+def test_single_graph_latency(
+    benchmark: BenchmarkFixture, client: ConnectedPapersClient
+) -> None:
+    response = benchmark(client.get_graph_sync, PAPER_ID)
+    assert response.status == GraphResponseStatuses.FRESH_GRAPH
+
+
+def test_graph_build_latency(
+    benchmark: BenchmarkFixture,
+    mock_server: MockConnectedPapersServer,
+    client: ConnectedPapersClient,
+) -> None:
+    # A build goes through QUEUED and IN_PROGRESS checks before the graph
+    def script() -> None:
+        mock_server.scripts[PAPER_ID] = make_build_script(PAPER_ID)
+
+    response = pedantic(
+        benchmark, client.get_graph_sync, PAPER_ID, rounds=10, setup=script
+    )
+    assert response.status == GraphResponseStatuses.FRESH_GRAPH
+
+
+def test_batch_throughput(
+    benchmark: BenchmarkFixture,
+    mock_server: MockConnectedPapersServer,
+    client: ConnectedPapersClient,
+) -> None:
+    mock_server.latency = 0.005
+    responses = pedantic(benchmark, client.get_graphs_sync, BATCH_IDS, rounds=3)
+    assert len(responses) == len(BATCH_IDS)
+    benchmark.extra_info["graphs_per_round"] = len(BATCH_IDS)
+
+
+def test_large_graph_fetch(
+    benchmark: BenchmarkFixture, mock_server: MockConnectedPapersServer
+) -> None:
+    mock_server.graph_nodes = 2000
+    mock_server.edges_per_node = 8
+    with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        response = pedantic(benchmark, client.get_graph_sync, PAPER_ID, rounds=5)
+    assert response.graph_json is not None
+    assert len(response.graph_json.nodes) == 2000
+
+
+def test_large_graph_memory(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    body = json.dumps(
+        {"status": "FRESH_GRAPH", "graph_json": large_graph_json}
+    ).encode()
+    responses: List[GraphResponse] = []
+
+    def decode() -> None:
+        gc.collect()
+        tracemalloc.start()
+        responses.append(decode_graph_response(body))
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        benchmark.extra_info["retained_bytes"] = retained
+        benchmark.extra_info["peak_bytes"] = peak
+        benchmark.extra_info["body_bytes"] = len(body)
+
+    # Decoding under tracemalloc is slow, so its time is only indicative
+    pedantic(benchmark, decode, rounds=1)
+    assert responses[0].graph_json is not None
+    assert benchmark.extra_info["retained_bytes"] > 0
@@ -0,0 +1,42 @@
+import json
+from typing import Any, Dict
+
+import dacite
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from connectedpapers.connected_papers_client import decode_graph_response
+from connectedpapers.decoding import decode_graph
+from connectedpapers.graph import Graph
+
+
+def test_decode_with_dacite(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    benchmark(dacite.from_dict, data_class=Graph, data=large_graph_json)
+
+
+def test_decode_compiled(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    benchmark(decode_graph, large_graph_json)
+
+
+def test_parse_and_decode_response(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    body = json.dumps({"status": "FRESH_GRAPH", "graph_json": large_graph_json})
+    benchmark(decode_graph_response, body.encode())
+
+
+def test_decode_lazy(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    benchmark(decode_graph, large_graph_json, lazy=True)
+
+
+def test_decode_projection(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    benchmark(
+        decode_graph, large_graph_json, paper_fields=["id", "title", "year", "pos"]
+    )
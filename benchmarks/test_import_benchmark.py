@@ -0,0 +1,40 @@
+import subprocess
+import sys
+import time
+from typing import List
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+ROUNDS = 5
+
+
+def run(code: str) -> float:
+    """Run code in a new interpreter, returning the time it took in seconds."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True)
+    return time.perf_counter() - start
+
+
+@pytest.fixture(scope="module")
+def aiohttp_import_time() -> float:
+    """The baseline the lazy imports avoid."""
+    return min(run("import aiohttp") for _ in range(ROUNDS))
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import connectedpapers.cache, connectedpapers.serialization",
+        "from connectedpapers import ConnectedPapersClient",
+    ],
+)
+def test_cold_import(
+    benchmark: BenchmarkFixture, aiohttp_import_time: float, code: str
+) -> None:
+    times: List[float] = []
+    benchmark.pedantic(  # type: ignore[no-untyped-call]
+        lambda: times.append(run(code)), rounds=ROUNDS, iterations=1
+    )
+    # Importing the package, even the client, doesn't import aiohttp
+    assert min(times) < aiohttp_import_time
@@ -0,0 +1,30 @@
+from typing import Any, Dict
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from connectedpapers.decoding import decode_graph
+from connectedpapers.lineage import LineageIndex
+
+
+def test_build_lineage_index(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    graph = decode_graph(large_graph_json)
+    benchmark(LineageIndex, graph)
+
+
+def test_lowest_common_ancestor(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    graph = decode_graph(large_graph_json)
+    index = LineageIndex(graph)
+    ids = list(graph.nodes)
+    benchmark(index.lowest_common_ancestor, ids[-1], ids[len(ids) // 2])
+
+
+def test_within_distance(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    index = LineageIndex(decode_graph(large_graph_json))
+    found = benchmark(index.within_distance, 1.2)
+    benchmark.extra_info["papers"] = len(found)
@@ -0,0 +1,42 @@
+from typing import Any, Dict
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from connectedpapers.decoding import decode_graph
+from connectedpapers.search import PaperIndex
+
+
+def make_index(large_graph_json: Dict[str, Any]) -> PaperIndex:
+    index = PaperIndex()
+    index.add(decode_graph(large_graph_json))
+    return index
+
+
+def test_build_paper_index(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    graph = decode_graph(large_graph_json)
+
+    def build() -> PaperIndex:
+        index = PaperIndex()
+        index.add(graph)
+        return index
+
+    benchmark(build)
+
+
+def test_conjunctive_query(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    index = make_index(large_graph_json)
+    found = benchmark(
+        index.search, "paper", venue="Venue 3", min_year=2000, open_access=True
+    )
+    benchmark.extra_info["papers"] = len(found)
+
+
+def test_keyword_query(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    index = make_index(large_graph_json)
+    benchmark(index.search, "number 1234")
@@ -0,0 +1,47 @@
+import json
+from typing import Any, Dict
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from connectedpapers.decoding import decode_graph
+from connectedpapers.graph import Graph
+from connectedpapers.serialization import JSON, MSGPACK, ZLIB, ZSTD
+
+FORMATS = [(JSON, ZLIB), (MSGPACK, ZLIB), (MSGPACK, ZSTD)]
+
+
+@pytest.fixture(params=FORMATS, ids=lambda fmt: "-".join(fmt))
+def serialization_format(request: pytest.FixtureRequest) -> Any:
+    codec, compression = request.param
+    if codec == MSGPACK:
+        pytest.importorskip("msgpack")
+    if compression == ZSTD:
+        pytest.importorskip("zstandard")
+    return request.param
+
+
+def test_json_dumps(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    body = benchmark(json.dumps, large_graph_json)
+    benchmark.extra_info["bytes"] = len(body)
+
+
+def test_to_bytes(
+    benchmark: BenchmarkFixture,
+    large_graph_json: Dict[str, Any],
+    serialization_format: Any,
+) -> None:
+    graph = decode_graph(large_graph_json)
+    data = benchmark(graph.to_bytes, *serialization_format)
+    benchmark.extra_info["bytes"] = len(data)
+
+
+def test_from_bytes(
+    benchmark: BenchmarkFixture,
+    large_graph_json: Dict[str, Any],
+    serialization_format: Any,
+) -> None:
+    data = decode_graph(large_graph_json).to_bytes(*serialization_format)
+    benchmark(Graph.from_bytes, data)
@@ -0,0 +1,38 @@
+from typing import Any, Dict
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from connectedpapers.decoding import decode_graph
+from connectedpapers.spatial import SpatialIndex
+
+
+def make_index(large_graph_json: Dict[str, Any]) -> SpatialIndex:
+    return SpatialIndex.from_graph(decode_graph(large_graph_json))
+
+
+def test_build_spatial_index(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    graph = decode_graph(large_graph_json)
+    benchmark(SpatialIndex.from_graph, graph)
+
+
+def test_bounding_box_query(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    index = make_index(large_graph_json)
+    # A tile of a tenth of the layout's width and height, in its middle
+    width, height = index.max_x - index.min_x, index.max_y - index.min_y
+    min_x, min_y = index.min_x + 0.45 * width, index.min_y + 0.45 * height
+    found = benchmark(
+        index.within, min_x, min_y, min_x + 0.1 * width, min_y + 0.1 * height
+    )
+    benchmark.extra_info["papers"] = len(found)
+
+
+def test_nearest_query(
+    benchmark: BenchmarkFixture, large_graph_json: Dict[str, Any]
+) -> None:
+    index = make_index(large_graph_json)
+    x, y = (index.min_x + index.max_x) / 2, (index.min_y + index.max_y) / 2
+    benchmark(index.nearest, x, y, 10)
@@ -1,3 +1,33 @@
-from .connected_papers_client import ConnectedPapersClient  # noqa: F401
+"""
+The client is imported on first access (PEP 562), so that importing the
+package, or only its graph, cache and serialization modules, doesn't import
+the network stack.
+"""
 
-__all__ = ["ConnectedPapersClient"]
+import importlib
+import typing
+from typing import Any, List
+
+if typing.TYPE_CHECKING:
+    from .cache import GraphCache  # noqa: F401
+    from .connected_papers_client import ConnectedPapersClient  # noqa: F401
+
+__all__ = ["ConnectedPapersClient", "GraphCache"]
+
+_LAZY_ATTRIBUTES = {
+    "ConnectedPapersClient": ".connected_papers_client",
+    "GraphCache": ".cache",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted([*globals(), *_LAZY_ATTRIBUTES])
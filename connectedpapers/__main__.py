@@ -0,0 +1,21 @@
+import sys
+from typing import List, Optional
+
+COMMANDS = ("harvest",)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(
+            f"Usage: python -m connectedpapers {{{','.join(COMMANDS)}}} ...",
+            file=sys.stderr,
+        )
+        return 2
+    from .harvest import main as harvest_main
+
+    return harvest_main(argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
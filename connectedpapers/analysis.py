@@ -0,0 +1,295 @@
+"""
+Graph analytics over a CSR (compressed sparse row) adjacency index.
+
+graph_index() builds a GraphIndex for a graph on first use and caches it for
+the lifetime of the graph, so graphs should not be mutated after indexing.
+Edges are treated as undirected, and their weights as similarities.
+
+Centrality measures are vectorized with numpy when it is installed (the numpy
+extra), and computed in pure Python otherwise.
+"""
+import heapq
+import importlib
+import math
+import weakref
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, cast
+
+from .graph import Edge, Graph, PaperID
+
+try:
+    _numpy: Any = importlib.import_module("numpy")
+except ImportError:
+    _numpy = None
+
+CostFunction = Callable[[float], float]
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1.0e-6
+PAGERANK_MAX_ITERATIONS = 100
+
+
+def similarity_distance(weight: float) -> float:
+    """The default edge length: more similar papers are closer."""
+    return 1.0 / weight if weight > 0 else math.inf
+
+
+class GraphIndex:
+    """
+    An adjacency index of a graph. The neighbors of node i are
+    indices[indptr[i]:indptr[i + 1]], with edge weights at the same positions
+    in weights. Parallel edges are merged, keeping the highest weight.
+    """
+
+    def __init__(self, graph: Graph) -> None:
+        self.start_id = graph.start_id
+        self.path_lengths = graph.path_lengths
+        self.node_ids: List[PaperID] = list(graph.nodes)
+        self.node_index: Dict[PaperID, int] = {
+            paper_id: index for index, paper_id in enumerate(self.node_ids)
+        }
+        pairs = self._edge_pairs(graph.edges)
+        n = len(self.node_ids)
+        degrees = [0] * n
+        for source, target in pairs:
+            degrees[source] += 1
+            degrees[target] += 1
+        self.indptr: "array[int]" = array("l", [0]) * (n + 1)
+        for i in range(n):
+            self.indptr[i + 1] = self.indptr[i] + degrees[i]
+        self.indices: "array[int]" = array("i", [0]) * self.indptr[n]
+        self.weights: "array[float]" = array("d", [0.0]) * self.indptr[n]
+        fill = array("l", self.indptr[:n])
+        for (source, target), weight in pairs.items():
+            for a, b in ((source, target), (target, source)):
+                self.indices[fill[a]] = b
+                self.weights[fill[a]] = weight
+                fill[a] += 1
+
+    def _edge_pairs(self, edges: Iterable[Edge]) -> Dict[Tuple[int, int], float]:
+        pairs: Dict[Tuple[int, int], float] = {}
+        for source_id, target_id, weight in edges:
+            source = self._index_of(cast(PaperID, source_id))
+            target = self._index_of(cast(PaperID, target_id))
+            if source == target:
+                continue
+            key = (source, target) if source < target else (target, source)
+            pairs[key] = max(pairs.get(key, -math.inf), cast(float, weight))
+        return pairs
+
+    def _index_of(self, paper_id: PaperID) -> int:
+        index = self.node_index.get(paper_id)
+        if index is None:  # An edge endpoint that isn't in graph.nodes
+            index = self.node_index[paper_id] = len(self.node_ids)
+            self.node_ids.append(paper_id)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def __contains__(self, paper_id: object) -> bool:
+        return paper_id in self.node_index
+
+    def neighbors(self, paper_id: PaperID) -> List[Tuple[PaperID, float]]:
+        """(neighbor ID, edge weight) pairs of a paper, in O(degree)."""
+        i = self.node_index[paper_id]
+        node_ids = self.node_ids
+        return [
+            (node_ids[self.indices[k]], self.weights[k])
+            for k in range(self.indptr[i], self.indptr[i + 1])
+        ]
+
+    def degree(self, paper_id: PaperID) -> int:
+        i = self.node_index[paper_id]
+        return int(self.indptr[i + 1] - self.indptr[i])
+
+    def top_similar(
+        self, paper_id: PaperID, k: int = 10
+    ) -> List[Tuple[PaperID, float]]:
+        """The k neighbors of a paper with the highest edge weights."""
+        return heapq.nlargest(k, self.neighbors(paper_id), key=lambda item: item[1])
+
+    def _dijkstra(
+        self, source: PaperID, cost: CostFunction
+    ) -> Tuple[List[float], List[int]]:
+        n = len(self.node_ids)
+        distances = [math.inf] * n
+        previous = [-1] * n
+        start = self.node_index[source]
+        distances[start] = 0.0
+        heap = [(0.0, start)]
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        while heap:
+            distance, i = heapq.heappop(heap)
+            if distance > distances[i]:
+                continue
+            for k in range(indptr[i], indptr[i + 1]):
+                j = indices[k]
+                candidate = distance + cost(weights[k])
+                if candidate < distances[j]:
+                    distances[j] = candidate
+                    previous[j] = i
+                    heapq.heappush(heap, (candidate, j))
+        return distances, previous
+
+    def shortest_path_lengths(
+        self, source: Optional[PaperID] = None, cost: CostFunction = similarity_distance
+    ) -> Dict[PaperID, float]:
+        """
+        Weighted shortest path lengths from source (the graph's start paper by
+        default) to every reachable paper.
+
+        Args:
+            source: The paper to measure distances from
+            cost: Maps an edge weight to the (non-negative) length of the edge;
+                  1 / weight by default
+        """
+        distances, _ = self._dijkstra(source or self.start_id, cost)
+        return {
+            paper_id: distance
+            for paper_id, distance in zip(self.node_ids, distances)
+            if distance != math.inf
+        }
+
+    def shortest_path(
+        self, source: PaperID, target: PaperID, cost: CostFunction = similarity_distance
+    ) -> Optional[List[PaperID]]:
+        """The papers on a weighted shortest path from source to target, if any."""
+        distances, previous = self._dijkstra(source, cost)
+        i = self.node_index[target]
+        if distances[i] == math.inf:
+            return None
+        path = [i]
+        while previous[path[-1]] != -1:
+            path.append(previous[path[-1]])
+        return [self.node_ids[j] for j in reversed(path)]
+
+    def compare_path_lengths(
+        self, cost: CostFunction, tolerance: float = 1.0e-6
+    ) -> Dict[PaperID, Tuple[float, float]]:
+        """
+        Cross-check the server-provided path_lengths against shortest paths from
+        the start paper computed with cost. The API doesn't define how its path
+        lengths relate to edge weights, so there is no default cost.
+
+        Returns:
+            {paper_id: (computed length, server length)} for every paper whose
+            lengths differ by more than tolerance (computed is inf if unreachable)
+        """
+        computed = self.shortest_path_lengths(self.start_id, cost)
+        mismatches: Dict[PaperID, Tuple[float, float]] = {}
+        for paper_id, server_length in self.path_lengths.items():
+            length = computed.get(paper_id, math.inf)
+            if not abs(length - server_length) <= tolerance:
+                mismatches[paper_id] = (length, server_length)
+        return mismatches
+
+    def degree_centrality(self, weighted: bool = False) -> Dict[PaperID, float]:
+        """Degree (or total edge weight) of every paper, normalized by n - 1."""
+        n = len(self.node_ids)
+        scale = 1.0 / (n - 1) if n > 1 else 1.0
+        if _numpy is not None:
+            degrees = (
+                self._numpy_row_sums(self._numpy_column(self.weights))
+                if weighted
+                else _numpy.diff(self._numpy_column(self.indptr))
+            )
+            return dict(zip(self.node_ids, (scale * degrees).tolist()))
+        if weighted:
+            degrees = self._row_sums(self.weights)
+        else:
+            degrees = [end - start for start, end in zip(self.indptr, self.indptr[1:])]
+        return {
+            paper_id: scale * degree for paper_id, degree in zip(self.node_ids, degrees)
+        }
+
+    def _row_sums(self, values: "array[float]") -> List[float]:
+        """Sum values over the edges of each node."""
+        indptr = self.indptr
+        return [math.fsum(values[start:end]) for start, end in zip(indptr, indptr[1:])]
+
+    @staticmethod
+    def _numpy_column(values: "array[Any]") -> Any:
+        """A numpy view of an index array, without copying it."""
+        return _numpy.frombuffer(values, dtype=values.typecode)
+
+    def _numpy_row_sums(self, values: Any) -> Any:
+        rows = _numpy.repeat(
+            _numpy.arange(len(self.node_ids)),
+            _numpy.diff(self._numpy_column(self.indptr)),
+        )
+        return _numpy.bincount(rows, weights=values, minlength=len(self.node_ids))
+
+    def pagerank(
+        self,
+        damping: float = PAGERANK_DAMPING,
+        weighted: bool = True,
+        tolerance: float = PAGERANK_TOLERANCE,
+        max_iterations: int = PAGERANK_MAX_ITERATIONS,
+    ) -> Dict[PaperID, float]:
+        """PageRank of every paper by power iteration; the ranks sum to 1."""
+        n = len(self.node_ids)
+        if n == 0:
+            return {}
+        if _numpy is not None:
+            return self._numpy_pagerank(damping, weighted, tolerance, max_iterations)
+        indptr, indices = self.indptr, self.indices
+        weights = self.weights if weighted else array("d", [1.0]) * len(indices)
+        out_weight = self._row_sums(weights)
+        rank = [1.0 / n] * n
+        for _ in range(max_iterations):
+            dangling = sum(rank[i] for i in range(n) if out_weight[i] == 0)
+            base = (1.0 - damping + damping * dangling) / n
+            new_rank = [base] * n
+            for i in range(n):
+                if out_weight[i] == 0:
+                    continue
+                share = damping * rank[i] / out_weight[i]
+                for k in range(indptr[i], indptr[i + 1]):
+                    new_rank[indices[k]] += share * weights[k]
+            error = sum(abs(a - b) for a, b in zip(new_rank, rank))
+            rank = new_rank
+            if error < n * tolerance:
+                break
+        return dict(zip(self.node_ids, rank))
+
+    def _numpy_pagerank(
+        self, damping: float, weighted: bool, tolerance: float, max_iterations: int
+    ) -> Dict[PaperID, float]:
+        """pagerank() as a sparse matrix-vector product per iteration."""
+        np = _numpy
+        n = len(self.node_ids)
+        indices = self._numpy_column(self.indices)
+        weights = (
+            self._numpy_column(self.weights)
+            if weighted
+            else np.ones(len(indices), dtype=np.float64)
+        )
+        rows = np.repeat(np.arange(n), np.diff(self._numpy_column(self.indptr)))
+        out_weight = np.bincount(rows, weights=weights, minlength=n)
+        dangling = out_weight == 0
+        # The share of a node's rank passed along each of its edges
+        edge_share = damping * weights / np.where(dangling, 1.0, out_weight)[rows]
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iterations):
+            base = (1.0 - damping + damping * rank[dangling].sum()) / n
+            new_rank = base + np.bincount(
+                indices, weights=edge_share * rank[rows], minlength=n
+            )
+            error = np.abs(new_rank - rank).sum()
+            rank = new_rank
+            if error < n * tolerance:
+                break
+        return dict(zip(self.node_ids, rank.tolist()))
+
+
+_indexes: Dict[int, GraphIndex] = {}
+
+
+def graph_index(graph: Graph) -> GraphIndex:
+    """Return the index of a graph, building it on first use."""
+    index = _indexes.get(id(graph))
+    if index is None:
+        index = _indexes[id(graph)] = GraphIndex(graph)
+        weakref.finalize(graph, _indexes.pop, id(graph), None)
+    return index
@@ -0,0 +1,243 @@
+import dataclasses
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from . import serialization
+from .graph import Graph, PaperID
+
+# The server serves graphs older than a month as OLD_GRAPH
+GRAPH_FRESHNESS_SECONDS = 30 * 24 * 60 * 60
+DEFAULT_CACHE_TTL_SECONDS = 90 * 24 * 60 * 60
+DEFAULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_MEMORY_CACHE_SIZE = 128
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS graphs (
+    paper_id TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    fresh INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS graphs_accessed_at ON graphs (accessed_at);
+"""
+
+
+@dataclasses.dataclass
+class CachedGraph:
+    """A graph read back from the cache"""
+
+    graph: Graph
+    fresh: bool  # Whether the server would still serve this graph as FRESH_GRAPH
+    fetched_at: float
+
+
+def encode_graph(graph: Graph) -> bytes:
+    return serialization.to_bytes(graph)
+
+
+def decode_graph(data: bytes) -> Graph:
+    return serialization.from_bytes(data, Graph)
+
+
+class GraphCache:
+    """
+    A persistent graph cache, stored in the binary format of serialization.py
+    in an SQLite file.
+
+    The database runs in WAL mode, so any number of threads and processes can
+    read it while one of them writes. Entries expire `ttl` seconds after they
+    were fetched, and least recently used entries are evicted once the total
+    size of the stored graphs exceeds `max_bytes`.
+
+    Freshness follows the server: a graph received as FRESH_GRAPH is served as
+    fresh for `fresh_ttl` seconds, and as an OLD_GRAPH after that. A graph
+    received as OLD_GRAPH is never fresh.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = DEFAULT_CACHE_TTL_SECONDS,
+        fresh_ttl: float = GRAPH_FRESHNESS_SECONDS,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.fresh_ttl = fresh_ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """SQLite connections can't be shared between threads, so keep one per thread."""
+        connection: Optional[sqlite3.Connection] = getattr(
+            self._local, "connection", None
+        )
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.connection = connection
+        return connection
+
+    def get(self, paper_id: PaperID, fresh_only: bool = False) -> Optional[CachedGraph]:
+        """
+        Args:
+            paper_id: The paper ID to look up
+            fresh_only: Only return the graph if it is still fresh
+
+        Returns:
+            The cached graph, or None if it is missing, expired or not fresh enough
+        """
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT data, fresh, fetched_at FROM graphs WHERE paper_id = ?",
+            (paper_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        data, fresh, fetched_at = row
+        now = time.time()
+        if now - fetched_at > self.ttl:
+            connection.execute("DELETE FROM graphs WHERE paper_id = ?", (paper_id,))
+            return None
+        is_fresh = bool(fresh) and now - fetched_at <= self.fresh_ttl
+        if fresh_only and not is_fresh:
+            return None
+        connection.execute(
+            "UPDATE graphs SET accessed_at = ? WHERE paper_id = ?", (now, paper_id)
+        )
+        return CachedGraph(
+            graph=decode_graph(data), fresh=is_fresh, fetched_at=fetched_at
+        )
+
+    def put(
+        self,
+        paper_id: PaperID,
+        graph: Graph,
+        fresh: bool,
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        """Store a graph, evicting expired and least recently used graphs as needed."""
+        data = encode_graph(graph)
+        now = time.time()
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO graphs VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                paper_id,
+                data,
+                len(data),
+                int(fresh),
+                now if fetched_at is None else fetched_at,
+                now,
+            ),
+        )
+        self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        connection = self._connection()
+        connection.execute("DELETE FROM graphs WHERE fetched_at < ?", (now - self.ttl,))
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        rows = connection.execute(
+            "SELECT paper_id, size FROM graphs ORDER BY accessed_at"
+        ).fetchall()
+        evicted = []
+        for paper_id, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((paper_id,))
+            total -= size
+        connection.executemany("DELETE FROM graphs WHERE paper_id = ?", evicted)
+
+    def delete(self, paper_id: PaperID) -> None:
+        self._connection().execute("DELETE FROM graphs WHERE paper_id = ?", (paper_id,))
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM graphs")
+
+    def total_bytes(self) -> int:
+        row = self._connection().execute("SELECT COALESCE(SUM(size), 0) FROM graphs")
+        return int(row.fetchone()[0])
+
+    def __contains__(self, paper_id: object) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM graphs WHERE paper_id = ?", (paper_id,)
+        )
+        return row.fetchone() is not None
+
+    def __len__(self) -> int:
+        return int(
+            self._connection().execute("SELECT COUNT(*) FROM graphs").fetchone()[0]
+        )
+
+
+class MemoryGraphCache:
+    """
+    A bounded in-process LRU of recently fetched graphs, with the same
+    freshness rules as GraphCache. Cached Graph objects are shared between
+    callers and should not be mutated.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MEMORY_CACHE_SIZE,
+        fresh_ttl: float = GRAPH_FRESHNESS_SECONDS,
+    ) -> None:
+        self.max_size = max_size
+        self.fresh_ttl = fresh_ttl
+        self._entries: "OrderedDict[PaperID, Tuple[Graph, bool, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, paper_id: PaperID, fresh_only: bool = False) -> Optional[CachedGraph]:
+        with self._lock:
+            entry = self._entries.get(paper_id)
+            if entry is None:
+                return None
+            graph, fresh, fetched_at = entry
+            is_fresh = fresh and time.time() - fetched_at <= self.fresh_ttl
+            if fresh_only and not is_fresh:
+                return None
+            self._entries.move_to_end(paper_id)
+            return CachedGraph(graph=graph, fresh=is_fresh, fetched_at=fetched_at)
+
+    def put(
+        self,
+        paper_id: PaperID,
+        graph: Graph,
+        fresh: bool,
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        with self._lock:
+            self._entries[paper_id] = (
+                graph,
+                fresh,
+                time.time() if fetched_at is None else fetched_at,
+            )
+            self._entries.move_to_end(paper_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, paper_id: PaperID) -> None:
+        with self._lock:
+            self._entries.pop(paper_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, paper_id: object) -> bool:
+        return paper_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
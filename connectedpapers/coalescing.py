@@ -0,0 +1,106 @@
+import asyncio
+import weakref
+from typing import (
+    AsyncGenerator,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+class _Flight(Generic[T]):
+    """
+    One running upstream iterator, broadcasting its items to every subscriber.
+    Items must not be None, which marks the end of the iteration on the queues.
+    """
+
+    def __init__(self, source: AsyncIterator[T], on_done: Callable[[], None]) -> None:
+        self._subscribers: List["asyncio.Queue[Optional[T]]"] = []
+        self._has_latest = False
+        self._latest: Optional[T] = None
+        self._error: Optional[BaseException] = None
+        self._done = False
+        self._on_done = on_done
+        self._task = asyncio.ensure_future(self._run(source))
+
+    async def _run(self, source: AsyncIterator[T]) -> None:
+        try:
+            async for item in source:
+                self._latest = item
+                self._has_latest = True
+                for queue in self._subscribers:
+                    queue.put_nowait(item)
+        except BaseException as e:  # Handed to the subscribers, which re-raise it
+            self._error = e
+        finally:
+            self._done = True
+            self._on_done()
+            for queue in self._subscribers:
+                queue.put_nowait(None)
+
+    async def subscribe(self) -> AsyncGenerator[T, None]:
+        queue: "asyncio.Queue[Optional[T]]" = asyncio.Queue()
+        # Late subscribers start from the most recent update
+        if self._has_latest:
+            queue.put_nowait(self._latest)
+        if self._done:
+            queue.put_nowait(None)
+        self._subscribers.append(queue)
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                yield item
+        finally:
+            self._subscribers.remove(queue)
+            if not self._subscribers and not self._done:
+                # Unregister right away, so that new callers start a new flight
+                # instead of joining one that is being cancelled
+                self._on_done()
+                self._task.cancel()
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesces concurrent identical async iterations: while an iteration for a
+    key is running, later callers with the same key subscribe to it instead of
+    starting their own. Every subscriber receives the latest item at the time
+    it joined, followed by all the items after it, and the upstream iteration
+    is cancelled once all of its subscribers have left.
+
+    Flights are tracked per event loop, as their tasks belong to one.
+    """
+
+    def __init__(self) -> None:
+        self._flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _Flight[T]]]"
+        self._flights = weakref.WeakKeyDictionary()
+
+    def iterate(
+        self, key: Hashable, factory: Callable[[], AsyncIterator[T]]
+    ) -> AsyncGenerator[T, None]:
+        """Subscribe to the running flight for key, starting one with factory if needed."""
+        flights = self._flights.setdefault(asyncio.get_running_loop(), {})
+        flight = flights.get(key)
+        if flight is None:
+
+            def unregister() -> None:
+                if flights.get(key) is new_flight:
+                    del flights[key]
+
+            new_flight = flight = _Flight(factory(), unregister)
+            flights[key] = flight
+        return flight.subscribe()
+
+    def in_flight(self) -> int:
+        """Number of running flights on the current event loop."""
+        return len(self._flights.get(asyncio.get_running_loop(), {}))
@@ -0,0 +1,432 @@
+"""
+Columnar export of graphs, as Apache Arrow tables.
+
+graph_tables() converts a Graph into one table per collection: nodes, edges,
+common_authors, common_citations, common_references and path_lengths. Their
+schemas are fixed (see SCHEMA_VERSION), so tables of different graphs can be
+concatenated, and handed to pandas (Table.to_pandas) or DuckDB as they are.
+
+write_graph() stores the tables of a graph in a directory, as Arrow IPC files
+or Parquet files, and load_graph() opens them again as an ArrowGraph: a
+read-only Graph whose nodes, edges and path lengths are views over the tables.
+Arrow IPC files are memory-mapped, so loading one doesn't copy or parse it, and
+a paper is only decoded when it is accessed.
+
+Requires pyarrow, which is an optional dependency: pip install
+connectedpapers-py[arrow].
+"""
+
+import importlib
+import os
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+    overload,
+)
+
+from .decoding import decoder_for
+from .graph import (
+    BasePaper,
+    CommonAuthor,
+    CommonCitation,
+    CommonReference,
+    Edge,
+    ExternalIDs,
+    Graph,
+    Paper,
+    PaperID,
+)
+
+ARROW = "arrow"
+PARQUET = "parquet"
+SCHEMA_VERSION = "1"
+
+TABLES = (
+    "nodes",
+    "edges",
+    "common_authors",
+    "common_citations",
+    "common_references",
+    "path_lengths",
+)
+
+V = TypeVar("V")
+
+
+def _pyarrow() -> Any:
+    try:
+        return importlib.import_module("pyarrow")
+    except ImportError:
+        raise ImportError(
+            "Columnar export requires pyarrow: pip install connectedpapers-py[arrow]"
+        ) from None
+
+
+_schemas: Dict[str, Any] = {}
+
+
+def schemas() -> Dict[str, Any]:
+    """The pyarrow schema of each table, by table name."""
+    if _schemas:
+        return _schemas
+    pa = _pyarrow()
+    strings = pa.list_(pa.string())
+    base_paper = [
+        ("abstract", pa.string()),
+        ("arxivId", pa.string()),
+        (
+            "authors",
+            pa.list_(pa.struct([("ids", strings), ("name", pa.string())])),
+        ),
+        ("corpusid", pa.int64()),
+        ("doi", pa.string()),
+        (
+            "externalIds",
+            pa.struct(
+                [
+                    (name, pa.int64() if name == "CorpusId" else pa.string())
+                    for name in ExternalIDs.__slots__
+                ]
+            ),
+        ),
+        ("fieldsOfStudy", strings),
+        ("id", pa.string()),
+        ("isOpenAccess", pa.bool_()),
+        ("journalName", pa.string()),
+        ("journalPages", pa.string()),
+        ("journalVolume", pa.string()),
+        ("magId", pa.string()),
+        ("number_of_authors", pa.int64()),
+        ("paperId", pa.string()),
+        ("pdfUrls", strings),
+        ("pmid", pa.string()),
+        ("publicationDate", pa.string()),
+        ("publicationTypes", strings),
+        ("title", pa.string()),
+        ("tldr", pa.string()),
+        ("url", pa.string()),
+        ("venue", pa.string()),
+        ("year", pa.int64()),
+    ]
+    _schemas.update(
+        nodes=pa.schema(
+            [("node_id", pa.string())]
+            + base_paper
+            + [
+                ("path", strings),
+                ("path_length", pa.float64()),
+                ("pos_x", pa.float64()),
+                ("pos_y", pa.float64()),
+            ]
+        ),
+        edges=pa.schema(
+            [
+                ("source", pa.string()),
+                ("target", pa.string()),
+                ("weight", pa.float64()),
+            ]
+        ),
+        common_authors=pa.schema(
+            [
+                ("id", pa.string()),
+                ("mention_indexes", pa.list_(pa.int64())),
+                ("mentions", strings),
+                ("name", pa.string()),
+                ("url", pa.string()),
+            ]
+        ),
+        common_citations=pa.schema(
+            base_paper
+            + [
+                ("edges_count", pa.int64()),
+                ("local_references", strings),
+                ("paper_id", pa.string()),
+                ("pi_name", pa.string()),
+            ]
+        ),
+        common_references=pa.schema(
+            base_paper
+            + [
+                ("edges_count", pa.int64()),
+                ("local_citations", strings),
+                ("paper_id", pa.string()),
+                ("pi_name", pa.string()),
+            ]
+        ),
+        path_lengths=pa.schema(
+            [("paper_id", pa.string()), ("path_length", pa.float64())]
+        ),
+    )
+    return _schemas
+
+
+def _base_paper_columns(papers: Sequence[BasePaper]) -> Dict[str, List[Any]]:
+    columns: Dict[str, List[Any]] = {
+        name: [getattr(paper, name) for paper in papers] for name in BasePaper.__slots__
+    }
+    columns["authors"] = [
+        [{"ids": author.ids, "name": author.name} for author in paper.authors]
+        for paper in papers
+    ]
+    columns["externalIds"] = [
+        {name: getattr(paper.externalIds, name) for name in ExternalIDs.__slots__}
+        for paper in papers
+    ]
+    return columns
+
+
+def _table(name: str, columns: Dict[str, List[Any]], start_id: PaperID) -> Any:
+    schema = schemas()[name].with_metadata(
+        {"start_id": start_id, "schema_version": SCHEMA_VERSION}
+    )
+    return _pyarrow().Table.from_pydict(columns, schema=schema)
+
+
+def graph_tables(graph: Graph) -> Dict[str, Any]:
+    """Convert a graph into pyarrow Tables, by table name."""
+    papers = list(graph.nodes.values())
+    nodes = _base_paper_columns(papers)
+    nodes["node_id"] = list(graph.nodes)
+    nodes["path"] = [paper.path for paper in papers]
+    nodes["path_length"] = [paper.path_length for paper in papers]
+    nodes["pos_x"] = [paper.pos[0] for paper in papers]
+    nodes["pos_y"] = [paper.pos[1] for paper in papers]
+
+    edges: Dict[str, List[Any]] = {"source": [], "target": [], "weight": []}
+    for source, target, weight in graph.edges:
+        edges["source"].append(source)
+        edges["target"].append(target)
+        edges["weight"].append(weight)
+
+    common_authors = {
+        name: [getattr(author, name) for author in graph.common_authors]
+        for name in CommonAuthor.__slots__
+    }
+    common_citations = _base_paper_columns(graph.common_citations)
+    for name in CommonCitation.__slots__:
+        common_citations[name] = [
+            getattr(citation, name) for citation in graph.common_citations
+        ]
+    common_references = _base_paper_columns(graph.common_references)
+    for name in CommonReference.__slots__:
+        common_references[name] = [
+            getattr(reference, name) for reference in graph.common_references
+        ]
+    path_lengths: Dict[str, List[Any]] = {
+        "paper_id": list(graph.path_lengths),
+        "path_length": list(graph.path_lengths.values()),
+    }
+    start_id = graph.start_id
+    return {
+        "nodes": _table("nodes", nodes, start_id),
+        "edges": _table("edges", edges, start_id),
+        "common_authors": _table("common_authors", common_authors, start_id),
+        "common_citations": _table("common_citations", common_citations, start_id),
+        "common_references": _table("common_references", common_references, start_id),
+        "path_lengths": _table("path_lengths", path_lengths, start_id),
+    }
+
+
+def write_graph(graph: Graph, directory: str, format: str = ARROW) -> None:
+    """
+    Write the tables of a graph to a directory, one file per table, named
+    after the table: nodes.arrow, edges.arrow... or nodes.parquet...
+    """
+    if format not in (ARROW, PARQUET):
+        raise ValueError(f"Unknown format {format!r}, expected 'arrow' or 'parquet'")
+    pa = _pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    for name, table in graph_tables(graph).items():
+        path = os.path.join(directory, f"{name}.{format}")
+        if format == PARQUET:
+            importlib.import_module("pyarrow.parquet").write_table(table, path)
+        else:
+            with pa.OSFile(path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+
+def read_tables(directory: str) -> Dict[str, Any]:
+    """
+    Read the tables written by write_graph. Arrow IPC files are memory-mapped,
+    and their columns point into the mapped files rather than being copied.
+    """
+    pa = _pyarrow()
+    tables: Dict[str, Any] = {}
+    for name in TABLES:
+        path = os.path.join(directory, f"{name}.{ARROW}")
+        if os.path.exists(path):
+            tables[name] = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+            continue
+        path = os.path.join(directory, f"{name}.{PARQUET}")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No {name} table in {directory}")
+        parquet = importlib.import_module("pyarrow.parquet")
+        tables[name] = parquet.read_table(path, memory_map=True)
+    return tables
+
+
+class _TableMapping(Mapping[PaperID, V]):
+    """
+    A read-only mapping over the rows of a table, keyed by one of its string
+    columns. The key index is built on the first lookup.
+    """
+
+    __slots__ = ("_table", "_keys", "_index", "_decode_row")
+
+    def __init__(
+        self, table: Any, key: str, decode_row: Callable[[Any, int], V]
+    ) -> None:
+        self._table = table
+        self._keys = table.column(key)
+        self._index: Optional[Dict[PaperID, int]] = None
+        self._decode_row = decode_row
+
+    def _row_index(self) -> Dict[PaperID, int]:
+        if self._index is None:
+            self._index = {key: row for row, key in enumerate(self._keys.to_pylist())}
+        return self._index
+
+    def __getitem__(self, key: PaperID) -> V:
+        return self._decode_row(self._table, self._row_index()[key])
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._row_index()
+
+    def __iter__(self) -> Iterator[PaperID]:
+        return iter(self._keys.to_pylist())
+
+    def __len__(self) -> int:
+        return int(self._table.num_rows)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} rows)"
+
+
+def _decode_node(table: Any, row: int) -> Paper:
+    data = table.slice(row, 1).to_pylist()[0]
+    data["pos"] = [data["pos_x"], data["pos_y"]]
+    return decoder_for(Paper)(data)
+
+
+def _decode_path_length(table: Any, row: int) -> float:
+    length: float = table.column("path_length")[row].as_py()
+    return length
+
+
+class ArrowEdges(Sequence[Edge]):
+    """The edges of an ArrowGraph, read from the columns of its edges table."""
+
+    __slots__ = ("table",)
+
+    def __init__(self, table: Any) -> None:
+        self.table = table
+
+    def __len__(self) -> int:
+        return int(self.table.num_rows)
+
+    @overload
+    def __getitem__(self, index: int) -> Edge:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Edge]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Edge, List[Edge]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("edge index out of range")
+        edge: Edge = [
+            self.table.column(name)[index].as_py()
+            for name in ("source", "target", "weight")
+        ]
+        return edge
+
+    def __iter__(self) -> Iterator[Edge]:
+        for batch in self.table.to_batches():
+            columns = [
+                batch.column(name).to_pylist()
+                for name in ("source", "target", "weight")
+            ]
+            for source, target, weight in zip(*columns):
+                yield [source, target, weight]
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, Sequence)
+            and len(self) == len(other)
+            and all(a == b for a, b in zip(self, other))
+        )
+
+    def __repr__(self) -> str:
+        return f"ArrowEdges({len(self)} edges)"
+
+
+class ArrowGraph(Graph):
+    """
+    A read-only Graph backed by the tables of graph_tables or read_tables.
+    Nodes and path lengths are mappings that decode a row when it is accessed,
+    and edges are a sequence over the edges table. The tables themselves are
+    available as `tables`, for bulk processing.
+    """
+
+    def __init__(self, tables: Dict[str, Any]) -> None:
+        self.tables = tables
+        metadata = tables["nodes"].schema.metadata or {}
+        self.start_id = metadata[b"start_id"].decode("utf-8")
+        self.nodes = _TableMapping(tables["nodes"], "node_id", _decode_node)  # type: ignore[assignment]
+        self.edges = ArrowEdges(tables["edges"])  # type: ignore[assignment]
+        self.path_lengths = _TableMapping(  # type: ignore[assignment]
+            tables["path_lengths"], "paper_id", _decode_path_length
+        )
+        # There are few of these, so they are decoded right away
+        decode_author = decoder_for(CommonAuthor)
+        self.common_authors = [
+            decode_author(row) for row in tables["common_authors"].to_pylist()
+        ]
+        decode_citation = decoder_for(CommonCitation)
+        self.common_citations = [
+            decode_citation(row) for row in tables["common_citations"].to_pylist()
+        ]
+        decode_reference = decoder_for(CommonReference)
+        self.common_references = [
+            decode_reference(row) for row in tables["common_references"].to_pylist()
+        ]
+
+    def to_graph(self) -> Graph:
+        """Decode the whole graph into a plain Graph."""
+        nodes = self.tables["nodes"].to_pylist()
+        decode_paper = decoder_for(Paper)
+        for data in nodes:
+            data["pos"] = [data["pos_x"], data["pos_y"]]
+        return Graph(
+            common_authors=list(self.common_authors),
+            common_citations=list(self.common_citations),
+            common_references=list(self.common_references),
+            edges=list(self.edges),
+            nodes={data["node_id"]: decode_paper(data) for data in nodes},
+            path_lengths=dict(
+                zip(
+                    self.tables["path_lengths"].column("paper_id").to_pylist(),
+                    self.tables["path_lengths"].column("path_length").to_pylist(),
+                )
+            ),
+            start_id=self.start_id,
+        )
+
+
+def load_graph(directory: str) -> ArrowGraph:
+    """Open a graph written by write_graph, memory-mapping Arrow IPC files."""
+    return ArrowGraph(read_tables(directory))
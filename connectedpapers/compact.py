@@ -0,0 +1,298 @@
+"""
+A compact in-memory representation of graphs, for holding many of them at once.
+
+compact_graph() turns a Graph into a CompactGraph, which is still a Graph and
+keeps the attribute access API, but:
+* Repeated strings (paper IDs, author names and IDs, venues, fields of study...)
+  are interned, so they are shared between papers and between graphs.
+* Edges are stored as integer-indexed columns (source index, target index,
+  weight) instead of a list of 3-element lists.
+* Paper positions are stored in one contiguous float array, and each Paper.pos
+  is a view into it.
+
+Equal low-cardinality lists (fields of study, publication types) are shared
+between papers, so compact graphs should be treated as read-only.
+"""
+
+import dataclasses
+import sys
+from array import array
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+    overload,
+)
+
+from .graph import BasePaper, CommonAuthor, Edge, Graph, PaperAuthor, PaperID
+
+P = TypeVar("P", bound=BasePaper)
+
+
+class PositionView(Sequence[float]):
+    """The [x, y] position of one paper, backed by its graph's position array."""
+
+    __slots__ = ("_positions", "_offset")
+
+    def __init__(self, positions: "array[float]", index: int) -> None:
+        self._positions = positions
+        self._offset = 2 * index
+
+    def __len__(self) -> int:
+        return 2
+
+    @overload
+    def __getitem__(self, index: int) -> float:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[float]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[float, List[float]]:
+        if isinstance(index, slice):
+            return list(self)[index]
+        if not -2 <= index < 2:
+            raise IndexError("position index out of range")
+        return self._positions[self._offset + index % 2]
+
+    def __iter__(self) -> Iterator[float]:
+        yield self._positions[self._offset]
+        yield self._positions[self._offset + 1]
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Sequence) and list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class EdgeTable(Sequence[Edge]):
+    """
+    Graph edges stored as columns: source and target indexes into node_ids,
+    and weights. Reading an edge returns it as a [source, target, weight] list.
+    """
+
+    __slots__ = ("node_ids", "sources", "targets", "weights")
+
+    def __init__(
+        self,
+        node_ids: List[PaperID],
+        sources: "array[int]",
+        targets: "array[int]",
+        weights: "array[float]",
+    ) -> None:
+        self.node_ids = node_ids
+        self.sources = sources
+        self.targets = targets
+        self.weights = weights
+
+    @classmethod
+    def from_edges(
+        cls,
+        edges: Iterable[Edge],
+        node_ids: List[PaperID],
+        node_index: Dict[PaperID, int],
+    ) -> "EdgeTable":
+        """Build a table, appending edge endpoints missing from node_index to it."""
+        sources: "array[int]" = array("i")
+        targets: "array[int]" = array("i")
+        weights: "array[float]" = array("d")
+        for source, target, weight in edges:
+            for endpoint, column in ((source, sources), (target, targets)):
+                index = node_index.get(cast(PaperID, endpoint))
+                if index is None:
+                    index = node_index[cast(PaperID, endpoint)] = len(node_ids)
+                    node_ids.append(sys.intern(cast(PaperID, endpoint)))
+                column.append(index)
+            weights.append(cast(float, weight))
+        return cls(node_ids, sources, targets, weights)
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    @overload
+    def __getitem__(self, index: int) -> Edge:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Edge]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Edge, List[Edge]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        node_ids = self.node_ids
+        edge: Edge = [
+            node_ids[self.sources[index]],
+            node_ids[self.targets[index]],
+            self.weights[index],
+        ]
+        return edge
+
+    def __iter__(self) -> Iterator[Edge]:
+        node_ids = self.node_ids
+        for source, target, weight in zip(self.sources, self.targets, self.weights):
+            yield [node_ids[source], node_ids[target], weight]
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, Sequence)
+            and len(self) == len(other)
+            and all(a == b for a, b in zip(self, other))
+        )
+
+    def __repr__(self) -> str:
+        return f"EdgeTable({len(self)} edges)"
+
+
+def _intern_optional(value: Optional[str]) -> Optional[str]:
+    return None if value is None else sys.intern(value)
+
+
+def _intern_list(values: Optional[List[str]]) -> Optional[List[str]]:
+    return None if values is None else [sys.intern(value) for value in values]
+
+
+# Low-cardinality lists, such as fields of study, shared between all papers
+_shared_lists: Dict[Tuple[str, ...], List[str]] = {}
+
+
+def _shared_list(values: Optional[List[str]]) -> Optional[List[str]]:
+    if values is None:
+        return None
+    key = tuple(values)
+    shared = _shared_lists.get(key)
+    if shared is None:
+        shared = _shared_lists[key] = [sys.intern(value) for value in values]
+    return shared
+
+
+def _compact_urls(urls: Optional[List[str]]) -> Optional[List[str]]:
+    # The URLs of a paper are unique to it, so only the empty list is shared
+    # between papers; the URLs are interned, for papers in several graphs
+    return _intern_list(urls) if urls else _shared_list(urls)
+
+
+def _compact_author(author: PaperAuthor) -> PaperAuthor:
+    return PaperAuthor(
+        ids=[_intern_optional(author_id) for author_id in author.ids],
+        name=sys.intern(author.name),
+    )
+
+
+def _compact_paper(paper: P, **changes: Any) -> P:
+    return dataclasses.replace(
+        paper,
+        authors=[_compact_author(author) for author in paper.authors],
+        fieldsOfStudy=_shared_list(paper.fieldsOfStudy),
+        id=sys.intern(paper.id),
+        journalName=_intern_optional(paper.journalName),
+        paperId=sys.intern(paper.paperId),
+        pdfUrls=_compact_urls(paper.pdfUrls),
+        publicationTypes=_shared_list(paper.publicationTypes),
+        venue=_intern_optional(paper.venue),
+        **changes,
+    )
+
+
+class CompactGraph(Graph):
+    """A Graph with interned strings, columnar edges and contiguous positions."""
+
+    def __init__(self, graph: Graph) -> None:
+        self.node_ids: List[PaperID] = [
+            sys.intern(paper_id) for paper_id in graph.nodes
+        ]
+        self.node_index: Dict[PaperID, int] = {
+            paper_id: index for index, paper_id in enumerate(self.node_ids)
+        }
+        self.positions: "array[float]" = array("d")
+        for paper in graph.nodes.values():
+            self.positions.extend(paper.pos[:2])
+        self.nodes = {
+            paper_id: _compact_paper(
+                paper,
+                path=cast(List[PaperID], _intern_list(paper.path)),
+                pos=cast(List[float], PositionView(self.positions, index)),
+            )
+            for index, (paper_id, paper) in enumerate(
+                zip(self.node_ids, graph.nodes.values())
+            )
+        }
+        self.edges = graph.edges
+        self.common_authors = [
+            CommonAuthor(
+                id=sys.intern(author.id),
+                mention_indexes=author.mention_indexes,
+                mentions=cast(List[PaperID], _intern_list(author.mentions)),
+                name=sys.intern(author.name),
+                url=author.url,
+            )
+            for author in graph.common_authors
+        ]
+        self.common_citations = [
+            _compact_paper(
+                citation,
+                local_references=_intern_list(citation.local_references),
+                paper_id=sys.intern(citation.paper_id),
+            )
+            for citation in graph.common_citations
+        ]
+        self.common_references = [
+            _compact_paper(
+                reference,
+                local_citations=_intern_list(reference.local_citations),
+                paper_id=sys.intern(reference.paper_id),
+            )
+            for reference in graph.common_references
+        ]
+        self.path_lengths = {
+            (
+                self.node_ids[self.node_index[paper_id]]
+                if paper_id in self.node_index
+                else sys.intern(paper_id)
+            ): length
+            for paper_id, length in graph.path_lengths.items()
+        }
+        self.start_id = sys.intern(graph.start_id)
+
+    @property  # type: ignore[override]
+    def edges(self) -> EdgeTable:
+        return self._edges
+
+    @edges.setter
+    def edges(self, edges: Sequence[Edge]) -> None:
+        if isinstance(edges, EdgeTable) and edges.node_ids is self.node_ids:
+            self._edges = edges
+        else:
+            self._edges = EdgeTable.from_edges(edges, self.node_ids, self.node_index)
+
+    def to_graph(self) -> Graph:
+        """Convert back to a plain Graph, with list edges and list positions."""
+        return Graph(
+            common_authors=list(self.common_authors),
+            common_citations=list(self.common_citations),
+            common_references=list(self.common_references),
+            edges=list(self.edges),
+            nodes={
+                paper_id: dataclasses.replace(paper, pos=list(paper.pos))
+                for paper_id, paper in self.nodes.items()
+            },
+            path_lengths=dict(self.path_lengths),
+            start_id=self.start_id,
+        )
+
+
+def compact_graph(graph: Graph) -> CompactGraph:
+    """Return a compact copy of graph; a CompactGraph is returned as is."""
+    if isinstance(graph, CompactGraph):
+        return graph
+    return CompactGraph(graph)
@@ -2,18 +2,58 @@ import asyncio
 import dataclasses
 import sys
 import typing
+import weakref
 from enum import Enum
-from typing import Any, AsyncIterator, List, Optional
-
-import aiohttp
-import dacite
-import nest_asyncio  # type: ignore
+from http import HTTPStatus
+from types import TracebackType
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Collection,
+    Container,
+    Coroutine,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
+from .cache import CachedGraph, GraphCache, MemoryGraphCache
+from .coalescing import SingleFlight
+from .compact import compact_graph
 from .consts import ACCESS_TOKEN, CONNECTED_PAPERS_REST_API
+from .decoding import decode_graph, loads
+from .diff import (
+    GRAPH_DIFF,
+    GraphDiff,
+    apply_patch,
+    diff_graphs,
+    graph_version,
+    set_graph_version,
+)
 from .graph import Graph, PaperID
+from .instrumentation import Instrumentation, MetricsRegistry, Observer, Span
+from .loop_thread import LoopThread
+from .polling import SLEEP_TIME_BETWEEN_CHECKS as SLEEP_TIME_BETWEEN_CHECKS
+from .polling import AdaptivePolling, PollingStrategy, shared_timer_wheel
+from .rate_limit import PRIORITY_LOW, PRIORITY_NORMAL, QuotaTracker, RateLimiter
+from .streaming import (
+    GraphStreamParser,
+    PaperIDStreamParser,
+    StreamedEdge,
+    StreamedNode,
+)
 
-if sys.platform == "win32":
-    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+if typing.TYPE_CHECKING:
+    import aiohttp
 
 
 class GraphResponseStatuses(Enum):
@@ -32,6 +72,14 @@ class GraphResponseStatuses(Enum):
     OVERLOADED = "OVERLOADED"
 
 
+class BadResponseError(RuntimeError):
+    """The server answered a request with an unexpected HTTP status."""
+
+    def __init__(self, status: int) -> None:
+        super().__init__(f"Bad response: {status}")
+        self.status = status
+
+
 @dataclasses.dataclass
 class GraphResponse:
     """A response for the external graphs API"""
@@ -42,6 +90,66 @@ class GraphResponse:
     remaining_requests: Optional[int] = None
 
 
+def _graph_response(data: Dict[str, Any], graph: Optional[Graph]) -> GraphResponse:
+    return GraphResponse(
+        status=GraphResponseStatuses.__members__.get(
+            data["status"], GraphResponseStatuses.ERROR
+        ),
+        graph_json=graph,
+        progress=data.get("progress"),
+        remaining_requests=data.get("remaining_requests"),
+    )
+
+
+def decode_graph_response(
+    body: bytes, paper_fields: Optional[Collection[str]] = None, lazy: bool = False
+) -> GraphResponse:
+    """
+    Decode a graph API response body, mapping unknown statuses to ERROR.
+    paper_fields and lazy select the fields of papers to decode (see
+    decoding.decode_graph).
+    """
+    data = loads(body)
+    graph_json = data.get("graph_json")
+    return _graph_response(
+        data,
+        None if graph_json is None else decode_graph(graph_json, paper_fields, lazy),
+    )
+
+
+def decode_refresh_response(
+    body: bytes,
+) -> Tuple[GraphResponse, Optional[Dict[str, Any]]]:
+    """Decode a graph API response body, which may hold a graph patch (see diff)."""
+    data = loads(body)
+    graph_json = data.get("graph_json")
+    response = _graph_response(
+        data, None if graph_json is None else decode_graph(graph_json)
+    )
+    return response, data.get("graph_diff")
+
+
+class GraphTransfer(Enum):
+    """How a refreshed graph was received"""
+
+    NOT_MODIFIED = "NOT_MODIFIED"  # It didn't change, so it wasn't sent
+    PATCH = "PATCH"  # Only what changed was sent
+    FULL = "FULL"  # The whole graph was sent
+    NONE = "NONE"  # No graph was received, because the refresh failed
+
+
+@dataclasses.dataclass
+class GraphRefresh:
+    """The result of refreshing a graph, see refresh_graph_async"""
+
+    status: GraphResponseStatuses
+    graph: Graph  # The refreshed graph, or the held graph if it is unchanged
+    version: str  # The graph_version of graph
+    diff: GraphDiff  # What changed from the held graph
+    transfer: GraphTransfer
+    remaining_requests: Optional[int] = None
+
+
 end_response_statuses = {
     GraphResponseStatuses.BAD_ID,
     GraphResponseStatuses.ERROR,
@@ -52,8 +160,96 @@ end_response_statuses = {
     GraphResponseStatuses.OUT_OF_REQUESTS,
 }
 
-SLEEP_TIME_BETWEEN_CHECKS = 1.0
 SLEEP_TIME_AFTER_ERROR = 5.0
+OVERLOAD_RETRY_DELAYS = (5, 10, 20, 40)  # Exponential backoff delays in seconds
+
+DEFAULT_CONNECTION_LIMIT = 100
+DEFAULT_CONNECTION_LIMIT_PER_HOST = 10
+DEFAULT_KEEPALIVE_TIMEOUT = 30.0
+DEFAULT_DNS_CACHE_TTL = 300
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 30.0
+DEFAULT_MAX_CONCURRENCY = 5
+DECODE_IN_EXECUTOR_MIN_BYTES = 64 * 1024
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
+
+T = TypeVar("T")
+
+
+async def _until_deadline(
+    items: AsyncGenerator[T, None], deadline: Optional[float]
+) -> AsyncGenerator[T, None]:
+    """
+    Iterate items until the deadline, in the time of the running loop. Then
+    items is cancelled and closed, and asyncio.TimeoutError is raised.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                if deadline is None:
+                    item = await items.__anext__()
+                else:
+                    item = await asyncio.wait_for(
+                        items.__anext__(), max(deadline - loop.time(), 0)
+                    )
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        await items.aclose()
+
+
+async def _wait_until(
+    coroutine: Coroutine[Any, Any, T], deadline: Optional[float]
+) -> T:
+    """Await coroutine, cancelling it with asyncio.TimeoutError at the deadline."""
+    if deadline is None:
+        return await coroutine
+    remaining = max(deadline - asyncio.get_running_loop().time(), 0)
+    return await asyncio.wait_for(coroutine, remaining)
+
+
+async def _async_iter(items: Iterable[T]) -> AsyncIterator[T]:
+    for item in items:
+        yield item
+
+
+def _deadline(timeout: Optional[float]) -> Optional[float]:
+    """The deadline of a call with a timeout, in the time of the running loop."""
+    if timeout is None:
+        return None
+    return asyncio.get_running_loop().time() + timeout
+
+
+_selector_event_loop_set = False
+
+
+def _use_selector_event_loop() -> None:
+    """
+    aiohttp needs the selector event loop on Windows. The policy is set when
+    the first client is created, rather than when the package is imported.
+    """
+    global _selector_event_loop_set
+    if sys.platform == "win32" and not _selector_event_loop_set:
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    _selector_event_loop_set = True
+
+
+def default_accept_encoding() -> str:
+    """
+    The content codings the client asks for: gzip and deflate, and Brotli and
+    zstd when aiohttp can decode them (with Brotli or zstandard installed).
+    """
+    import aiohttp
+
+    compression_utils = getattr(aiohttp, "compression_utils", None)
+    encodings = ["gzip", "deflate"]
+    if getattr(compression_utils, "HAS_BROTLI", False):
+        encodings.append("br")
+    if getattr(compression_utils, "HAS_ZSTD", False):
+        encodings.append("zstd")
+    return ", ".join(encodings)
 
 
 class ConnectedPapersClient:
@@ -63,15 +259,329 @@ class ConnectedPapersClient:
         server_addr: str = CONNECTED_PAPERS_REST_API,
         retry_on_overload: bool = True,
         verbose: bool = False,
+        connection_limit: int = DEFAULT_CONNECTION_LIMIT,
+        connection_limit_per_host: int = DEFAULT_CONNECTION_LIMIT_PER_HOST,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: Optional[int] = DEFAULT_DNS_CACHE_TTL,
+        connect_timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT,
+        cache: Optional[GraphCache] = None,
+        memory_cache_size: int = 0,
+        compact_graphs: bool = False,
+        polling: Optional[PollingStrategy] = None,
+        requests_per_minute: Optional[float] = None,
+        burst: Optional[int] = None,
+        quota_reserve: Optional[int] = None,
+        nested_asyncio: bool = False,
+        observers: Iterable[Observer] = (),
+        accept_encoding: Optional[str] = None,
+        paper_fields: Optional[Collection[str]] = None,
+        lazy_fields: bool = False,
     ) -> None:
+        """
+        Args:
+            access_token: API key sent with every request
+            server_addr: Base address of the REST API
+            retry_on_overload: Retry with exponential backoff on OVERLOADED
+            verbose: Print timestamped progress messages
+            connection_limit: Maximum number of pooled connections (0 for unlimited)
+            connection_limit_per_host: Maximum number of pooled connections per host
+            keepalive_timeout: Seconds an idle connection is kept alive for reuse
+            dns_cache_ttl: Seconds DNS lookups are cached (None caches forever)
+            connect_timeout: Seconds to connect to the server (None for no limit)
+            read_timeout: Seconds to wait for data from the server, once a
+                          request was sent (None for no limit)
+            cache: A persistent cache to answer graph requests from, and to fill
+            memory_cache_size: Number of recent graphs kept in memory (0, the
+                               default, disables the memory cache)
+            compact_graphs: Return graphs as read-only CompactGraph objects
+            polling: When to check the status of graphs being built
+                     (AdaptivePolling by default)
+            requests_per_minute: Limit on the average rate of API requests,
+                                 shared by all calls on the client (None for no limit)
+            burst: Number of requests that may be made at once under the limit
+            quota_reserve: Remaining quota at or below which only high priority
+                           graph requests are sent (None to always send them)
+            nested_asyncio: Run synchronous calls on a new event loop in the
+                            calling thread, applying nest_asyncio, instead of on
+                            the client's background loop
+            observers: Receive the spans and counters of the client's requests,
+                       polls and retries (see the instrumentation module), in
+                       addition to the client's metrics registry
+            accept_encoding: Accept-Encoding header of every request
+                             (default_accept_encoding() by default). Compressed
+                             responses are decompressed as they arrive.
+            paper_fields: Only decode these fields of the papers of graphs (None
+                          for all of them). Accessing another field raises an
+                          AttributeError, unless lazy_fields is set. Can't be
+                          combined with cache, which stores whole graphs, or
+                          with compact_graphs unless lazy_fields is set.
+            lazy_fields: Decode the fields of papers that aren't in paper_fields
+                         (decoding.HEAVY_FIELDS, such as abstracts, if
+                         paper_fields is None) on first access. Can't be
+                         combined with cache, since storing a graph decodes
+                         all of its fields.
+        """
+        if cache is not None and (paper_fields is not None or lazy_fields):
+            raise ValueError(
+                "paper_fields and lazy_fields can't be combined with cache"
+            )
+        if paper_fields is not None and not lazy_fields and compact_graphs:
+            raise ValueError(
+                "paper_fields can't be combined with compact_graphs, "
+                "unless lazy_fields is set"
+            )
         self.access_token = access_token
         self.server_addr = server_addr
-        self.nested_asyncio: bool = True
+        self.nested_asyncio = nested_asyncio
         self.retry_on_overload = retry_on_overload
         self.verbose = verbose
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.cache = cache
+        self.memory_cache: Optional[MemoryGraphCache] = (
+            MemoryGraphCache(memory_cache_size) if memory_cache_size > 0 else None
+        )
+        self._graph_flights: SingleFlight[GraphResponse] = SingleFlight()
+        self.compact_graphs = compact_graphs
+        self.paper_fields = paper_fields
+        self.lazy_fields = lazy_fields
+        self.polling = (
+            polling
+            if polling is not None
+            else AdaptivePolling(interval=SLEEP_TIME_BETWEEN_CHECKS)
+        )
+        self.rate_limiter: Optional[RateLimiter] = (
+            RateLimiter(requests_per_minute, burst)
+            if requests_per_minute is not None
+            else None
+        )
+        self.quota = QuotaTracker(quota_reserve)
+        self.metrics = MetricsRegistry()
+        self.instrumentation = Instrumentation([self.metrics, *observers])
+        # Resolved on the first request, since it imports aiohttp
+        self.accept_encoding = accept_encoding
+        # aiohttp sessions are bound to the event loop that created them, so
+        # the client keeps one pooled session per loop it is used from.
+        self._sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]"
+        self._sessions = weakref.WeakKeyDictionary()
+        # Synchronous calls run on a background loop, which keeps its session
+        self._loop_thread = LoopThread()
+        weakref.finalize(self, self._loop_thread.stop)
+        self._closed = False
+        _use_selector_event_loop()
+
+    async def __aenter__(self) -> "ConnectedPapersClient":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        await self.aclose()
+
+    def __enter__(self) -> "ConnectedPapersClient":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self) -> None:
+        """
+        Close the client: close the session of the synchronous API, and stop its
+        background loop. A closed client can't make requests anymore.
+        """
+        self._closed = True
+        if self._loop_thread.running:
+            self._loop_thread.run(self._close_session())
+            self._loop_thread.stop()
+
+    async def _get_session(self) -> "aiohttp.ClientSession":
+        """Return the pooled session of the running loop, creating it if needed."""
+        if self._closed:
+            raise RuntimeError("The client is closed")
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            # The network stack is imported on the first request
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connection_limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=None,
+                sock_connect=self.connect_timeout,
+                sock_read=self.read_timeout,
+            )
+            session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._sessions[loop] = session
+        return session
+
+    async def aclose(self) -> None:
+        """
+        Close the client: close the pooled session of the running loop. A closed
+        client can't make requests anymore, and doesn't open new sessions.
+        """
+        self._closed = True
+        await self._close_session()
+
+    async def _close_session(self) -> None:
+        """Close the pooled session of the running loop."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def _acquire(self, priority: int, parent: Optional[Span]) -> None:
+        """Wait for the rate limiter, if the client has one."""
+        if self.rate_limiter is not None:
+            with self.instrumentation.span("http.rate_limit", parent):
+                await self.rate_limiter.acquire(priority)
+
+    def _headers(self) -> Dict[str, str]:
+        if self.accept_encoding is None:
+            self.accept_encoding = default_accept_encoding()
+        return {"X-Api-Key": self.access_token, "Accept-Encoding": self.accept_encoding}
+
+    async def _request(
+        self,
+        path: str,
+        priority: int = PRIORITY_NORMAL,
+        parent: Optional[Span] = None,
+        headers: Optional[Dict[str, str]] = None,
+        expected_statuses: Container[int] = (HTTPStatus.OK,),
+    ) -> Tuple[int, Optional[str], bytes]:
+        """
+        GET an API path on the pooled session.
+
+        Returns:
+            The status, ETag header and body of the response
+        """
+        instrumentation = self.instrumentation
+        await self._acquire(priority, parent)
+        session = await self._get_session()
+        with instrumentation.span("http.request", parent, path=path) as span:
+            async with session.get(
+                f"{self.server_addr}{path}",
+                headers={**self._headers(), **(headers or {})},
+            ) as resp:
+                span.attributes["http_status"] = resp.status
+                span.attributes["content_encoding"] = resp.headers.get(
+                    "Content-Encoding"
+                )
+                if resp.status not in expected_statuses:
+                    raise BadResponseError(resp.status)
+                body = await resp.read()
+                etag = resp.headers.get("ETag")
+            span.attributes["bytes"] = len(body)
+        instrumentation.count("http.bytes_received", len(body), parent)
+        return resp.status, etag, body
+
+    async def _get(
+        self,
+        path: str,
+        decode: Callable[[bytes], T],
+        priority: int = PRIORITY_NORMAL,
+        parent: Optional[Span] = None,
+    ) -> T:
+        """GET an API path on the pooled session and decode the response body."""
+        _, _, body = await self._request(path, priority, parent)
+        return await self._decode(body, decode, parent)
+
+    async def _decode(
+        self, body: bytes, decode: Callable[[bytes], T], parent: Optional[Span]
+    ) -> T:
+        """
+        Decode a response body. Large bodies are decoded in the default executor,
+        so that decoding a big graph doesn't stall the other requests running on
+        the event loop.
+        """
+        instrumentation = self.instrumentation
+        in_executor = len(body) >= DECODE_IN_EXECUTOR_MIN_BYTES
+        with instrumentation.span(
+            "http.decode", parent, bytes=len(body), in_executor=in_executor
+        ):
+            if in_executor:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, decode, body)
+            return decode(body)
+
+    async def _get_chunks(
+        self, path: str, chunk_size: int, priority: int = PRIORITY_NORMAL
+    ) -> AsyncGenerator[bytes, None]:
+        """GET an API path on the pooled session, yielding the body as it arrives."""
+        instrumentation = self.instrumentation
+        await self._acquire(priority, None)
+        session = await self._get_session()
+        with instrumentation.span("http.request", path=path, streamed=True) as span:
+            async with session.get(
+                f"{self.server_addr}{path}",
+                headers=self._headers(),
+            ) as resp:
+                span.attributes["http_status"] = resp.status
+                span.attributes["content_encoding"] = resp.headers.get(
+                    "Content-Encoding"
+                )
+                if resp.status != 200:
+                    raise BadResponseError(resp.status)
+                received = 0
+                try:
+                    async for chunk in resp.content.iter_chunked(chunk_size):
+                        received += len(chunk)
+                        yield chunk
+                finally:
+                    span.attributes["bytes"] = received
+                    instrumentation.count("http.bytes_received", received)
+
+    async def _get_json(self, path: str) -> Any:
+        """GET an API path on the pooled session and return the decoded JSON body."""
+        return await self._get(path, loads)
+
+    def _run_sync(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """
+        Run a coroutine for a synchronous call. It runs on the client's
+        background loop, which any thread can submit to, unless nested_asyncio
+        is set: then it runs on a private event loop in this thread, which is
+        closed afterwards.
+        """
+        if self._closed:
+            coroutine.close()
+            raise RuntimeError("The client is closed")
+        if not self.nested_asyncio:
+            return self._loop_thread.run(coroutine)
+        self.nest_asyncio()
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.run_until_complete(self._close_session())
+            loop.close()
 
     def nest_asyncio(self) -> None:
         if self.nested_asyncio:
+            import nest_asyncio  # type: ignore
+
             nest_asyncio.apply()
 
     def _log(self, message: str) -> None:
@@ -83,7 +593,12 @@ class ConnectedPapersClient:
             print(f"[{timestamp}] {message}")
 
     async def get_graph_async_iterator(
-        self, paper_id: str, fresh_only: bool = False, wait_until_complete: bool = True
+        self,
+        paper_id: str,
+        fresh_only: bool = False,
+        wait_until_complete: bool = True,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None,
     ) -> AsyncIterator[GraphResponse]:
         """
         Get graph as an async iterator, yielding status updates.
@@ -94,120 +609,280 @@ class ConnectedPapersClient:
             wait_until_complete: If True, wait until a terminal status is reached
                                 (FRESH_GRAPH, OLD_GRAPH, or error). If False, return
                                 immediately with current status.
+            priority: Order of the request among those waiting for the rate
+                      limiter; lower values go first. Requests with a negative
+                      priority may spend the client's quota_reserve.
+            timeout: Seconds after which the call raises asyncio.TimeoutError,
+                     including its waits between status checks and its retries
+                     (None for no limit). Time spent by the caller between
+                     updates counts too.
 
         Yields:
             GraphResponse objects with status updates (QUEUED, IN_PROGRESS, FRESH_GRAPH, etc.)
+
+        If the client has a memory_cache_size, graphs fetched recently are served
+        from an in-memory LRU, and if the client has a cache that can answer the
+        request, the cached graph is yielded as a single FRESH_GRAPH or OLD_GRAPH
+        response without any network call. Concurrent calls with the same
+        arguments, other than timeout, share a single upstream poller, and all
+        receive the same responses; calls of different priorities don't.
+
+        Graphs served from the memory cache, and the graphs of coalesced calls,
+        are the same objects for every caller: treat them as read-only, or copy
+        them (copy.deepcopy) before mutating them.
+
+        When the remaining quota reported by the server is at or below the
+        client's quota_reserve, an OUT_OF_REQUESTS response is yielded without
+        sending the request.
+
+        Cancelling the call, or its timeout, stops the polling once no other
+        call shares it, and closes the connection of the request in flight.
         """
         self.nest_asyncio()
+        deadline = _deadline(timeout)
+        with self.instrumentation.span(
+            "graph", paper_id=paper_id, fresh_only=fresh_only
+        ) as span:
+            if self.memory_cache is not None:
+                cached = self.memory_cache.get(paper_id, fresh_only)
+                if cached is not None:
+                    self.instrumentation.count("graph.cache_hits.memory", 1, span)
+                    response = self._cached_response(cached)
+                    span.attributes["status"] = response.status.value
+                    yield response
+                    return
+
+            async for response in _until_deadline(
+                # A priority of its own: a high priority call mustn't wait in
+                # a low priority flight, held back by the rate limit and quota
+                self._graph_flights.iterate(
+                    (paper_id, fresh_only, wait_until_complete, priority),
+                    lambda: self._fetch_graph_async_iterator(
+                        paper_id, fresh_only, wait_until_complete, priority
+                    ),
+                ),
+                deadline,
+            ):
+                span.attributes["status"] = response.status.value
+                yield response
+
+    def _decode_graph_response(self, body: bytes) -> GraphResponse:
+        response = decode_graph_response(body, self.paper_fields, self.lazy_fields)
+        if self.compact_graphs and response.graph_json is not None:
+            response.graph_json = compact_graph(response.graph_json)
+        return response
+
+    def _cached_response(self, cached: CachedGraph) -> GraphResponse:
+        status = (
+            GraphResponseStatuses.FRESH_GRAPH
+            if cached.fresh
+            else GraphResponseStatuses.OLD_GRAPH
+        )
+        self._log(f"Status: {status.value} - Graph read from cache")
+        graph = cached.graph
+        if self.compact_graphs:
+            graph = compact_graph(graph)
+        return GraphResponse(status=status, graph_json=graph)
+
+    async def _fetch_graph_async_iterator(
+        self,
+        paper_id: str,
+        fresh_only: bool,
+        wait_until_complete: bool,
+        priority: int,
+    ) -> AsyncIterator[GraphResponse]:
+        """Answer from the persistent cache, or poll the API and fill the caches."""
+        loop = asyncio.get_running_loop()
+        if self.cache is not None:
+            cached = await loop.run_in_executor(
+                None, self.cache.get, paper_id, fresh_only
+            )
+            if cached is not None:
+                self.instrumentation.count("graph.cache_hits.disk")
+                if self.memory_cache is not None:
+                    self.memory_cache.put(
+                        paper_id, cached.graph, cached.fresh, cached.fetched_at
+                    )
+                yield self._cached_response(cached)
+                return
+
+        if not self.quota.allows(priority):
+            self._log(
+                f"Status: OUT_OF_REQUESTS - {self.quota.remaining} requests left, "
+                f"keeping the reserve of {self.quota.reserve}"
+            )
+            yield GraphResponse(
+                status=GraphResponseStatuses.OUT_OF_REQUESTS,
+                remaining_requests=self.quota.remaining,
+            )
+            return
+
+        async for response in self._poll_graph_async_iterator(
+            paper_id, fresh_only, wait_until_complete, priority
+        ):
+            if response.graph_json is not None and response.status in {
+                GraphResponseStatuses.FRESH_GRAPH,
+                GraphResponseStatuses.OLD_GRAPH,
+            }:
+                fresh = response.status == GraphResponseStatuses.FRESH_GRAPH
+                await self._store_graph(paper_id, response.graph_json, fresh)
+            yield response
+
+    async def _store_graph(self, paper_id: str, graph: Graph, fresh: bool) -> None:
+        """Fill the memory cache and the persistent cache with a received graph."""
+        if self.memory_cache is not None:
+            self.memory_cache.put(paper_id, graph, fresh)
+        if self.cache is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.cache.put, paper_id, graph, fresh
+            )
+
+    async def _poll_graph_async_iterator(
+        self,
+        paper_id: str,
+        fresh_only: bool,
+        wait_until_complete: bool,
+        priority: int,
+    ) -> AsyncIterator[GraphResponse]:
+        """Poll the graph API until the requested graph is available."""
+        with self.instrumentation.span(
+            "graph.fetch", paper_id=paper_id, fresh_only=fresh_only
+        ) as fetch:
+            async for response in self._poll_graph(
+                paper_id, fresh_only, wait_until_complete, priority, fetch
+            ):
+                fetch.attributes["status"] = response.status.value
+                yield response
+
+    async def _poll_graph(
+        self,
+        paper_id: str,
+        fresh_only: bool,
+        wait_until_complete: bool,
+        priority: int,
+        fetch: Span,
+    ) -> AsyncIterator[GraphResponse]:
+        # Imported with the session, before the first request
+        import aiohttp
+
         self._log(f"Requesting graph for paper: {paper_id}")
         retry_counter = 3
-        overload_retry_delays = [5, 10, 20, 40]  # Exponential backoff delays in seconds
         overload_retry_index = 0
+        schedule = self.polling.schedule()
+        timer_wheel = shared_timer_wheel()
+        instrumentation = self.instrumentation
 
         while retry_counter > 0:
             try:
-                async with aiohttp.ClientSession() as session:
-                    newest_graph: Optional[Any] = None
-                    while True:
-                        async with session.get(
-                            f"{self.server_addr}/papers-api/graph/{int(fresh_only)}/{paper_id}",
-                            headers={"X-Api-Key": self.access_token},
-                        ) as resp:
-                            if resp.status != 200:
-                                raise RuntimeError(f"Bad response: {resp.status}")
-                            data = await resp.json()
-                            if data["status"] not in GraphResponseStatuses.__dict__:
-                                data["status"] = GraphResponseStatuses.ERROR.value
-                            response = dacite.from_dict(
-                                data_class=GraphResponse,
-                                data=data,
-                                config=dacite.Config(
-                                    type_hooks={
-                                        GraphResponseStatuses: GraphResponseStatuses
-                                    }
-                                ),
-                            )
+                newest_graph: Optional[Any] = None
+                while True:
+                    _, etag, body = await self._request(
+                        f"/papers-api/graph/{int(fresh_only)}/{paper_id}",
+                        priority,
+                        fetch,
+                    )
+                    response = await self._decode(
+                        body, self._decode_graph_response, fetch
+                    )
+                    if etag is not None and response.graph_json is not None:
+                        # Refreshing the graph won't need to hash it
+                        set_graph_version(response.graph_json, etag.strip('"'))
+                    self.quota.update(response.remaining_requests)
+                    instrumentation.count(
+                        f"graph.responses.{response.status.value}", 1, fetch
+                    )
 
-                            # Log status based on response type
-                            if response.status == GraphResponseStatuses.IN_PROGRESS:
-                                progress_pct = (
-                                    response.progress
-                                    if response.progress is not None
-                                    else 0
-                                )
-                                self._log(
-                                    f"Status: IN_PROGRESS - Building graph: {progress_pct:.0f}% complete"
-                                )
-                            elif response.status == GraphResponseStatuses.QUEUED:
-                                self._log(
-                                    "Status: QUEUED - Graph build queued, waiting..."
-                                )
-                            elif response.status == GraphResponseStatuses.OLD_GRAPH:
-                                self._log(
-                                    "Status: OLD_GRAPH - Using cached graph, requesting fresh build..."
-                                )
-                            elif response.status == GraphResponseStatuses.FRESH_GRAPH:
-                                self._log("Status: FRESH_GRAPH - Graph ready")
-                            elif response.status in end_response_statuses:
-                                self._log(
-                                    f"Status: {response.status.value} - Request failed"
-                                )
-
-                            # Handle OVERLOADED status with exponential backoff
-                            if response.status == GraphResponseStatuses.OVERLOADED:
-                                if (
-                                    self.retry_on_overload
-                                    and overload_retry_index
-                                    < len(overload_retry_delays)
-                                ):
-                                    delay = overload_retry_delays[overload_retry_index]
-                                    attempt_num = overload_retry_index + 1
-                                    self._log(
-                                        f"Status: OVERLOADED - Server busy, retrying in {delay}s (attempt {attempt_num}/4)"
-                                    )
-                                    overload_retry_index += 1
-                                    await asyncio.sleep(delay)
-                                    continue  # Retry the request
-                                else:
-                                    # Return OVERLOADED response if retries disabled or exhausted
-                                    self._log(
-                                        "Status: OVERLOADED - Max retries exhausted"
-                                    )
-                                    yield response
-                                    return
-
-                            # Reset overload retry counter on successful non-OVERLOADED response
-                            overload_retry_index = 0
-
-                            if response.graph_json is not None:
-                                newest_graph = response.graph_json
-
-                            # If fresh_only was originally False and we got OLD_GRAPH, that's what was requested
-                            if (
-                                response.status == GraphResponseStatuses.OLD_GRAPH
-                                and not fresh_only
-                            ):
-                                yield response
-                                return
+                    # Log status based on response type
+                    if response.status == GraphResponseStatuses.IN_PROGRESS:
+                        progress_pct = (
+                            response.progress if response.progress is not None else 0
+                        )
+                        self._log(
+                            f"Status: IN_PROGRESS - Building graph: {progress_pct:.0f}% complete"
+                        )
+                    elif response.status == GraphResponseStatuses.QUEUED:
+                        self._log("Status: QUEUED - Graph build queued, waiting...")
+                    elif response.status == GraphResponseStatuses.OLD_GRAPH:
+                        self._log(
+                            "Status: OLD_GRAPH - Using cached graph, requesting fresh build..."
+                        )
+                    elif response.status == GraphResponseStatuses.FRESH_GRAPH:
+                        self._log("Status: FRESH_GRAPH - Graph ready")
+                    elif response.status in end_response_statuses:
+                        self._log(f"Status: {response.status.value} - Request failed")
 
-                            if (
-                                response.status in end_response_statuses
-                                or not wait_until_complete
+                    # Handle OVERLOADED status with exponential backoff
+                    if response.status == GraphResponseStatuses.OVERLOADED:
+                        if self.retry_on_overload and overload_retry_index < len(
+                            OVERLOAD_RETRY_DELAYS
+                        ):
+                            delay = OVERLOAD_RETRY_DELAYS[overload_retry_index]
+                            attempt_num = overload_retry_index + 1
+                            self._log(
+                                f"Status: OVERLOADED - Server busy, retrying in {delay}s (attempt {attempt_num}/4)"
+                            )
+                            overload_retry_index += 1
+                            if self.rate_limiter is not None:
+                                # Hold back the client's other requests as well
+                                self.rate_limiter.pause(delay)
+                            with instrumentation.span(
+                                "graph.backoff.overloaded", fetch, delay=delay
                             ):
-                                yield response
-                                return
+                                await asyncio.sleep(delay)
+                            continue  # Retry the request
+                        else:
+                            # Return OVERLOADED response if retries disabled or exhausted
+                            self._log("Status: OVERLOADED - Max retries exhausted")
+                            yield response
+                            return
 
-                            # If we got OLD_GRAPH and wait_until_complete=True, request fresh on next iteration
-                            if (
-                                response.status == GraphResponseStatuses.OLD_GRAPH
-                                and wait_until_complete
-                            ):
-                                fresh_only = True
+                    # Reset overload retry counter on successful non-OVERLOADED response
+                    overload_retry_index = 0
 
-                            response.graph_json = newest_graph
-                            yield response
-                            await asyncio.sleep(SLEEP_TIME_BETWEEN_CHECKS)
-            except Exception as e:
+                    if response.graph_json is not None:
+                        newest_graph = response.graph_json
+
+                    # If fresh_only was originally False and we got OLD_GRAPH, that's what was requested
+                    if (
+                        response.status == GraphResponseStatuses.OLD_GRAPH
+                        and not fresh_only
+                    ):
+                        yield response
+                        return
+
+                    if (
+                        response.status in end_response_statuses
+                        or not wait_until_complete
+                    ):
+                        yield response
+                        return
+
+                    # If we got OLD_GRAPH and wait_until_complete=True, request fresh on next iteration
+                    if (
+                        response.status == GraphResponseStatuses.OLD_GRAPH
+                        and wait_until_complete
+                    ):
+                        fresh_only = True
+
+                    response.graph_json = newest_graph
+                    yield response
+                    wait = schedule.next_delay(
+                        response.progress or 0.0
+                        if response.status == GraphResponseStatuses.IN_PROGRESS
+                        else None
+                    )
+                    # Time spent QUEUED or IN_PROGRESS, as seen by the client
+                    with instrumentation.span(
+                        f"graph.wait.{response.status.value.lower()}", fetch
+                    ):
+                        await timer_wheel.sleep(wait)
+            except (aiohttp.ClientError, asyncio.TimeoutError, BadResponseError) as e:
+                # Network and server errors are retried; others are bugs, and
+                # surface right away
+                instrumentation.count("graph.errors", 1, fetch)
+                if self._closed:
+                    # Requests fail because the client was closed: don't retry
+                    raise
                 retry_counter -= 1
                 attempt_num = 4 - retry_counter
                 error_type = type(e).__name__
@@ -219,14 +894,72 @@ class ConnectedPapersClient:
                 self._log(
                     f"Error: {error_type} - Retrying in {SLEEP_TIME_AFTER_ERROR:.0f}s (attempt {attempt_num}/3)"
                 )
-                await asyncio.sleep(SLEEP_TIME_AFTER_ERROR)
+                instrumentation.count("graph.retries", 1, fetch)
+                with instrumentation.span("graph.backoff.error", fetch):
+                    await asyncio.sleep(SLEEP_TIME_AFTER_ERROR)
+
+    async def stream_graph_async_iterator(
+        self,
+        paper_id: str,
+        fresh_only: bool = False,
+        chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Union[StreamedNode, StreamedEdge, GraphResponse]]:
+        """
+        Request a graph once, and parse the response as it downloads, so that
+        the nodes and edges of a large graph can be processed before the whole
+        body arrives, and without holding all of it in memory.
+
+        Args:
+            paper_id: The paper ID to get the graph for
+            fresh_only: Same as for get_graph_async_iterator
+            chunk_size: Maximum number of bytes read from the response at a time
+            priority: Same as for get_graph_async_iterator
+            timeout: Same as for get_graph_async_iterator
+
+        Yields:
+            A StreamedNode or StreamedEdge as soon as each is parsed, then the
+            GraphResponse. Its graph_json, if any, has all the fields of the
+            graph except nodes and edges, which are left empty.
+
+        Unlike get_graph_async_iterator, this makes a single request, without
+        polling, retries or caching: when the graph is still being built, the
+        only item is a QUEUED or IN_PROGRESS response.
+        """
+        self.nest_asyncio()
+        parser = GraphStreamParser()
+        async for chunk in _until_deadline(
+            self._get_chunks(
+                f"/papers-api/graph/{int(fresh_only)}/{paper_id}", chunk_size, priority
+            ),
+            _deadline(timeout),
+        ):
+            for event in parser.feed(chunk):
+                yield event
+        fields, graph = parser.close()
+        response = _graph_response(fields, graph)
+        self.quota.update(response.remaining_requests)
+        yield response
 
     async def get_graph_async(
-        self, paper_id: str, fresh_only: bool = True
+        self,
+        paper_id: str,
+        fresh_only: bool = True,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None,
     ) -> GraphResponse:
+        """
+        Get the final response for a paper's graph; see get_graph_async_iterator.
+        The graph may be shared with other callers, so don't mutate it.
+        """
         self.nest_asyncio()
         generator = self.get_graph_async_iterator(
-            paper_id, fresh_only=fresh_only, wait_until_complete=True
+            paper_id,
+            fresh_only=fresh_only,
+            wait_until_complete=True,
+            priority=priority,
+            timeout=timeout,
         )
         result = GraphResponse(
             status=GraphResponseStatuses.ERROR, graph_json=None, progress=None
@@ -235,59 +968,465 @@ class ConnectedPapersClient:
             result = response
         return result
 
-    def get_graph_sync(self, paper_id: str, fresh_only: bool = True) -> GraphResponse:
+    def get_graph_sync(
+        self,
+        paper_id: str,
+        fresh_only: bool = True,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None,
+    ) -> GraphResponse:
+        """Synchronous get_graph_async; the graph may be shared, so don't mutate it."""
+        return self._run_sync(
+            self.get_graph_async(paper_id, fresh_only, priority, timeout)
+        )
+
+    async def refresh_graph_async(
+        self,
+        paper_id: str,
+        graph: Graph,
+        version: Optional[str] = None,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None,
+    ) -> GraphRefresh:
+        """
+        Refresh a graph that is already held (such as an OLD_GRAPH) to the
+        server's fresh graph, without downloading what didn't change.
+
+        Every status check sends the version of the held graph in If-None-Match,
+        so the server leaves the graph out of its QUEUED and IN_PROGRESS
+        responses, answers 304 Not Modified if the fresh graph is the same, and
+        may send a patch of what changed instead of the whole graph.
+
+        Args:
+            paper_id: The paper ID of the graph
+            graph: The held graph, which isn't modified
+            version: The graph_version of the held graph, such as the version of
+                     a previous refresh. If not given, the version the graph was
+                     received with is used, or it is computed from the graph.
+            priority: Same as for get_graph_async_iterator
+            timeout: Same as for get_graph_async_iterator
+
+        Returns:
+            The refreshed graph, with a diff of what changed for incremental
+            processing. If the refresh fails, its status is the error status,
+            and its graph is the held one.
+
+        Unlike get_graph_async_iterator, this bypasses the caches when reading
+        (it fills them with the refreshed graph), isn't coalesced, and raises
+        errors instead of retrying.
+        """
         self.nest_asyncio()
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        return await _wait_until(
+            self._refresh_graph(paper_id, graph, version, priority), _deadline(timeout)
+        )
+
+    async def _refresh_graph(
+        self, paper_id: str, graph: Graph, version: Optional[str], priority: int
+    ) -> GraphRefresh:
+        instrumentation = self.instrumentation
+        loop = asyncio.get_running_loop()
+        if version is None:
+            version = await loop.run_in_executor(None, graph_version, graph)
+        if not self.quota.allows(priority):
+            return GraphRefresh(
+                GraphResponseStatuses.OUT_OF_REQUESTS,
+                graph,
+                version,
+                GraphDiff(),
+                GraphTransfer.NONE,
+                self.quota.remaining,
+            )
+        headers = {"If-None-Match": f'"{version}"', "A-IM": GRAPH_DIFF}
+        schedule = self.polling.schedule()
+        overload_retry_index = 0
+        with instrumentation.span("graph.refresh", paper_id=paper_id) as span:
+            while True:
+                status, etag, body = await self._request(
+                    f"/papers-api/graph/1/{paper_id}",
+                    priority,
+                    span,
+                    headers,
+                    (HTTPStatus.OK, HTTPStatus.IM_USED, HTTPStatus.NOT_MODIFIED),
+                )
+                span.attributes["http_status"] = status
+                if status == HTTPStatus.NOT_MODIFIED:
+                    return GraphRefresh(
+                        GraphResponseStatuses.FRESH_GRAPH,
+                        graph,
+                        version,
+                        GraphDiff(),
+                        GraphTransfer.NOT_MODIFIED,
+                        self.quota.remaining,
+                    )
+                response, patch = await self._decode(
+                    body, decode_refresh_response, span
+                )
+                self.quota.update(response.remaining_requests)
+                instrumentation.count(
+                    f"graph.responses.{response.status.value}", 1, span
+                )
+                refreshed: Optional[Tuple[Graph, str, GraphDiff, GraphTransfer]]
+                refreshed = None
+                if patch is not None:
+                    try:
+                        new_graph, diff = await loop.run_in_executor(
+                            None, apply_patch, graph, patch
+                        )
+                    except ValueError:
+                        # Not a patch of this graph: ask for the whole graph
+                        headers.pop("A-IM", None)
+                        continue
+                    refreshed = new_graph, patch["version"], diff, GraphTransfer.PATCH
+                elif (
+                    response.graph_json is not None
+                    and response.status == GraphResponseStatuses.FRESH_GRAPH
+                ):
+                    new_graph = response.graph_json
+                    diff = await loop.run_in_executor(
+                        None, diff_graphs, graph, new_graph
+                    )
+                    new_version = (
+                        etag.strip('"')
+                        if etag is not None
+                        else await loop.run_in_executor(None, graph_version, new_graph)
+                    )
+                    refreshed = new_graph, new_version, diff, GraphTransfer.FULL
+                if refreshed is not None:
+                    new_graph, new_version, diff, transfer = refreshed
+                    if self.compact_graphs:
+                        new_graph = compact_graph(new_graph)
+                    set_graph_version(new_graph, new_version)
+                    await self._store_graph(paper_id, new_graph, True)
+                    return GraphRefresh(
+                        response.status,
+                        new_graph,
+                        new_version,
+                        diff,
+                        transfer,
+                        response.remaining_requests,
+                    )
+
+                if response.status == GraphResponseStatuses.OVERLOADED:
+                    if not self.retry_on_overload or overload_retry_index >= len(
+                        OVERLOAD_RETRY_DELAYS
+                    ):
+                        return GraphRefresh(
+                            response.status,
+                            graph,
+                            version,
+                            GraphDiff(),
+                            GraphTransfer.NONE,
+                            response.remaining_requests,
+                        )
+                    delay = OVERLOAD_RETRY_DELAYS[overload_retry_index]
+                    overload_retry_index += 1
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.pause(delay)
+                    with instrumentation.span(
+                        "graph.backoff.overloaded", span, delay=delay
+                    ):
+                        await asyncio.sleep(delay)
+                    continue
+                overload_retry_index = 0
+                if response.status in end_response_statuses:
+                    return GraphRefresh(
+                        response.status,
+                        graph,
+                        version,
+                        GraphDiff(),
+                        GraphTransfer.NONE,
+                        response.remaining_requests,
+                    )
+                wait = schedule.next_delay(
+                    response.progress or 0.0
+                    if response.status == GraphResponseStatuses.IN_PROGRESS
+                    else None
+                )
+                with instrumentation.span(
+                    f"graph.wait.{response.status.value.lower()}", span
+                ):
+                    await shared_timer_wheel().sleep(wait)
+
+    def refresh_graph_sync(
+        self,
+        paper_id: str,
+        graph: Graph,
+        version: Optional[str] = None,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None,
+    ) -> GraphRefresh:
+        """Synchronous refresh_graph_async."""
+        return self._run_sync(
+            self.refresh_graph_async(paper_id, graph, version, priority, timeout)
+        )
+
+    async def get_graphs_async_iterator(
+        self,
+        paper_ids: Union[Iterable[PaperID], AsyncIterable[PaperID]],
+        fresh_only: bool = True,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        on_update: Optional[Callable[[PaperID, GraphResponse], None]] = None,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None,
+    ) -> AsyncGenerator[Tuple[PaperID, GraphResponse], None]:
+        """
+        Get graphs for many papers, with at most max_concurrency in flight.
+
+        Args:
+            paper_ids: The paper IDs to get graphs for, or an async iterable of
+                       them, read as workers become free; duplicates are
+                       fetched once
+            fresh_only: Same as for get_graph_async
+            max_concurrency: Maximum number of graphs fetched at the same time
+            on_update: Called with every status update of every paper
+            priority: Same as for get_graph_async_iterator
+            timeout: Seconds each paper's graph may take, from when its fetch
+                     starts (None for no limit)
+
+        Yields:
+            (paper_id, final GraphResponse) tuples, in completion order. A paper
+            whose fetch raised or timed out gets its last status update (or an
+            ERROR response if it had none) instead of failing the batch. An
+            error raised by paper_ids is raised once the fetches in flight end.
+
+        To stop iterating early, close the iterator (await iterator.aclose(), or
+        iterate inside contextlib.aclosing() on Python 3.10+): this cancels the
+        fetches in flight. A generator left open keeps fetching until it is
+        garbage collected. Workers also stop once the client is closed.
+        """
+        self.nest_asyncio()
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        pending: AsyncIterator[PaperID] = (
+            paper_ids.__aiter__()
+            if isinstance(paper_ids, AsyncIterable)
+            else _async_iter(paper_ids)
+        )
+        pending_lock = asyncio.Lock()
+        seen: Set[PaperID] = set()
+        results: "asyncio.Queue[Optional[Tuple[PaperID, GraphResponse]]]" = (
+            asyncio.Queue()
+        )
+
+        async def fetch(paper_id: PaperID) -> GraphResponse:
+            result = GraphResponse(status=GraphResponseStatuses.ERROR)
+            try:
+                async for response in self.get_graph_async_iterator(
+                    paper_id,
+                    fresh_only=fresh_only,
+                    wait_until_complete=True,
+                    priority=priority,
+                    timeout=timeout,
+                ):
+                    result = response
+                    if on_update is not None:
+                        on_update(paper_id, response)
+            except Exception as e:
+                self._log(f"Error: {type(e).__name__} - Failed to get {paper_id}")
+            return result
+
+        async def worker() -> None:
+            try:
+                # Workers share one iterator, so IDs are consumed lazily and in order
+                while not self._closed:
+                    async with pending_lock:
+                        try:
+                            paper_id = await pending.__anext__()
+                        except StopAsyncIteration:
+                            break
+                    if paper_id in seen:
+                        continue
+                    seen.add(paper_id)
+                    await results.put((paper_id, await fetch(paper_id)))
+            finally:
+                results.put_nowait(None)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(max_concurrency)]
+        running = len(workers)
         try:
-            return loop.run_until_complete(self.get_graph_async(paper_id, fresh_only))
+            while running > 0:
+                item = await results.get()
+                if item is None:
+                    running -= 1
+                    continue
+                yield item
+            # Raise the error of the paper IDs iterable, if it failed
+            await asyncio.gather(*workers)
         finally:
-            loop.close()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            aclose = getattr(pending, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def get_graphs_async(
+        self,
+        paper_ids: Union[Iterable[PaperID], AsyncIterable[PaperID]],
+        fresh_only: bool = True,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        on_update: Optional[Callable[[PaperID, GraphResponse], None]] = None,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None,
+    ) -> Dict[PaperID, GraphResponse]:
+        """Get graphs for many papers, returning the final response per paper ID."""
+        results: Dict[PaperID, GraphResponse] = {}
+        async for paper_id, response in self.get_graphs_async_iterator(
+            paper_ids, fresh_only, max_concurrency, on_update, priority, timeout
+        ):
+            results[paper_id] = response
+        return results
+
+    def get_graphs_sync(
+        self,
+        paper_ids: Iterable[PaperID],
+        fresh_only: bool = True,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        on_update: Optional[Callable[[PaperID, GraphResponse], None]] = None,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None,
+    ) -> Dict[PaperID, GraphResponse]:
+        return self._run_sync(
+            self.get_graphs_async(
+                paper_ids, fresh_only, max_concurrency, on_update, priority, timeout
+            )
+        )
 
     async def get_remaining_usages_async(self) -> int:
         self.nest_asyncio()
         self._log("Fetching remaining API usage...")
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{self.server_addr}/papers-api/remaining-usages",
-                headers={"X-Api-Key": self.access_token},
-            ) as resp:
-                if resp.status != 200:
-                    raise RuntimeError(f"Bad response: {resp.status}")
-                data = await resp.json()
-                remaining = typing.cast(int, data["remaining_uses"])
-                self._log(f"Remaining requests: {remaining}")
-                return remaining
+        data = await self._get_json("/papers-api/remaining-usages")
+        remaining = typing.cast(int, data["remaining_uses"])
+        self.quota.update(remaining)
+        self._log(f"Remaining requests: {remaining}")
+        return remaining
 
     def get_remaining_usages_sync(self) -> int:
-        self.nest_asyncio()
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(self.get_remaining_usages_async())
-        finally:
-            loop.close()
+        return self._run_sync(self.get_remaining_usages_async())
 
     async def get_free_access_papers_async(self) -> List[PaperID]:
         self.nest_asyncio()
         self._log("Fetching free access papers...")
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{self.server_addr}/papers-api/free-access-papers",
-                headers={"X-Api-Key": self.access_token},
-            ) as resp:
-                if resp.status != 200:
-                    raise RuntimeError(f"Bad response: {resp.status}")
-                data = await resp.json()
-                papers = typing.cast(List[PaperID], data["papers"])
-                self._log(f"Found {len(papers)} free access papers")
-                return papers
+        data = await self._get_json("/papers-api/free-access-papers")
+        papers = typing.cast(List[PaperID], data["papers"])
+        self._log(f"Found {len(papers)} free access papers")
+        return papers
 
     def get_free_access_papers_sync(self) -> List[PaperID]:
+        return self._run_sync(self.get_free_access_papers_async())
+
+    async def stream_free_access_papers_async_iterator(
+        self, chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE
+    ) -> AsyncGenerator[PaperID, None]:
+        """Yield the free access papers as the response downloads."""
         self.nest_asyncio()
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(self.get_free_access_papers_async())
-        finally:
-            loop.close()
+        self._log("Streaming free access papers...")
+        parser = PaperIDStreamParser()
+        count = 0
+        async for chunk in self._get_chunks(
+            "/papers-api/free-access-papers", chunk_size
+        ):
+            for paper_id in parser.feed(chunk):
+                count += 1
+                yield paper_id
+        parser.close()
+        self._log(f"Found {count} free access papers")
+
+    async def prefetch_free_access_papers_async_iterator(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_papers: Optional[int] = None,
+        fresh_only: bool = False,
+        priority: int = PRIORITY_LOW,
+        timeout: Optional[float] = None,
+    ) -> AsyncGenerator[Tuple[PaperID, GraphResponse], None]:
+        """
+        Fill the client's caches with the graphs of the free access papers,
+        so that later requests for them are cache hits. The paper IDs are
+        streamed, and their graphs fetched as they arrive, with
+        get_graphs_async_iterator.
+
+        Args:
+            max_concurrency: Maximum number of graphs fetched at the same time
+            max_papers: Maximum number of papers to prefetch (None for all)
+            fresh_only: Same as for get_graph_async. By default, the graphs the
+                        server already has are prefetched, without building
+                        new ones.
+            priority: Priority of the prefetch requests, for the rate limiter
+                      and the quota reserve (low by default, so that they
+                      don't spend the reserve, and wait for other requests)
+            timeout: Seconds each paper's graph may take (None for no limit)
+
+        Yields:
+            (paper_id, final GraphResponse) tuples, in completion order. No new
+            papers are prefetched once the remaining quota is down to the
+            client's quota_reserve.
+        """
+        if self.cache is None and self.memory_cache is None:
+            raise ValueError(
+                "Prefetching needs a client with a cache or a memory_cache_size"
+            )
+        if max_papers is not None and max_papers < 1:
+            return
+
+        async def budgeted() -> AsyncIterator[PaperID]:
+            paper_ids = self.stream_free_access_papers_async_iterator()
+            count = 0
+            try:
+                async for paper_id in paper_ids:
+                    if not self.quota.allows(priority):
+                        self._log("Stopping the prefetch, keeping the quota reserve")
+                        return
+                    yield paper_id
+                    count += 1
+                    if count == max_papers:
+                        return
+            finally:
+                await paper_ids.aclose()
+
+        async for item in self.get_graphs_async_iterator(
+            budgeted(),
+            fresh_only=fresh_only,
+            max_concurrency=max_concurrency,
+            priority=priority,
+            timeout=timeout,
+        ):
+            yield item
+
+    async def prefetch_free_access_papers_async(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_papers: Optional[int] = None,
+        fresh_only: bool = False,
+        priority: int = PRIORITY_LOW,
+        timeout: Optional[float] = None,
+    ) -> Dict[PaperID, GraphResponseStatuses]:
+        """
+        Prefetch the graphs of the free access papers into the client's
+        caches; see prefetch_free_access_papers_async_iterator.
+
+        Returns:
+            The final status of every prefetched paper
+        """
+        return {
+            paper_id: response.status
+            async for paper_id, response in (
+                self.prefetch_free_access_papers_async_iterator(
+                    max_concurrency, max_papers, fresh_only, priority, timeout
+                )
+            )
+        }
+
+    def prefetch_free_access_papers_sync(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_papers: Optional[int] = None,
+        fresh_only: bool = False,
+        priority: int = PRIORITY_LOW,
+        timeout: Optional[float] = None,
+    ) -> Dict[PaperID, GraphResponseStatuses]:
+        return self._run_sync(
+            self.prefetch_free_access_papers_async(
+                max_concurrency, max_papers, fresh_only, priority, timeout
+            )
+        )
@@ -0,0 +1,264 @@
+"""
+A deduplicated corpus of papers merged from many graphs.
+
+GraphCorpus ingests graphs one at a time and keeps a single record per paper,
+however many graphs it appears in, so its size grows with the number of unique
+papers rather than with the total size of the ingested graphs. The ingested
+Graph objects themselves are not retained.
+"""
+
+import dataclasses
+import enum
+import sys
+from typing import (
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
+
+from .graph import (
+    CommonAuthor,
+    CommonCitation,
+    CommonReference,
+    Edge,
+    Graph,
+    Paper,
+    PaperID,
+)
+
+R = TypeVar("R")
+
+EdgeKey = Tuple[PaperID, PaperID]
+
+
+class EdgeWeightPolicy(enum.Enum):
+    """How to combine the weights of an edge that appears in several graphs."""
+
+    MAX = "max"
+    MIN = "min"
+    MEAN = "mean"
+    SUM = "sum"
+    LAST = "last"
+
+
+@dataclasses.dataclass
+class CommonEntry(Generic[R]):
+    """A common citation, reference or author, aggregated over graphs."""
+
+    __slots__ = ("record", "graph_count", "count", "local_ids")
+
+    record: R  # As it appeared in the first graph that had it
+    graph_count: int  # Number of graphs it appeared in
+    count: int  # Total edges_count, or mentions for authors
+    local_ids: Set[PaperID]  # Corpus papers it cites, is cited by, or authored
+
+
+def _edge_key(source: PaperID, target: PaperID) -> EdgeKey:
+    return (source, target) if source <= target else (target, source)
+
+
+class GraphCorpus:
+    """
+    Papers, edges, and common citations, references and authors merged from
+    many graphs. Edges are undirected; when an edge appears in several graphs
+    its weights are combined according to `edge_policy`. An edge that a single
+    graph lists more than once counts as one appearance, with its first weight.
+
+    Paper records are shared: the graph-specific fields of a paper (path,
+    path_length and pos) are those of the first graph it appeared in.
+    """
+
+    def __init__(self, edge_policy: EdgeWeightPolicy = EdgeWeightPolicy.MAX) -> None:
+        self.edge_policy = edge_policy
+        self.papers: Dict[PaperID, Paper] = {}
+        self.paper_graph_counts: Dict[PaperID, int] = {}
+        self.seed_ids: List[PaperID] = []
+        self._seeds: Set[PaperID] = set()
+        self.common_citations: Dict[PaperID, CommonEntry[CommonCitation]] = {}
+        self.common_references: Dict[PaperID, CommonEntry[CommonReference]] = {}
+        self.common_authors: Dict[str, CommonEntry[CommonAuthor]] = {}
+        self._edge_weights: Dict[EdgeKey, float] = {}
+        self._edge_counts: Dict[EdgeKey, int] = {}
+
+    def add(self, graph: Graph) -> bool:
+        """
+        Merge a graph into the corpus.
+
+        Returns:
+            False, without changing the corpus, if a graph for the same start
+            paper was already added
+        """
+        if graph.start_id in self._seeds:
+            return False
+        self._seeds.add(graph.start_id)
+        self.seed_ids.append(sys.intern(graph.start_id))
+        self._add_papers(graph.nodes)
+        self._add_edges(graph.edges)
+        for citation in graph.common_citations:
+            self._add_common(
+                self.common_citations,
+                citation.paper_id,
+                citation,
+                citation.edges_count,
+                citation.local_references,
+            )
+        for reference in graph.common_references:
+            self._add_common(
+                self.common_references,
+                reference.paper_id,
+                reference,
+                reference.edges_count,
+                reference.local_citations,
+            )
+        for author in graph.common_authors:
+            self._add_common(
+                self.common_authors,
+                author.id,
+                author,
+                len(author.mentions),
+                author.mentions,
+            )
+        return True
+
+    def add_all(self, graphs: Iterable[Graph]) -> int:
+        """Merge graphs into the corpus, returning how many were added."""
+        return sum(self.add(graph) for graph in graphs)
+
+    def _add_papers(self, nodes: Dict[PaperID, Paper]) -> None:
+        papers = self.papers
+        counts = self.paper_graph_counts
+        for paper_id, paper in nodes.items():
+            count = counts.get(paper_id)
+            if count is None:
+                paper_id = sys.intern(paper_id)
+                papers[paper_id] = paper
+                counts[paper_id] = 1
+            else:
+                counts[paper_id] = count + 1
+
+    def _add_edges(self, edges: Iterable[Edge]) -> None:
+        # An edge listed more than once in a graph, such as in both directions,
+        # is counted once, with its first weight
+        graph_weights: Dict[EdgeKey, float] = {}
+        for source, target, edge_weight in edges:
+            key = _edge_key(self._intern_id(source), self._intern_id(target))
+            graph_weights.setdefault(key, cast(float, edge_weight))
+        weights = self._edge_weights
+        counts = self._edge_counts
+        policy = self.edge_policy
+        for key, weight in graph_weights.items():
+            previous = weights.get(key)
+            if previous is None:
+                weights[key] = weight
+                counts[key] = 1
+                continue
+            counts[key] += 1
+            if policy is EdgeWeightPolicy.MAX:
+                weights[key] = max(previous, weight)
+            elif policy is EdgeWeightPolicy.MIN:
+                weights[key] = min(previous, weight)
+            elif policy is EdgeWeightPolicy.LAST:
+                weights[key] = weight
+            else:  # SUM, and MEAN until the weights are read
+                weights[key] = previous + weight
+
+    def _intern_id(self, endpoint: Union[PaperID, float]) -> PaperID:
+        """Reuse the ID string already held by the corpus for a paper."""
+        paper_id = cast(PaperID, endpoint)
+        paper = self.papers.get(paper_id)
+        return sys.intern(paper_id) if paper is None else paper.id
+
+    @staticmethod
+    def _add_common(
+        entries: Dict[str, CommonEntry[R]],
+        key: str,
+        record: R,
+        count: int,
+        local_ids: Iterable[PaperID],
+    ) -> None:
+        entry = entries.get(key)
+        if entry is None:
+            entries[sys.intern(key)] = CommonEntry(
+                record=record,
+                graph_count=1,
+                count=count,
+                local_ids=set(local_ids),
+            )
+            return
+        entry.graph_count += 1
+        entry.count += count
+        entry.local_ids.update(local_ids)
+
+    def edge_weight(self, source: PaperID, target: PaperID) -> Optional[float]:
+        """The merged weight of the edge between two papers, if there is one."""
+        key = _edge_key(source, target)
+        weight = self._edge_weights.get(key)
+        if weight is not None and self.edge_policy is EdgeWeightPolicy.MEAN:
+            weight /= self._edge_counts[key]
+        return weight
+
+    def edges(self) -> List[Edge]:
+        """Merged edges, as [source, target, weight] lists."""
+        if self.edge_policy is EdgeWeightPolicy.MEAN:
+            counts = self._edge_counts
+            return [
+                [source, target, weight / counts[(source, target)]]
+                for (source, target), weight in self._edge_weights.items()
+            ]
+        return [
+            [source, target, weight]
+            for (source, target), weight in self._edge_weights.items()
+        ]
+
+    def edge_count(self, source: PaperID, target: PaperID) -> int:
+        """Number of graphs in which the edge between two papers appeared."""
+        return self._edge_counts.get(_edge_key(source, target), 0)
+
+    def top_common_citations(self, k: int = 10) -> List[CommonEntry[CommonCitation]]:
+        """The common citations that appeared in the most graphs."""
+        return _top(self.common_citations.values(), k)
+
+    def top_common_references(self, k: int = 10) -> List[CommonEntry[CommonReference]]:
+        """The common references that appeared in the most graphs."""
+        return _top(self.common_references.values(), k)
+
+    def top_common_authors(self, k: int = 10) -> List[CommonEntry[CommonAuthor]]:
+        """The common authors that appeared in the most graphs."""
+        return _top(self.common_authors.values(), k)
+
+    def to_graph(self) -> Graph:
+        """
+        The corpus as a single Graph, starting at the first seed paper, for use
+        with analysis.graph_index(). It has no path_lengths, since those are
+        relative to one start paper.
+        """
+        return Graph(
+            common_authors=[entry.record for entry in self.common_authors.values()],
+            common_citations=[entry.record for entry in self.common_citations.values()],
+            common_references=[
+                entry.record for entry in self.common_references.values()
+            ],
+            edges=self.edges(),
+            nodes=dict(self.papers),
+            path_lengths={},
+            start_id=self.seed_ids[0] if self.seed_ids else "",
+        )
+
+    def __len__(self) -> int:
+        return len(self.papers)
+
+    def __contains__(self, paper_id: object) -> bool:
+        return paper_id in self.papers
+
+
+def _top(entries: Iterable[CommonEntry[R]], k: int) -> List[CommonEntry[R]]:
+    return sorted(
+        entries, key=lambda entry: (entry.graph_count, entry.count), reverse=True
+    )[:k]
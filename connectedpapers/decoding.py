@@ -0,0 +1,335 @@
+"""
+Fast decoding of API payloads into the dataclasses of graph.py.
+
+Rather than reflecting over the type hints on every call as dacite does, a
+constructor is compiled once per dataclass from its fields, and decoding is a
+plain function call per object. The payload is trusted to match the types;
+only missing required keys are reported, as a KeyError.
+
+Papers can also be decoded partially, see decode_graph(): the fields that
+aren't decoded are either kept raw and decoded on first access (lazy), or
+dropped (a projection).
+
+JSON is parsed with orjson when it is installed, and with json otherwise.
+"""
+
+import dataclasses
+import importlib
+import json
+import threading
+import typing
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    FrozenSet,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
+
+from .graph import CommonCitation, CommonReference, Graph, Paper
+
+try:
+    _orjson: Any = importlib.import_module("orjson")
+except ImportError:
+    _orjson = None
+
+T = TypeVar("T")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Parse a JSON document, using orjson if it is installed."""
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+_decoders: Dict[type, Callable[[Dict[str, Any]], Any]] = {}
+
+
+Decoders = Mapping[type, Callable[[Dict[str, Any]], Any]]
+
+
+def _value_expression(
+    tp: Any,
+    value: str,
+    namespace: Dict[str, Any],
+    depth: int = 0,
+    decoders: Decoders = {},
+) -> str:
+    """
+    Return a Python expression that decodes the JSON value `value` as `tp`.
+    Dataclasses are decoded with their decoder in `decoders` if they have one,
+    and with decoder_for() otherwise.
+    """
+    if dataclasses.is_dataclass(tp) and isinstance(tp, type):
+        name = f"_decode_{tp.__name__}"
+        namespace[name] = decoders[tp] if tp in decoders else decoder_for(tp)
+        return f"{name}({value})"
+    origin = typing.get_origin(tp)
+    args = typing.get_args(tp)
+    item = f"_v{depth}"
+    if origin is Union:
+        non_none = [arg for arg in args if arg is not type(None)]
+        if len(non_none) == 1 and len(args) == 2:
+            inner = _value_expression(non_none[0], item, namespace, depth + 1, decoders)
+            if inner != item:
+                name = f"_optional_{depth}_{len(namespace)}"
+                namespace[name] = eval(
+                    f"lambda {item}: None if {item} is None else {inner}", namespace
+                )
+                return f"{name}({value})"
+        return value
+    if origin is list:
+        inner = _value_expression(args[0], item, namespace, depth + 1, decoders)
+        return value if inner == item else f"[{inner} for {item} in {value}]"
+    if origin is dict:
+        inner = _value_expression(args[1], item, namespace, depth + 1, decoders)
+        if inner == item:
+            return value
+        return f"{{_k{depth}: {inner} for _k{depth}, {item} in {value}.items()}}"
+    return value
+
+
+def _is_optional(tp: Any) -> bool:
+    return typing.get_origin(tp) is Union and type(None) in typing.get_args(tp)
+
+
+def _field_value(name: str, tp: Any) -> str:
+    # Like dacite, missing Optional fields decode as None
+    return f"d.get({name!r})" if _is_optional(tp) else f"d[{name!r}]"
+
+
+def _compile_decoder(
+    cls: type, decoders: Decoders = {}
+) -> Callable[[Dict[str, Any]], Any]:
+    hints = typing.get_type_hints(cls)
+    namespace: Dict[str, Any] = {"_cls": cls}
+    arguments: List[str] = []
+    for field in dataclasses.fields(cls):
+        tp = hints[field.name]
+        value = _field_value(field.name, tp)
+        arguments.append(_value_expression(tp, value, namespace, 0, decoders))
+    source = f"def _decode(d):\n    return _cls({', '.join(arguments)})\n"
+    exec(source, namespace)
+    decoder: Callable[[Dict[str, Any]], Any] = namespace["_decode"]
+    return decoder
+
+
+def decoder_for(cls: Type[T]) -> Callable[[Dict[str, Any]], T]:
+    """Return the compiled decoder of a dataclass, compiling it on first use."""
+    decoder = _decoders.get(cls)
+    if decoder is None:
+        decoder = _decoders[cls] = _compile_decoder(cls)
+    return decoder
+
+
+# The fields of papers that hold most of their size and decoding time
+HEAVY_FIELDS = frozenset({"abstract", "authors", "externalIds", "pdfUrls", "tldr"})
+
+
+# Serializes the decoding of lazy fields, so that papers shared between threads
+# decode each field once
+_lazy_lock = threading.Lock()
+
+
+class _LazyFields:
+    """
+    The fields of a partially decoded paper that weren't decoded are unset
+    slots. When one is accessed, it is decoded from `_raw`, which holds their
+    JSON values, or, for a projection, `_raw` is None and it raises an
+    AttributeError.
+    """
+
+    __slots__ = ()
+
+    _raw: Optional[Dict[str, Any]]
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            raw = object.__getattribute__(self, "_raw")
+        except AttributeError:
+            raw = None
+        if raw is None or name not in raw:
+            if name in _field_types(type(self)):
+                raise AttributeError(
+                    f"{type(self).__name__}.{name} wasn't decoded, "
+                    "because it isn't in paper_fields"
+                )
+            raise AttributeError(name)
+        with _lazy_lock:
+            try:  # Decoded by another thread in the meantime
+                return object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+            value = _field_decoder(type(self), name)(raw[name])
+            setattr(self, name, value)
+            del raw[name]
+        return value
+
+    def is_loaded(self, name: str) -> bool:
+        """Whether a field was decoded, so that accessing it is free."""
+        try:
+            object.__getattribute__(self, name)
+        except AttributeError:
+            return False
+        return True
+
+    def __eq__(self, other: Any) -> bool:
+        # Equal to the fully decoded paper, which compares as its dataclass
+        base = _paper_class(type(self))
+        if not isinstance(other, base):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name)
+            for name in _field_types(type(self))
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{name}={getattr(self, name)!r}" if self.is_loaded(name) else f"{name}=..."
+            for name in _field_types(type(self))
+        )
+        return f"{type(self).__name__}({fields})"
+
+
+class LazyPaper(_LazyFields, Paper):
+    """A partially decoded Paper, see decode_graph()"""
+
+    __slots__ = ("_raw",)
+
+
+class LazyCommonCitation(_LazyFields, CommonCitation):
+    """A partially decoded CommonCitation, see decode_graph()"""
+
+    __slots__ = ("_raw",)
+
+
+class LazyCommonReference(_LazyFields, CommonReference):
+    """A partially decoded CommonReference, see decode_graph()"""
+
+    __slots__ = ("_raw",)
+
+
+_LAZY_CLASSES: Dict[type, type] = {
+    Paper: LazyPaper,
+    CommonCitation: LazyCommonCitation,
+    CommonReference: LazyCommonReference,
+}
+
+_field_types_cache: Dict[type, Dict[str, Any]] = {}
+_field_decoders: Dict[Tuple[type, str], Callable[[Any], Any]] = {}
+
+
+def _paper_fields() -> FrozenSet[str]:
+    """The names of the fields of all paper classes."""
+    return frozenset(name for cls in _LAZY_CLASSES for name in _field_types(cls))
+
+
+def _paper_class(lazy_cls: type) -> type:
+    return next(cls for cls in _LAZY_CLASSES if issubclass(lazy_cls, cls))
+
+
+def _field_types(cls: type) -> Dict[str, Any]:
+    """The type of each field of a dataclass, in field order."""
+    types = _field_types_cache.get(cls)
+    if types is None:
+        hints = typing.get_type_hints(cls)
+        types = _field_types_cache[cls] = {
+            field.name: hints[field.name] for field in dataclasses.fields(cls)
+        }
+    return types
+
+
+def _field_decoder(cls: type, name: str) -> Callable[[Any], Any]:
+    """A compiled decoder of the JSON value of one field of a dataclass."""
+    decoder = _field_decoders.get((cls, name))
+    if decoder is None:
+        namespace: Dict[str, Any] = {}
+        expression = _value_expression(_field_types(cls)[name], "v", namespace)
+        decoder = _field_decoders[cls, name] = eval(
+            f"lambda v: {expression}", namespace
+        )
+    return decoder
+
+
+def _compile_partial_decoder(
+    cls: type, decoded: FrozenSet[str], lazy: bool
+) -> Callable[[Dict[str, Any]], Any]:
+    """
+    Compile a decoder of the paper class cls that only decodes the `decoded`
+    fields, and keeps the JSON values of the others if lazy.
+    """
+    lazy_cls = _LAZY_CLASSES[cls]
+    namespace: Dict[str, Any] = {"_cls": lazy_cls, "_new": lazy_cls.__new__}
+    lines = ["def _decode(d):", "    p = _new(_cls)"]
+    raw: List[str] = []
+    for name, tp in _field_types(cls).items():
+        value = _field_value(name, tp)
+        if name in decoded:
+            lines.append(f"    p.{name} = {_value_expression(tp, value, namespace)}")
+        elif lazy:
+            raw.append(f"{name!r}: {value}")
+    lines.append(f"    p._raw = {{{', '.join(raw)}}}" if lazy else "    p._raw = None")
+    lines.append("    return p")
+    exec("\n".join(lines) + "\n", namespace)
+    decoder: Callable[[Dict[str, Any]], Any] = namespace["_decode"]
+    return decoder
+
+
+_graph_decoders: Dict[
+    Tuple[FrozenSet[str], bool], Callable[[Dict[str, Any]], Graph]
+] = {}
+
+
+def _partial_graph_decoder(
+    decoded: FrozenSet[str], lazy: bool
+) -> Callable[[Dict[str, Any]], Graph]:
+    decoder = _graph_decoders.get((decoded, lazy))
+    if decoder is None:
+        decoders = {
+            cls: _compile_partial_decoder(cls, decoded, lazy) for cls in _LAZY_CLASSES
+        }
+        decoder = _graph_decoders[decoded, lazy] = _compile_decoder(Graph, decoders)
+    return decoder
+
+
+def decode_graph(
+    data: Dict[str, Any],
+    paper_fields: Optional[Collection[str]] = None,
+    lazy: bool = False,
+) -> Graph:
+    """
+    Decode a graph_json dictionary into a Graph.
+
+    The papers of the graph (its nodes, common citations and common references)
+    can be decoded partially, which is faster, and takes less memory for a
+    projection. Partially decoded papers are LazyPaper, LazyCommonCitation and
+    LazyCommonReference objects, which are instances of the paper classes,
+    and compare equal to the fully decoded papers.
+
+    Args:
+        data: The graph_json dictionary
+        paper_fields: The fields of papers to decode, for a projection (None
+                      for all of them, or, if lazy, for those not in
+                      HEAVY_FIELDS). Accessing another field raises an
+                      AttributeError, unless lazy.
+        lazy: Keep the fields of papers that aren't decoded as JSON values,
+              and decode them on first access
+    """
+    if paper_fields is None:
+        if not lazy:
+            return decoder_for(Graph)(data)
+        paper_fields = _paper_fields() - HEAVY_FIELDS
+    unknown = set(paper_fields) - _paper_fields()
+    if unknown:
+        raise ValueError(f"Unknown paper fields: {', '.join(sorted(unknown))}")
+    return _partial_graph_decoder(frozenset(paper_fields), lazy)(data)
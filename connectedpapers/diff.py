@@ -0,0 +1,200 @@
+"""
+Versions and diffs of graphs, for refreshing a graph that is already held.
+
+graph_version() is a hash of the content of a graph, which the client sends in
+If-None-Match when it refreshes a graph (see
+ConnectedPapersClient.refresh_graph_async). It is computed once per graph
+object, and the client records the version the server sent (the ETag) with
+every graph it receives, so that refreshing doesn't hash the graph; graphs
+should not be mutated after that. The server answers 304 Not Modified
+if the graph didn't change, or, since the client also sends `A-IM: graph-diff`
+(delta encoding, RFC 3229), it may answer 226 IM Used with a patch made by
+make_patch() instead of the whole graph. apply_patch() applies it locally.
+
+diff_graphs() and apply_patch() describe what changed as a GraphDiff, so that
+incremental indexers only reprocess the papers and edges that changed.
+"""
+
+import dataclasses
+import hashlib
+import json
+import weakref
+from typing import Any, Dict, List, Set, Tuple
+
+from .decoding import decoder_for
+from .graph import (
+    CommonAuthor,
+    CommonCitation,
+    CommonReference,
+    Edge,
+    Graph,
+    Paper,
+    PaperID,
+)
+
+GRAPH_DIFF = "graph-diff"  # The instance manipulation of graph patches
+
+EdgeTuple = Tuple[Any, ...]
+
+
+@dataclasses.dataclass
+class GraphDiff:
+    """What changed between two versions of a graph."""
+
+    added_papers: List[PaperID] = dataclasses.field(default_factory=list)
+    removed_papers: List[PaperID] = dataclasses.field(default_factory=list)
+    changed_papers: List[PaperID] = dataclasses.field(default_factory=list)
+    added_edges: List[Edge] = dataclasses.field(default_factory=list)
+    removed_edges: List[Edge] = dataclasses.field(default_factory=list)
+
+    @property
+    def empty(self) -> bool:
+        return not (
+            self.added_papers
+            or self.removed_papers
+            or self.changed_papers
+            or self.added_edges
+            or self.removed_edges
+        )
+
+
+def _to_json(value: Any) -> Any:
+    # Compact graphs hold their edges and positions in sequence views
+    return json.loads(json.dumps(dataclasses.asdict(value), default=list))
+
+
+_versions: Dict[int, str] = {}
+
+
+def set_graph_version(graph: Graph, version: str) -> None:
+    """Record the version of a graph, such as the ETag it was received with."""
+    if id(graph) not in _versions:
+        weakref.finalize(graph, _versions.pop, id(graph), None)
+    _versions[id(graph)] = version
+
+
+def graph_version(graph: Graph) -> str:
+    """
+    A hash of the content of a graph, which changes whenever any of it does,
+    except for the order of its papers and edges. It is cached for the
+    lifetime of the graph.
+
+    Raises:
+        ValueError: For a projection (see decoding.decode_graph) that wasn't
+                    received with its version, since it lacks the fields to hash
+    """
+    version = _versions.get(id(graph))
+    if version is None:
+        try:
+            data = dataclasses.asdict(graph)
+        except AttributeError as e:
+            raise ValueError(f"Can't compute the version of a projection: {e}") from e
+        data["edges"] = sorted(tuple(edge) for edge in graph.edges)
+        text = json.dumps(data, default=list, sort_keys=True, separators=(",", ":"))
+        version = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        set_graph_version(graph, version)
+    return version
+
+
+def _edge_tuples(graph: Graph) -> Set[EdgeTuple]:
+    return {tuple(edge) for edge in graph.edges}
+
+
+def _edge_changes(old: Graph, new: Graph) -> Tuple[List[Edge], List[Edge]]:
+    old_edges = _edge_tuples(old)
+    new_edges = _edge_tuples(new)
+    added = [list(edge) for edge in new.edges if tuple(edge) not in old_edges]
+    removed = [list(edge) for edge in old.edges if tuple(edge) not in new_edges]
+    return added, removed
+
+
+def diff_graphs(old: Graph, new: Graph) -> GraphDiff:
+    """The papers and edges that were added, removed or changed from old to new."""
+    added_edges, removed_edges = _edge_changes(old, new)
+    return GraphDiff(
+        added_papers=[paper_id for paper_id in new.nodes if paper_id not in old.nodes],
+        removed_papers=[
+            paper_id for paper_id in old.nodes if paper_id not in new.nodes
+        ],
+        changed_papers=[
+            paper_id
+            for paper_id, paper in new.nodes.items()
+            if paper_id in old.nodes and old.nodes[paper_id] != paper
+        ],
+        added_edges=added_edges,
+        removed_edges=removed_edges,
+    )
+
+
+def make_patch(old: Graph, new: Graph) -> Dict[str, Any]:
+    """
+    A JSON patch from old to new: the added and changed papers in full, the IDs
+    of the removed papers, the added and removed edges, and the other fields of
+    the graph, which are small, in full.
+    """
+    diff = diff_graphs(old, new)
+    return {
+        "base": graph_version(old),
+        "version": graph_version(new),
+        "nodes": {
+            paper_id: _to_json(new.nodes[paper_id])
+            for paper_id in diff.added_papers + diff.changed_papers
+        },
+        "removed_nodes": diff.removed_papers,
+        "added_edges": diff.added_edges,
+        "removed_edges": diff.removed_edges,
+        "path_lengths": dict(new.path_lengths),
+        "start_id": new.start_id,
+        "common_authors": [_to_json(author) for author in new.common_authors],
+        "common_citations": [_to_json(paper) for paper in new.common_citations],
+        "common_references": [_to_json(paper) for paper in new.common_references],
+    }
+
+
+def apply_patch(graph: Graph, patch: Dict[str, Any]) -> Tuple[Graph, GraphDiff]:
+    """
+    Apply a patch made by make_patch() to the graph it was made from.
+
+    Returns:
+        A new graph, which shares the unchanged papers of the given one (which
+        isn't modified), and what changed
+
+    Raises:
+        ValueError: If the patch wasn't made from this graph, or the patched
+                    graph doesn't match the version of the patch
+    """
+    if patch["base"] != graph_version(graph):
+        raise ValueError("The patch was made from another version of the graph")
+    decode_paper = decoder_for(Paper)
+    nodes = dict(graph.nodes)
+    for paper_id in patch["removed_nodes"]:
+        del nodes[paper_id]
+    diff = GraphDiff(removed_papers=list(patch["removed_nodes"]))
+    for paper_id, data in patch["nodes"].items():
+        (diff.changed_papers if paper_id in nodes else diff.added_papers).append(
+            paper_id
+        )
+        nodes[paper_id] = decode_paper(data)
+    removed_edges = {tuple(edge) for edge in patch["removed_edges"]}
+    edges = [list(edge) for edge in graph.edges if tuple(edge) not in removed_edges]
+    edges.extend(patch["added_edges"])
+    diff.added_edges = list(patch["added_edges"])
+    diff.removed_edges = list(patch["removed_edges"])
+    patched = Graph(
+        common_authors=[
+            decoder_for(CommonAuthor)(data) for data in patch["common_authors"]
+        ],
+        common_citations=[
+            decoder_for(CommonCitation)(data) for data in patch["common_citations"]
+        ],
+        common_references=[
+            decoder_for(CommonReference)(data) for data in patch["common_references"]
+        ],
+        edges=edges,
+        nodes=nodes,
+        path_lengths=dict(patch["path_lengths"]),
+        start_id=patch["start_id"],
+    )
+    if graph_version(patched) != patch["version"]:
+        raise ValueError("The patched graph doesn't match the version of the patch")
+    return patched, diff
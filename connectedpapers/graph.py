@@ -6,6 +6,8 @@ PaperID = str
 
 @dataclasses.dataclass
 class CommonAuthor:
+    __slots__ = ("id", "mention_indexes", "mentions", "name", "url")
+
     id: str
     mention_indexes: List[int]
     mentions: List[PaperID]
@@ -15,12 +17,25 @@ class CommonAuthor:
 
 @dataclasses.dataclass
 class PaperAuthor:
+    __slots__ = ("ids", "name")
+
     ids: List[Optional[str]]
     name: str
 
 
 @dataclasses.dataclass
 class ExternalIDs:
+    __slots__ = (
+        "ACL",
+        "ArXiv",
+        "CorpusId",
+        "DBLP",
+        "DOI",
+        "MAG",
+        "PubMed",
+        "PubMedCentral",
+    )
+
     ACL: Optional[str]
     ArXiv: Optional[str]
     CorpusId: Any
@@ -33,6 +48,33 @@ class ExternalIDs:
 
 @dataclasses.dataclass
 class BasePaper:
+    __slots__ = (
+        "abstract",
+        "arxivId",
+        "authors",
+        "corpusid",
+        "doi",
+        "externalIds",
+        "fieldsOfStudy",
+        "id",
+        "isOpenAccess",
+        "journalName",
+        "journalPages",
+        "journalVolume",
+        "magId",
+        "number_of_authors",
+        "paperId",
+        "pdfUrls",
+        "pmid",
+        "publicationDate",
+        "publicationTypes",
+        "title",
+        "tldr",
+        "url",
+        "venue",
+        "year",
+    )
+
     abstract: Optional[str]
     arxivId: Optional[str]
     authors: List[PaperAuthor]
@@ -61,6 +103,8 @@ class BasePaper:
 
 @dataclasses.dataclass
 class CommonCitation(BasePaper):
+    __slots__ = ("edges_count", "local_references", "paper_id", "pi_name")
+
     edges_count: int
     local_references: List[PaperID]
     paper_id: PaperID
@@ -69,6 +113,8 @@ class CommonCitation(BasePaper):
 
 @dataclasses.dataclass
 class CommonReference(BasePaper):
+    __slots__ = ("edges_count", "local_citations", "paper_id", "pi_name")
+
     edges_count: int
     local_citations: List[PaperID]
     paper_id: PaperID
@@ -80,6 +126,8 @@ Edge = List[Union[PaperID, float]]  # [PaperID, PaperID, float]
 
 @dataclasses.dataclass
 class Paper(BasePaper):
+    __slots__ = ("path", "path_length", "pos")
+
     path: List[PaperID]
     path_length: float
     pos: List[float]  # [float, float]
@@ -94,3 +142,18 @@ class Graph:
     nodes: Dict[PaperID, Paper]
     path_lengths: Dict[PaperID, float]
     start_id: PaperID
+
+    def to_bytes(
+        self, codec: Optional[str] = None, compression: Optional[str] = None
+    ) -> bytes:
+        """Serialize the graph to the compact binary format of serialization.py."""
+        from . import serialization
+
+        return serialization.to_bytes(self, codec, compression)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Graph":
+        """Deserialize a graph written by to_bytes()."""
+        from . import serialization
+
+        return serialization.from_bytes(data, Graph)
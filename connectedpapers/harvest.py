@@ -0,0 +1,439 @@
+"""
+Fetching the graphs of many papers, spread over worker processes, with
+checkpointing so that an interrupted run can be resumed.
+
+Paper IDs are split into shards by a stable hash, and each shard belongs to a
+single worker process, which appends the graphs it fetched to the shard's file,
+shards/NNN.jsonl in the output directory. Every worker runs its own async
+client, so responses are decoded on all cores rather than on a single event
+loop. The concurrency and request rate are divided between the workers, and a
+budget of papers to fetch is shared by all of them.
+
+The parent process records the final status of every paper in
+checkpoint.jsonl. A later run with the same output directory skips the papers
+that were completed (FRESH_GRAPH, OLD_GRAPH, or a permanent BAD_ID/NOT_IN_DB),
+and fetches the others again.
+
+Run it as `python -m connectedpapers harvest IDS_FILE --output DIR`.
+"""
+
+import asyncio
+import dataclasses
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import zlib
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Counter,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .connected_papers_client import ConnectedPapersClient, GraphResponseStatuses
+from .consts import ACCESS_TOKEN, CONNECTED_PAPERS_REST_API
+from .decoding import decode_graph, loads
+from .graph import Graph, PaperID
+
+CHECKPOINT_FILE = "checkpoint.jsonl"
+SHARDS_DIRECTORY = "shards"
+DEFAULT_SHARDS = 64
+DEFAULT_CONCURRENCY = 20
+# How often the parent checks that its workers are still alive, in seconds
+WORKER_CHECK_INTERVAL = 1.0
+
+COMPLETE_STATUSES = {
+    GraphResponseStatuses.FRESH_GRAPH,
+    GraphResponseStatuses.OLD_GRAPH,
+    GraphResponseStatuses.BAD_ID,
+    GraphResponseStatuses.NOT_IN_DB,
+}
+
+
+@dataclasses.dataclass
+class HarvestOptions:
+    """Settings of a harvest, shared by all its workers."""
+
+    output: str
+    access_token: str = ACCESS_TOKEN
+    server_addr: str = CONNECTED_PAPERS_REST_API
+    fresh_only: bool = True
+    workers: int = 1
+    concurrency: int = DEFAULT_CONCURRENCY  # Total, over all workers
+    requests_per_minute: Optional[float] = None  # Total, over all workers
+    max_papers: Optional[int] = None  # Papers this run may start fetching
+    quota_reserve: Optional[int] = None
+    shards: int = DEFAULT_SHARDS
+    verbose: bool = False  # Print the progress messages of the clients
+
+
+@dataclasses.dataclass
+class HarvestSummary:
+    skipped: int = 0  # Already complete in the checkpoint
+    statuses: Counter[str] = dataclasses.field(default_factory=Counter)
+    not_started: int = 0  # Left over when the paper budget ran out
+
+    @property
+    def completed(self) -> int:
+        return sum(self.statuses[status.value] for status in COMPLETE_STATUSES)
+
+    @property
+    def failed(self) -> int:
+        return sum(self.statuses.values()) - self.completed
+
+
+def shard_of(paper_id: PaperID, shards: int) -> int:
+    """The shard of a paper; stable across processes and runs, unlike hash()."""
+    return zlib.crc32(paper_id.encode("utf-8")) % shards
+
+
+def shard_path(output: str, shard: int) -> str:
+    return os.path.join(output, SHARDS_DIRECTORY, f"{shard:03d}.jsonl")
+
+
+def _jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """The records of a JSON lines file, ignoring a line cut short by a crash."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as file:
+        for line in file:
+            try:
+                yield loads(line)
+            except ValueError:
+                continue
+
+
+def _open_append(path: str) -> IO[str]:
+    """Open a JSON lines file for appending, after any line cut short by a crash."""
+    cut_short = False
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, "rb") as existing:
+            existing.seek(-1, os.SEEK_END)
+            cut_short = existing.read(1) != b"\n"
+    file = open(path, "a", encoding="utf-8")
+    if cut_short:
+        file.write("\n")
+    return file
+
+
+def read_checkpoint(output: str) -> Dict[PaperID, GraphResponseStatuses]:
+    """The last recorded status of every paper of previous runs."""
+    statuses: Dict[PaperID, GraphResponseStatuses] = {}
+    for record in _jsonl(os.path.join(output, CHECKPOINT_FILE)):
+        statuses[record["paper_id"]] = GraphResponseStatuses(record["status"])
+    return statuses
+
+
+def iter_graphs(output: str) -> Iterator[Tuple[PaperID, Graph]]:
+    """
+    The graphs stored by harvests in an output directory. A paper fetched by
+    several runs appears several times, in the order the runs fetched it.
+    """
+    directory = os.path.join(output, SHARDS_DIRECTORY)
+    if not os.path.isdir(directory):
+        return
+    for name in sorted(os.listdir(directory)):
+        for record in _jsonl(os.path.join(directory, name)):
+            yield record["paper_id"], decode_graph(record["graph_json"])
+
+
+def read_paper_ids(lines: Iterable[str]) -> List[PaperID]:
+    """Paper IDs, one per line, without blank lines and duplicates."""
+    seen: Set[PaperID] = set()
+    paper_ids: List[PaperID] = []
+    for line in lines:
+        paper_id = line.strip()
+        if paper_id and paper_id not in seen:
+            seen.add(paper_id)
+            paper_ids.append(paper_id)
+    return paper_ids
+
+
+class _Budget:
+    """
+    A number of papers to fetch, shared between processes. A paper may take
+    several requests, to poll its graph or to retry, and counts once.
+    """
+
+    def __init__(self, papers: Optional[int], context: Any) -> None:
+        # The value must come from the context of the processes it's shared with
+        self._remaining: Any = None if papers is None else context.Value("q", papers)
+
+    def take(self) -> bool:
+        if self._remaining is None:
+            return True
+        with self._remaining.get_lock():
+            if self._remaining.value <= 0:
+                return False
+            self._remaining.value -= 1
+            return True
+
+
+async def _harvest_worker(
+    paper_ids: List[PaperID],
+    options: HarvestOptions,
+    budget: _Budget,
+    report: Callable[[PaperID, str], None],
+) -> None:
+    workers = options.workers
+    requests_per_minute = options.requests_per_minute
+    client = ConnectedPapersClient(
+        access_token=options.access_token,
+        server_addr=options.server_addr,
+        memory_cache_size=0,
+        requests_per_minute=(
+            None if requests_per_minute is None else requests_per_minute / workers
+        ),
+        quota_reserve=options.quota_reserve,
+        verbose=options.verbose,
+    )
+
+    def budgeted() -> Iterator[PaperID]:
+        # Consumed lazily, as the client starts each request
+        for paper_id in paper_ids:
+            if not budget.take():
+                return
+            yield paper_id
+
+    files: Dict[int, IO[str]] = {}
+    try:
+        async with client:
+            async for paper_id, response in client.get_graphs_async_iterator(
+                budgeted(),
+                fresh_only=options.fresh_only,
+                max_concurrency=max(1, options.concurrency // workers),
+            ):
+                if response.graph_json is not None:
+                    _store(
+                        files, options, paper_id, response.status, response.graph_json
+                    )
+                report(paper_id, response.status.value)
+    finally:
+        for file in files.values():
+            file.close()
+
+
+def _store(
+    files: Dict[int, IO[str]],
+    options: HarvestOptions,
+    paper_id: PaperID,
+    status: GraphResponseStatuses,
+    graph: Graph,
+) -> None:
+    shard = shard_of(paper_id, options.shards)
+    file = files.get(shard)
+    if file is None:
+        file = files[shard] = _open_append(shard_path(options.output, shard))
+    record = {
+        "paper_id": paper_id,
+        "status": status.value,
+        "graph_json": dataclasses.asdict(graph),
+    }
+    # Compact graphs hold their edges and positions in sequence views
+    file.write(json.dumps(record, default=list) + "\n")
+    file.flush()
+
+
+def _worker_process(
+    paper_ids: List[PaperID],
+    options: HarvestOptions,
+    budget: _Budget,
+    results: "multiprocessing.Queue[Optional[Tuple[PaperID, str]]]",
+) -> None:
+    try:
+        asyncio.run(
+            _harvest_worker(
+                paper_ids,
+                options,
+                budget,
+                lambda paper_id, status: results.put((paper_id, status)),
+            )
+        )
+    finally:
+        results.put(None)
+
+
+def harvest(
+    paper_ids: Iterable[PaperID],
+    options: HarvestOptions,
+    on_result: Optional[Callable[[PaperID, GraphResponseStatuses], None]] = None,
+) -> HarvestSummary:
+    """
+    Fetch the graphs of paper_ids into options.output, skipping the papers
+    completed by previous runs. With more than one worker, the papers are
+    fetched by that many processes.
+    """
+    os.makedirs(os.path.join(options.output, SHARDS_DIRECTORY), exist_ok=True)
+    summary = HarvestSummary()
+    done = read_checkpoint(options.output)
+    todo = []
+    for paper_id in paper_ids:
+        if done.get(paper_id) in COMPLETE_STATUSES:
+            summary.skipped += 1
+        else:
+            todo.append(paper_id)
+    workers = max(1, min(options.workers, len(todo)))
+    # Each shard is written by one worker only
+    assigned: List[List[PaperID]] = [[] for _ in range(workers)]
+    for paper_id in todo:
+        assigned[shard_of(paper_id, options.shards) % workers].append(paper_id)
+    options = dataclasses.replace(options, workers=workers)
+    # Workers run an event loop and threads of their own, which don't survive fork
+    context = multiprocessing.get_context("spawn")
+    budget = _Budget(options.max_papers, context)
+
+    with _open_append(os.path.join(options.output, CHECKPOINT_FILE)) as checkpoint:
+
+        def record(paper_id: PaperID, status: str) -> None:
+            checkpoint.write(json.dumps({"paper_id": paper_id, "status": status}))
+            checkpoint.write("\n")
+            checkpoint.flush()
+            summary.statuses[status] += 1
+            if on_result is not None:
+                on_result(paper_id, GraphResponseStatuses(status))
+
+        if workers == 1:
+            asyncio.run(_harvest_worker(todo, options, budget, record))
+        else:
+            _run_processes(context, assigned, options, budget, record)
+    summary.not_started = len(todo) - sum(summary.statuses.values())
+    return summary
+
+
+def _run_processes(
+    context: Any,
+    assigned: List[List[PaperID]],
+    options: HarvestOptions,
+    budget: _Budget,
+    record: Callable[[PaperID, str], None],
+) -> None:
+    results: "multiprocessing.Queue[Optional[Tuple[PaperID, str]]]" = context.Queue()
+    processes = [
+        context.Process(
+            target=_worker_process,
+            args=(paper_ids, options, budget, results),
+            daemon=True,
+        )
+        for paper_ids in assigned
+    ]
+    for process in processes:
+        process.start()
+    running = len(processes)
+    try:
+        while running > 0:
+            try:
+                item = results.get(timeout=WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    break  # A worker died without saying so
+                continue
+            if item is None:
+                running -= 1
+            else:
+                record(*item)
+    finally:
+        for process in processes:
+            process.join(WORKER_CHECK_INTERVAL)
+            if process.is_alive():
+                process.terminate()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m connectedpapers harvest",
+        description="Fetch the graphs of many papers, resuming previous runs",
+    )
+    parser.add_argument(
+        "input", help="File with one paper ID per line, or - for standard input"
+    )
+    parser.add_argument("--output", required=True, help="Output directory")
+    parser.add_argument("--api-key", default=ACCESS_TOKEN)
+    parser.add_argument("--server", default=CONNECTED_PAPERS_REST_API)
+    parser.add_argument(
+        "--accept-old",
+        action="store_true",
+        help="Accept old graphs instead of requesting fresh ones",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="Worker processes"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Graphs fetched at the same time, over all workers",
+    )
+    parser.add_argument(
+        "--requests-per-minute",
+        type=float,
+        default=None,
+        help="Limit on the request rate, over all workers",
+    )
+    parser.add_argument(
+        "--max-papers",
+        type=int,
+        default=None,
+        help="Maximum number of papers this run starts fetching, over all "
+        "workers. Polling a graph that is being built, and retrying after "
+        "errors, take more requests per paper.",
+    )
+    parser.add_argument(
+        "--quota-reserve",
+        type=int,
+        default=None,
+        help="Stop requesting graphs once this many requests remain in the quota",
+    )
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS)
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Print the final status of every paper, and the progress messages "
+        "of the clients of all workers",
+    )
+    args = parser.parse_args(argv)
+
+    if args.input == "-":
+        paper_ids = read_paper_ids(sys.stdin)
+    else:
+        with open(args.input, encoding="utf-8") as file:
+            paper_ids = read_paper_ids(file)
+
+    def on_result(paper_id: PaperID, status: GraphResponseStatuses) -> None:
+        if args.verbose:
+            print(f"{paper_id} {status.value}", file=sys.stderr)
+
+    summary = harvest(
+        paper_ids,
+        HarvestOptions(
+            output=args.output,
+            access_token=args.api_key,
+            server_addr=args.server,
+            fresh_only=not args.accept_old,
+            workers=args.workers,
+            concurrency=args.concurrency,
+            requests_per_minute=args.requests_per_minute,
+            max_papers=args.max_papers,
+            quota_reserve=args.quota_reserve,
+            shards=args.shards,
+            verbose=args.verbose,
+        ),
+        on_result,
+    )
+    print(
+        f"Completed: {summary.completed}, failed: {summary.failed}, "
+        f"skipped: {summary.skipped}, not started: {summary.not_started}"
+    )
+    for status, count in sorted(summary.statuses.items()):
+        print(f"  {status}: {count}")
+    return 0 if summary.failed == 0 and summary.not_started == 0 else 1
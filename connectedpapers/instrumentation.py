@@ -0,0 +1,293 @@
+"""
+Instrumentation of the client's requests, polls and retries.
+
+The client reports what it does as spans (timed phases, such as an HTTP
+request or a wait between status checks) and counters (such as the bytes
+received, or the number of OVERLOADED responses), to a list of Observers. Every
+client has a MetricsRegistry among its observers, which aggregates spans into
+latency histograms and sums counters, in process. OpenTelemetryObserver
+forwards spans to an OpenTelemetry tracer.
+
+Spans reported by get_graph_async_iterator:
+* graph: one call, from the first cache lookup to the last response
+* graph.fetch: the upstream polling of a graph, shared by coalesced calls
+* graph.wait.<status>: the wait before the next status check, after a QUEUED,
+  IN_PROGRESS or OLD_GRAPH response
+* graph.backoff.overloaded, graph.backoff.error: the waits before retries
+* http.rate_limit: the wait for the client's rate limiter
+* http.request: one request, until its body was received
+* http.decode: decoding a response body, in the executor for large bodies
+"""
+
+import bisect
+import contextlib
+import dataclasses
+import importlib
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+)
+
+
+@dataclasses.dataclass(eq=False)
+class Span:
+    """A timed phase of the client's work."""
+
+    name: str
+    attributes: Dict[str, Any]
+    parent: Optional["Span"] = None
+    start: float = dataclasses.field(default_factory=time.perf_counter)
+    end: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        """Seconds from the start of the span to its end, or to now if it's open."""
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+
+class Observer:
+    """Receives the spans and counters of a client. Every method is a no-op
+    by default, so subclasses only override what they need."""
+
+    def span_started(self, span: Span) -> None:
+        pass
+
+    def span_ended(self, span: Span) -> None:
+        pass
+
+    def counted(self, name: str, value: float, span: Optional[Span]) -> None:
+        pass
+
+
+class Instrumentation:
+    """Reports spans and counters to observers."""
+
+    def __init__(self, observers: Iterable[Observer] = ()) -> None:
+        self.observers: List[Observer] = list(observers)
+
+    def start(
+        self, name: str, parent: Optional[Span] = None, **attributes: Any
+    ) -> Span:
+        span = Span(name, attributes, parent)
+        for observer in self.observers:
+            observer.span_started(span)
+        return span
+
+    def end(self, span: Span, **attributes: Any) -> None:
+        span.attributes.update(attributes)
+        span.end = time.perf_counter()
+        for observer in self.observers:
+            observer.span_ended(span)
+
+    @contextlib.contextmanager
+    def span(
+        self, name: str, parent: Optional[Span] = None, **attributes: Any
+    ) -> Iterator[Span]:
+        """
+        Report a span around a block. If the block raises, the span gets an
+        `error` attribute with the name of the exception type, unless the block
+        is in a generator that was closed early: then the span gets a `closed`
+        attribute.
+        """
+        span = self.start(name, parent, **attributes)
+        try:
+            yield span
+        except GeneratorExit:
+            span.attributes["closed"] = True
+            raise
+        except BaseException as error:
+            span.attributes["error"] = type(error).__name__
+            raise
+        finally:
+            self.end(span)
+
+    def count(self, name: str, value: float = 1, span: Optional[Span] = None) -> None:
+        for observer in self.observers:
+            observer.counted(name, value, span)
+
+
+class Histogram:
+    """Counts of values in buckets, bounded above by `bounds`, and one more for
+    values beyond the last bound."""
+
+    __slots__ = ("bounds", "buckets", "count", "total", "min", "max")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.bounds = tuple(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value: float) -> None:
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+    def quantile(self, q: float) -> float:
+        """An upper bound of the q-quantile: the bound of the bucket it falls in."""
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "buckets": list(zip(self.bounds + (math.inf,), self.buckets)),
+        }
+
+
+class MetricsRegistry(Observer):
+    """
+    Aggregates spans into a histogram of durations per span name, and sums
+    counters per name. Safe to share between threads and event loops.
+    """
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.bounds = tuple(bounds)
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def span_ended(self, span: Span) -> None:
+        with self._lock:
+            histogram = self.histograms.get(span.name)
+            if histogram is None:
+                histogram = self.histograms[span.name] = Histogram(self.bounds)
+            histogram.record(span.duration)
+
+    def counted(self, name: str, value: float, span: Optional[Span]) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def counter(self, name: str) -> float:
+        return self.counters.get(name, 0)
+
+    def histogram(self, name: str) -> Optional[Histogram]:
+        return self.histograms.get(name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """A copy of the metrics, as plain data that can be serialized to JSON."""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {
+                    name: histogram.to_dict()
+                    for name, histogram in self.histograms.items()
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+def _opentelemetry_trace() -> Any:
+    try:
+        return importlib.import_module("opentelemetry.trace")
+    except ImportError as e:
+        raise ImportError(
+            "OpenTelemetryObserver requires opentelemetry-api: "
+            "pip install connectedpapers-py[otel]"
+        ) from e
+
+
+def _attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    """OpenTelemetry attributes are primitive values, and can't be None."""
+    return {
+        key: value if isinstance(value, (str, bool, int, float)) else str(value)
+        for key, value in attributes.items()
+        if value is not None
+    }
+
+
+class OpenTelemetryObserver(Observer):
+    """
+    Forwards spans to an OpenTelemetry tracer, as spans named
+    `connectedpapers.<name>`, and counters as events on the span they belong to.
+    Spans without a parent span are children of the current OpenTelemetry span.
+
+    Requires opentelemetry-api, which is an optional dependency: pip install
+    connectedpapers-py[otel].
+    """
+
+    def __init__(self, tracer: Optional[Any] = None) -> None:
+        self._trace = _opentelemetry_trace()
+        self.tracer = (
+            tracer if tracer is not None else self._trace.get_tracer("connectedpapers")
+        )
+        self._spans: Dict[Span, Any] = {}
+        self._lock = threading.Lock()
+
+    def span_started(self, span: Span) -> None:
+        context = None
+        with self._lock:
+            parent = self._spans.get(span.parent) if span.parent is not None else None
+        if parent is not None:
+            context = self._trace.set_span_in_context(parent)
+        otel_span = self.tracer.start_span(
+            f"connectedpapers.{span.name}",
+            context=context,
+            attributes=_attributes(span.attributes),
+        )
+        with self._lock:
+            self._spans[span] = otel_span
+
+    def span_ended(self, span: Span) -> None:
+        with self._lock:
+            otel_span = self._spans.pop(span, None)
+        if otel_span is None:
+            return
+        otel_span.set_attributes(_attributes(span.attributes))
+        if "error" in span.attributes:
+            otel_span.set_status(
+                self._trace.Status(
+                    self._trace.StatusCode.ERROR, span.attributes["error"]
+                )
+            )
+        otel_span.end()
+
+    def counted(self, name: str, value: float, span: Optional[Span]) -> None:
+        if span is None:
+            return
+        with self._lock:
+            otel_span = self._spans.get(span)
+        if otel_span is not None:
+            otel_span.add_event(name, {"value": value})
@@ -0,0 +1,252 @@
+"""
+Lineage queries over the paths of papers from the start paper of a graph.
+
+Every paper of a graph has a path from the start paper (Paper.path, which ends
+at the paper) and the length of that path (Paper.path_length, repeated in
+Graph.path_lengths). Together the paths form a tree rooted at the start paper,
+in which the parent of a paper is the paper before it on its path. A
+LineageIndex holds that tree as arrays:
+* parent pointers, and depths in hops from the start paper
+* a binary lifting table, whose row k holds the 2**k-th ancestor of every
+  paper, for lowest common ancestor and k-th ancestor queries in O(log n)
+* an Euler tour of the tree: papers in depth-first order, with the range of
+  the tour each subtree spans, for O(1) ancestor tests and O(size) subtrees
+* the papers sorted by path length, for distance range queries in
+  O(log n + papers found)
+
+lineage_index() builds the index of a graph on first use and caches it for the
+lifetime of the graph, so graphs should not be mutated after indexing.
+"""
+
+import bisect
+import weakref
+from array import array
+from typing import Dict, List, Optional
+
+from .graph import Graph, PaperID
+
+_ROOT = -1  # The parent of the start paper
+
+
+class LineageIndex:
+    """
+    The tree of the paths of a graph. Paper i has parent parents[i] and depth
+    depths[i], and its subtree is tour[entries[i]:exits[i]].
+    """
+
+    def __init__(self, graph: Graph) -> None:
+        self.start_id = graph.start_id
+        self.node_ids: List[PaperID] = list(graph.nodes)
+        self.node_index: Dict[PaperID, int] = {
+            paper_id: index for index, paper_id in enumerate(self.node_ids)
+        }
+        root = self._index_of(graph.start_id)
+        n = len(self.node_ids)
+        parents = [root] * n
+        for paper_id, paper in graph.nodes.items():
+            parents[self.node_index[paper_id]] = self._parent(paper_id, paper.path)
+        parents[root] = _ROOT
+        self.parents: "array[int]" = array("i", parents)
+        self._build_tour(root)
+        self._build_ancestors()
+        lengths = [0.0] * n
+        for paper_id, paper in graph.nodes.items():
+            lengths[self.node_index[paper_id]] = graph.path_lengths.get(
+                paper_id, paper.path_length
+            )
+        self.path_lengths: "array[float]" = array("d", lengths)
+        self.by_path_length: "array[int]" = array(
+            "i", sorted(range(n), key=lengths.__getitem__)
+        )
+        self._sorted_path_lengths = [lengths[i] for i in self.by_path_length]
+
+    def _index_of(self, paper_id: PaperID) -> int:
+        index = self.node_index.get(paper_id)
+        if index is None:  # A start paper that isn't in graph.nodes
+            index = self.node_index[paper_id] = len(self.node_ids)
+            self.node_ids.append(paper_id)
+        return index
+
+    def _parent(self, paper_id: PaperID, path: List[PaperID]) -> int:
+        """The last paper of the graph before paper_id on its path."""
+        if path and path[0] == paper_id and path[-1] == self.start_id:
+            path = path[::-1]  # A path to the start paper rather than from it
+        end = len(path) - 1 if path and path[-1] == paper_id else len(path)
+        for i in range(end - 1, -1, -1):
+            parent = self.node_index.get(path[i])
+            if parent is not None and path[i] != paper_id:
+                return parent
+        return self.node_index[self.start_id]
+
+    def _build_tour(self, root: int) -> None:
+        """
+        Order the papers depth first from the start paper. Where the paths
+        of the graph disagree, parent pointers can form a cycle that doesn't
+        lead to the start paper: one paper of the cycle is attached to the
+        start paper instead, which keeps the rest of the cycle and the papers
+        hanging from it under that paper.
+        """
+        n = len(self.node_ids)
+        parents = self.parents
+        children: List[List[int]] = [[] for _ in range(n)]
+        for i in range(n):
+            if i != root:
+                children[parents[i]].append(i)
+        depths = [0] * n
+        entries = [-1] * n
+        exits = [0] * n
+        tour: List[int] = []
+
+        def visit(top: int) -> None:
+            stack = [(top, False)]
+            while stack:
+                i, leaving = stack.pop()
+                if leaving:
+                    exits[i] = len(tour)
+                    continue
+                entries[i] = len(tour)
+                tour.append(i)
+                stack.append((i, True))
+                for child in reversed(children[i]):
+                    depths[child] = depths[i] + 1
+                    stack.append((child, False))
+
+        visit(root)
+        for i in range(n):
+            if entries[i] == -1:
+                # The parents of i lead to a cycle: find a paper on it, the
+                # first one reached twice, and cut it from its parent
+                seen = set()
+                j = i
+                while j not in seen:
+                    seen.add(j)
+                    j = parents[j]
+                children[parents[j]].remove(j)
+                parents[j] = root
+                children[root].append(j)
+                depths[j] = 1
+                visit(j)
+                exits[root] = len(tour)
+        self.depths: "array[int]" = array("i", depths)
+        self.entries: "array[int]" = array("i", entries)
+        self.exits: "array[int]" = array("i", exits)
+        self.tour: "array[int]" = array("i", tour)
+
+    def _build_ancestors(self) -> None:
+        n = len(self.node_ids)
+        levels = max(1, max(self.depths, default=0).bit_length())
+        # The start paper is its own ancestor, so that lifting stops there
+        first = array("i", (i if p == _ROOT else p for i, p in enumerate(self.parents)))
+        self.ancestors: List["array[int]"] = [first]
+        for _ in range(1, levels):
+            previous = self.ancestors[-1]
+            self.ancestors.append(array("i", (previous[previous[i]] for i in range(n))))
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def __contains__(self, paper_id: object) -> bool:
+        return paper_id in self.node_index
+
+    def parent(self, paper_id: PaperID) -> Optional[PaperID]:
+        """The paper before paper_id on its path, or None for the start paper."""
+        parent = self.parents[self.node_index[paper_id]]
+        return None if parent == _ROOT else self.node_ids[parent]
+
+    def depth(self, paper_id: PaperID) -> int:
+        """Number of hops from the start paper to paper_id."""
+        return self.depths[self.node_index[paper_id]]
+
+    def path_length(self, paper_id: PaperID) -> float:
+        return self.path_lengths[self.node_index[paper_id]]
+
+    def _is_ancestor(self, i: int, j: int) -> bool:
+        return self.entries[i] <= self.entries[j] < self.exits[i]
+
+    def is_ancestor(self, ancestor: PaperID, paper_id: PaperID) -> bool:
+        """Whether ancestor is on the path of paper_id (paper_id included), in O(1)."""
+        return self._is_ancestor(self.node_index[ancestor], self.node_index[paper_id])
+
+    def ancestor(self, paper_id: PaperID, hops: int) -> Optional[PaperID]:
+        """The paper hops steps before paper_id on its path, in O(log n)."""
+        i = self.node_index[paper_id]
+        if hops < 0 or hops > self.depths[i]:
+            return None
+        level = 0
+        while hops:
+            if hops & 1:
+                i = self.ancestors[level][i]
+            hops >>= 1
+            level += 1
+        return self.node_ids[i]
+
+    def _lowest_common_ancestor(self, i: int, j: int) -> int:
+        if self._is_ancestor(i, j):
+            return i
+        if self._is_ancestor(j, i):
+            return j
+        for level in reversed(self.ancestors):
+            if not self._is_ancestor(level[i], j):
+                i = level[i]
+        return self.ancestors[0][i]
+
+    def lowest_common_ancestor(self, a: PaperID, b: PaperID) -> PaperID:
+        """The last paper on the paths of both a and b, in O(log n)."""
+        i = self._lowest_common_ancestor(self.node_index[a], self.node_index[b])
+        return self.node_ids[i]
+
+    def _path_up(self, i: int, ancestor: int) -> List[int]:
+        path = [i]
+        while i != ancestor:
+            i = self.parents[i]
+            path.append(i)
+        return path
+
+    def lineage(self, paper_id: PaperID) -> List[PaperID]:
+        """The papers from the start paper to paper_id, in O(depth)."""
+        path = self._path_up(self.node_index[paper_id], self.tour[0])
+        return [self.node_ids[i] for i in reversed(path)]
+
+    def common_lineage(self, a: PaperID, b: PaperID) -> List[PaperID]:
+        """The papers from the start paper to the lowest common ancestor of a and b."""
+        return self.lineage(self.lowest_common_ancestor(a, b))
+
+    def tree_path(self, a: PaperID, b: PaperID) -> List[PaperID]:
+        """The papers from a to b through their lowest common ancestor."""
+        i, j = self.node_index[a], self.node_index[b]
+        ancestor = self._lowest_common_ancestor(i, j)
+        up = self._path_up(i, ancestor)
+        down = self._path_up(j, ancestor)[:-1]
+        return [self.node_ids[k] for k in up + down[::-1]]
+
+    def descendants(self, paper_id: PaperID) -> List[PaperID]:
+        """The papers whose paths go through paper_id, in O(papers found)."""
+        i = self.node_index[paper_id]
+        start, end = self.entries[i] + 1, self.exits[i]
+        node_ids = self.node_ids
+        return [node_ids[k] for k in self.tour[start:end]]
+
+    def within_distance(
+        self, max_length: float, min_length: float = 0.0
+    ) -> List[PaperID]:
+        """
+        The papers whose path length is between min_length and max_length,
+        inclusive, from the closest, in O(log n + papers found).
+        """
+        lengths = self._sorted_path_lengths
+        start = bisect.bisect_left(lengths, min_length)
+        end = bisect.bisect_right(lengths, max_length)
+        node_ids = self.node_ids
+        return [node_ids[i] for i in self.by_path_length[start:end]]
+
+
+_indexes: Dict[int, LineageIndex] = {}
+
+
+def lineage_index(graph: Graph) -> LineageIndex:
+    """Return the lineage index of a graph, building it on first use."""
+    index = _indexes.get(id(graph))
+    if index is None:
+        index = _indexes[id(graph)] = LineageIndex(graph)
+        weakref.finalize(graph, _indexes.pop, id(graph), None)
+    return index
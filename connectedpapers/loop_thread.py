@@ -0,0 +1,120 @@
+"""
+A background thread running an event loop, for calling async code from
+synchronous code.
+
+LoopThread.run() submits a coroutine to the loop and blocks the calling thread
+until it is done. Any number of threads can call it at once, and state bound to
+the loop, such as an aiohttp session, lives as long as the LoopThread rather
+than for a single call. Stopping the loop cancels the coroutines still running
+on it, and the calls waiting for them raise a RuntimeError.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Coroutine, Optional, Set, TypeVar
+
+T = TypeVar("T")
+
+
+class LoopThread:
+    """An event loop running in a daemon thread, started on first use."""
+
+    def __init__(self, name: str = "connectedpapers-loop") -> None:
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # The results run() is waiting for from the current loop
+        self._futures: Set["concurrent.futures.Future[Any]"] = set()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The loop of the thread, starting the thread if needed."""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+                self._futures = set()
+                self._thread = threading.Thread(
+                    target=self._run_forever,
+                    args=(loop, started, self._futures),
+                    name=self.name,
+                    daemon=True,
+                )
+                self._thread.start()
+                started.wait()
+                self._loop = loop
+            return self._loop
+
+    def _run_forever(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        started: threading.Event,
+        futures: Set["concurrent.futures.Future[Any]"],
+    ) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(started.set)
+        try:
+            loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+            # Coroutines submitted as the loop was stopping never started
+            with self._lock:
+                unstarted = [future for future in futures if not future.done()]
+            for future in unstarted:
+                future.set_exception(RuntimeError("The event loop was stopped"))
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the loop, and wait for its result in this thread."""
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError(
+                "Synchronous calls can't be made from the client's own event loop"
+            )
+        loop = self.loop
+        with self._lock:
+            if self._loop is not loop:  # Stopped in the meantime
+                coroutine.close()
+                raise RuntimeError("The event loop was stopped")
+            future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+            futures = self._futures
+            futures.add(future)
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError:
+            if self._loop is not loop:
+                raise RuntimeError("The event loop was stopped") from None
+            raise
+        except BaseException:
+            # E.g. KeyboardInterrupt in the waiting thread
+            future.cancel()
+            raise
+        finally:
+            with self._lock:
+                futures.discard(future)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the loop and wait for the thread to exit; run() restarts it. The
+        coroutines still running are cancelled, and the calls to run() waiting
+        for them raise a RuntimeError.
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or thread is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not threading.current_thread():
+            thread.join(timeout)
@@ -0,0 +1,210 @@
+"""
+Scheduling of the status checks made while a graph is being built.
+
+A PollingStrategy creates a PollSchedule for each graph request, which decides
+how long to wait before the next check from the progress reported so far.
+Waits run on a TimerWheel shared by all requests on an event loop, so many
+concurrent builds are woken by one timer per tick instead of one each.
+"""
+
+import abc
+import asyncio
+import heapq
+import math
+import random
+import time
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+SLEEP_TIME_BETWEEN_CHECKS = 1.0
+DEFAULT_POLL_INTERVAL = SLEEP_TIME_BETWEEN_CHECKS
+DEFAULT_MIN_POLL_INTERVAL = 0.25
+DEFAULT_MAX_POLL_INTERVAL = 10.0
+DEFAULT_QUEUED_BACKOFF = 1.5
+DEFAULT_JITTER = 0.1
+DEFAULT_ETA_FRACTION = 0.5
+DEFAULT_TIMER_RESOLUTION = 0.05
+
+PROGRESS_COMPLETE = 100.0
+
+
+class PollSchedule(abc.ABC):
+    """Decides the delays between the status checks of one graph request."""
+
+    @abc.abstractmethod
+    def next_delay(self, progress: Optional[float]) -> float:
+        """
+        Args:
+            progress: The progress of the last IN_PROGRESS response, or None if
+                      the build hasn't started yet (QUEUED, or a rebuild of an
+                      OLD_GRAPH was just requested)
+
+        Returns:
+            Seconds to wait before the next status check
+        """
+
+    def eta(self) -> Optional[float]:
+        """Estimated seconds until the graph is built, if known."""
+        return None
+
+
+class PollingStrategy(abc.ABC):
+    """Creates a PollSchedule for every graph request."""
+
+    @abc.abstractmethod
+    def schedule(self) -> PollSchedule:
+        """Return the schedule of a new graph request."""
+
+
+class _FixedSchedule(PollSchedule):
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+
+    def next_delay(self, progress: Optional[float]) -> float:
+        return self.interval
+
+
+class FixedPolling(PollingStrategy):
+    """Check the status every `interval` seconds."""
+
+    def __init__(self, interval: float = SLEEP_TIME_BETWEEN_CHECKS) -> None:
+        self.interval = interval
+
+    def schedule(self) -> PollSchedule:
+        return _FixedSchedule(self.interval)
+
+
+class _AdaptiveSchedule(PollSchedule):
+    def __init__(self, strategy: "AdaptivePolling") -> None:
+        self.strategy = strategy
+        self.queued_checks = 0
+        # (time, progress) of the first and the latest IN_PROGRESS responses
+        self.first_progress: Optional[Tuple[float, float]] = None
+        self.last_progress: Optional[Tuple[float, float]] = None
+
+    def eta(self) -> Optional[float]:
+        if self.first_progress is None or self.last_progress is None:
+            return None
+        (start_time, start), (now, progress) = self.first_progress, self.last_progress
+        if now <= start_time or progress <= start:
+            return None
+        rate = (progress - start) / (now - start_time)
+        return max(PROGRESS_COMPLETE - progress, 0.0) / rate
+
+    def next_delay(self, progress: Optional[float]) -> float:
+        strategy = self.strategy
+        if progress is None:
+            delay = strategy.interval * strategy.queued_backoff**self.queued_checks
+            self.queued_checks += 1
+            return strategy.jittered(delay)
+        now = strategy.clock()
+        if self.first_progress is None:
+            self.first_progress = (now, progress)
+        self.last_progress = (now, progress)
+        eta = self.eta()
+        delay = strategy.interval if eta is None else eta * strategy.eta_fraction
+        return strategy.jittered(delay)
+
+
+class AdaptivePolling(PollingStrategy):
+    """
+    Adapts the delay between checks to the state of the build:
+    * While the build is queued, the delay starts at `interval` and grows by
+      `queued_backoff` after every check.
+    * While the build is in progress, the time to completion is estimated from
+      the rate of progress so far, and the next check is made after
+      `eta_fraction` of it, so checks get tighter as the build nears its end.
+    Delays are kept within [min_interval, max_interval], and spread by a random
+    `jitter` fraction so that builds started together don't poll in lockstep.
+    """
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_POLL_INTERVAL,
+        min_interval: float = DEFAULT_MIN_POLL_INTERVAL,
+        max_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+        queued_backoff: float = DEFAULT_QUEUED_BACKOFF,
+        eta_fraction: float = DEFAULT_ETA_FRACTION,
+        jitter: float = DEFAULT_JITTER,
+    ) -> None:
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Expected 0 < min_interval <= max_interval")
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.queued_backoff = queued_backoff
+        self.eta_fraction = eta_fraction
+        self.jitter = jitter
+        self.clock = time.monotonic
+
+    def jittered(self, delay: float) -> float:
+        delay *= random.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+        return min(max(delay, self.min_interval), self.max_interval)
+
+    def schedule(self) -> PollSchedule:
+        return _AdaptiveSchedule(self)
+
+
+class TimerWheel:
+    """
+    Sleeps rounded up to ticks of `resolution` seconds, for use from a single
+    event loop. Sleepers due on the same tick share a slot, and the wheel keeps
+    a single loop timer, for the earliest occupied tick.
+    """
+
+    def __init__(self, resolution: float = DEFAULT_TIMER_RESOLUTION) -> None:
+        self.resolution = resolution
+        self._slots: Dict[int, List["asyncio.Future[None]"]] = {}
+        self._ticks: List[int] = []  # Heap of the occupied ticks
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_tick: Optional[int] = None
+
+    async def sleep(self, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        tick = math.ceil((loop.time() + max(delay, 0.0)) / self.resolution)
+        future: "asyncio.Future[None]" = loop.create_future()
+        slot = self._slots.get(tick)
+        if slot is None:
+            slot = self._slots[tick] = []
+            heapq.heappush(self._ticks, tick)
+            self._arm(loop)
+        slot.append(future)
+        # A cancelled sleeper's future is cancelled with it, and skipped on wake
+        await future
+
+    def pending(self) -> int:
+        """Number of sleepers waiting on the wheel."""
+        return sum(
+            not future.done() for slot in self._slots.values() for future in slot
+        )
+
+    def _arm(self, loop: asyncio.AbstractEventLoop) -> None:
+        if not self._ticks or self._timer_tick == self._ticks[0]:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer_tick = self._ticks[0]
+        self._timer = loop.call_at(self._timer_tick * self.resolution, self._wake, loop)
+
+    def _wake(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._timer = self._timer_tick = None
+        # The loop may run timers slightly early, so wake ticks within half a tick
+        now = loop.time() + self.resolution / 2
+        while self._ticks and self._ticks[0] * self.resolution <= now:
+            for future in self._slots.pop(heapq.heappop(self._ticks)):
+                if not future.done():
+                    future.set_result(None)
+        self._arm(loop)
+
+
+_wheels: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, TimerWheel]"
+_wheels = weakref.WeakKeyDictionary()
+
+
+def shared_timer_wheel() -> TimerWheel:
+    """Return the timer wheel of the running event loop, creating it if needed."""
+    loop = asyncio.get_running_loop()
+    wheel = _wheels.get(loop)
+    if wheel is None:
+        wheel = _wheels[loop] = TimerWheel()
+    return wheel
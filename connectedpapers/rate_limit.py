@@ -0,0 +1,157 @@
+"""
+Client-side rate limiting and quota budgeting.
+
+RateLimiter is a token bucket that paces the requests of a client, across all
+its calls, threads and event loops. QuotaTracker follows the remaining_requests
+reported by the server, so that requests can be refused before the quota runs
+out instead of after.
+
+Priorities are integers, and lower values are served first. Only requests with
+a priority below PRIORITY_NORMAL may spend the reserved part of the quota.
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import List, Optional
+
+PRIORITY_HIGH = -1
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = 1
+
+SECONDS_PER_MINUTE = 60.0
+
+
+class _Waiter:
+    __slots__ = ("priority", "sequence", "loop", "future")
+
+    def __init__(
+        self, priority: int, sequence: int, loop: asyncio.AbstractEventLoop
+    ) -> None:
+        self.priority = priority
+        self.sequence = sequence
+        self.loop = loop
+        self.future: Optional["asyncio.Future[None]"] = None
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+    def wake(self) -> None:
+        future = self.future
+        if future is not None:
+            self.loop.call_soon_threadsafe(_resolve, future)
+
+
+def _resolve(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class RateLimiter:
+    """
+    A token bucket allowing `requests_per_minute` requests per minute on
+    average, and bursts of up to `burst` requests. Requests waiting for a
+    token are served by priority, then in arrival order.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None) -> None:
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        self.rate = requests_per_minute / SECONDS_PER_MINUTE  # Tokens per second
+        self.burst = burst if burst is not None else max(1, int(self.rate))
+        self.clock = time.monotonic
+        self._tokens = float(self.burst)
+        self._updated_at = self.clock()
+        self._paused_until = 0.0
+        self._waiters: List[_Waiter] = []  # Heap, the head is served next
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        start = max(self._updated_at, self._paused_until)
+        if now > start:
+            self._tokens = min(self.burst, self._tokens + (now - start) * self.rate)
+        self._updated_at = max(now, self._updated_at)
+
+    def _delay(self, now: float) -> float:
+        """Seconds until the next token is available; call with the lock held."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        return max(0.0, (1.0 - self._tokens) / self.rate)
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL) -> None:
+        """Wait for a token."""
+        waiter = _Waiter(priority, next(self._sequence), asyncio.get_running_loop())
+        with self._lock:
+            heapq.heappush(self._waiters, waiter)
+        try:
+            while True:
+                with self._lock:
+                    now = self.clock()
+                    self._refill(now)
+                    is_head = self._waiters[0] is waiter
+                    delay = self._delay(now)
+                    if is_head and delay == 0.0:
+                        self._tokens -= 1.0
+                        heapq.heappop(self._waiters)
+                        if self._waiters:
+                            self._waiters[0].wake()
+                        return
+                    if not is_head:
+                        waiter.future = waiter.loop.create_future()
+                if is_head:
+                    await asyncio.sleep(delay)
+                else:
+                    assert waiter.future is not None
+                    await waiter.future
+                    waiter.future = None
+        except BaseException:
+            with self._lock:
+                if waiter in self._waiters:
+                    was_head = self._waiters[0] is waiter
+                    self._waiters.remove(waiter)
+                    heapq.heapify(self._waiters)
+                    if was_head and self._waiters:
+                        self._waiters[0].wake()
+            raise
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next `seconds` seconds, e.g. after OVERLOADED."""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0.0)
+            self._paused_until = max(self._paused_until, now + seconds)
+
+    def waiting(self) -> int:
+        """Number of requests waiting for a token."""
+        return len(self._waiters)
+
+
+class QuotaTracker:
+    """
+    Tracks the remaining request quota of an API key from the server's
+    responses. Once at most `reserve` requests remain, only high priority
+    requests are allowed, until the quota runs out. Without a reserve, all
+    requests are allowed; the server still answers requests for papers in the
+    free re-access window when the quota is out.
+    """
+
+    def __init__(self, reserve: Optional[int] = None) -> None:
+        self.reserve = reserve
+        self.remaining: Optional[int] = None  # Unknown until the server reports it
+
+    def update(self, remaining: Optional[int]) -> None:
+        """Record the remaining quota reported by the server."""
+        if remaining is not None:
+            self.remaining = remaining
+
+    def allows(self, priority: int = PRIORITY_NORMAL) -> bool:
+        remaining = self.remaining
+        if remaining is None or self.reserve is None:
+            return True
+        if priority < PRIORITY_NORMAL:
+            return remaining > 0
+        return remaining > self.reserve
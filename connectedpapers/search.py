@@ -0,0 +1,297 @@
+"""
+Filtering the papers of graphs by metadata and keywords.
+
+A PaperIndex is an inverted index of the papers of the graphs added to it: the
+graph nodes and their common citations and references, each paper once, with
+the metadata of the first graph it appeared in. Papers are numbered in the
+order they were added, and every filter value maps to the sorted numbers of its
+papers (a posting list):
+* keywords: the words of the title, abstract and tldr, lowercased
+* authors: the author IDs of PaperAuthor.ids
+* venues and fields of study, compared case-insensitively
+* open access: isOpenAccess True or False
+* graphs: the papers of each graph, by start paper
+
+Years are a column sorted by year, searched with bisect for year ranges. A
+query intersects the posting lists of its filters, looking up the numbers of
+the shortest list in the longer ones by binary search, and checks the years of
+the papers found, so it costs O(k log n) for k papers in the shortest list
+instead of a scan of the index. Only a query by years alone reads the column.
+
+Since papers are numbered as they are added, adding a graph only appends to
+the posting lists; graphs can be added while the index is being queried, as
+they arrive. to_bytes() and save() persist an index in the format of
+serialization.py, and from_bytes() and load() read it back.
+"""
+
+import bisect
+import heapq
+import re
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, cast
+
+from . import serialization
+from .graph import BasePaper, Graph, PaperID
+
+FORMAT_VERSION = 1
+
+_WORD = re.compile(r"\w+")
+
+Postings = Dict[str, "array[int]"]
+
+
+def keywords(text: Optional[str]) -> Set[str]:
+    """The keywords of a text: its words, lowercased."""
+    return set(_WORD.findall(text.lower())) if text else set()
+
+
+def _normalize(value: str) -> str:
+    return " ".join(value.casefold().split())
+
+
+def _post(postings: Postings, key: str, number: int) -> None:
+    posting = postings.get(key)
+    if posting is None:
+        posting = postings[sys.intern(key)] = array("q")
+    posting.append(number)
+
+
+def _intersect(postings: List[Sequence[int]]) -> Sequence[int]:
+    postings = sorted(postings, key=len)
+    result = postings[0]
+    for posting in postings[1:]:
+        found: List[int] = []
+        start, end = 0, len(posting)
+        for number in result:
+            # Both lists are sorted, so each lookup starts after the previous
+            start = bisect.bisect_left(posting, number, start, end)
+            if start == end:
+                break
+            if posting[start] == number:
+                found.append(number)
+        result = found
+        if not result:
+            break
+    return result
+
+
+class PaperIndex:
+    def __init__(self) -> None:
+        self.paper_ids: List[PaperID] = []
+        self.graph_ids: List[PaperID] = []
+        self._numbers: Dict[PaperID, int] = {}
+        self._years: List[Optional[int]] = []
+        self._keywords: Postings = {}
+        self._authors: Postings = {}
+        self._venues: Postings = {}
+        self._fields_of_study: Postings = {}
+        self._open_access: Postings = {}
+        self._graphs: Postings = {}
+        # Numbers of the papers with a year, sorted by year, and their years
+        self._year_order: List[int] = []
+        self._sorted_years: List[int] = []
+        self._years_sorted_up_to = 0
+
+    def add(self, graph: Graph) -> bool:
+        """
+        Index the papers of a graph.
+
+        Returns:
+            False, without changing the index, if a graph for the same start
+            paper was already added
+        """
+        if graph.start_id in self._graphs:
+            return False
+        numbers: List[int] = []
+        for paper_id, paper in graph.nodes.items():
+            numbers.append(self._add_paper(paper_id, paper))
+        for citation in graph.common_citations:
+            numbers.append(self._add_paper(citation.paper_id, citation))
+        for reference in graph.common_references:
+            numbers.append(self._add_paper(reference.paper_id, reference))
+        self.graph_ids.append(sys.intern(graph.start_id))
+        self._graphs[self.graph_ids[-1]] = array("q", sorted(set(numbers)))
+        return True
+
+    def add_all(self, graphs: Iterable[Graph]) -> int:
+        """Index graphs, returning how many were added."""
+        return sum(self.add(graph) for graph in graphs)
+
+    def _add_paper(self, paper_id: PaperID, paper: BasePaper) -> int:
+        number = self._numbers.get(paper_id)
+        if number is not None:
+            return number
+        number = self._numbers[paper_id] = len(self.paper_ids)
+        self.paper_ids.append(sys.intern(paper_id))
+        self._years.append(paper.year)
+        words = keywords(paper.title) | keywords(paper.abstract) | keywords(paper.tldr)
+        for word in words:
+            _post(self._keywords, word, number)
+        author_ids = {
+            author_id
+            for author in paper.authors
+            for author_id in author.ids
+            if author_id is not None
+        }
+        for author_id in author_ids:
+            _post(self._authors, author_id, number)
+        if paper.venue:
+            _post(self._venues, _normalize(paper.venue), number)
+        for field in {_normalize(field) for field in paper.fieldsOfStudy or ()}:
+            _post(self._fields_of_study, field, number)
+        if paper.isOpenAccess is not None:
+            _post(self._open_access, str(paper.isOpenAccess), number)
+        return number
+
+    def __len__(self) -> int:
+        return len(self.paper_ids)
+
+    def __contains__(self, paper_id: object) -> bool:
+        return paper_id in self._numbers
+
+    def _sort_years(self) -> None:
+        """Merge the years of the papers added since the last query."""
+        years = self._years
+        if self._years_sorted_up_to == len(years):
+            return
+        added = sorted(
+            (cast(int, years[number]), number)
+            for number in range(self._years_sorted_up_to, len(years))
+            if years[number] is not None
+        )
+        merged = list(heapq.merge(zip(self._sorted_years, self._year_order), added))
+        self._sorted_years = [year for year, _ in merged]
+        self._year_order = [number for _, number in merged]
+        self._years_sorted_up_to = len(years)
+
+    def _year_range(
+        self, min_year: Optional[int], max_year: Optional[int]
+    ) -> List[int]:
+        self._sort_years()
+        years = self._sorted_years
+        start = 0 if min_year is None else bisect.bisect_left(years, min_year)
+        end = len(years) if max_year is None else bisect.bisect_right(years, max_year)
+        return sorted(self._year_order[start:end])
+
+    def search(
+        self,
+        text: Optional[str] = None,
+        *,
+        authors: Iterable[str] = (),
+        venue: Optional[str] = None,
+        fields_of_study: Iterable[str] = (),
+        min_year: Optional[int] = None,
+        max_year: Optional[int] = None,
+        open_access: Optional[bool] = None,
+        graph: Optional[PaperID] = None,
+    ) -> List[PaperID]:
+        """
+        The papers that match all the given filters, in the order they were
+        added, or all the papers if no filter is given.
+
+        Args:
+            text: Keywords, all of which must be in the title, abstract or
+                  tldr of a paper, in any case
+            authors: Author IDs, all of which must be authors of a paper
+            venue: The venue of the papers, in any case
+            fields_of_study: Fields, all of which must be fields of a paper
+            min_year: The first year of the papers, inclusive
+            max_year: The last year of the papers, inclusive
+            open_access: Whether the papers are open access
+            graph: The start paper of a graph the papers are in
+        """
+        keys = [(self._keywords, word) for word in keywords(text)]
+        keys.extend((self._authors, author_id) for author_id in authors)
+        if venue is not None:
+            keys.append((self._venues, _normalize(venue)))
+        keys.extend(
+            (self._fields_of_study, _normalize(field)) for field in fields_of_study
+        )
+        if open_access is not None:
+            keys.append((self._open_access, str(open_access)))
+        if graph is not None:
+            keys.append((self._graphs, graph))
+        postings: List[Sequence[int]] = []
+        for postings_by_key, key in keys:
+            posting = postings_by_key.get(key)
+            if posting is None:
+                return []
+            postings.append(posting)
+        paper_ids = self.paper_ids
+        if min_year is None and max_year is None:
+            numbers = _intersect(postings) if postings else range(len(paper_ids))
+        elif postings:
+            # Check the years of the papers of the other filters, rather than
+            # list every paper in the year range
+            low = -sys.maxsize if min_year is None else min_year
+            high = sys.maxsize if max_year is None else max_year
+            years = self._years
+            numbers = [
+                number
+                for number in _intersect(postings)
+                if years[number] is not None and low <= cast(int, years[number]) <= high
+            ]
+        else:
+            numbers = self._year_range(min_year, max_year)
+        return [paper_ids[number] for number in numbers]
+
+    def to_bytes(
+        self, codec: Optional[str] = None, compression: Optional[str] = None
+    ) -> bytes:
+        """Serialize the index to the binary format of serialization.py."""
+        return serialization.to_bytes(
+            {
+                "version": FORMAT_VERSION,
+                "paper_ids": self.paper_ids,
+                "graph_ids": self.graph_ids,
+                "years": self._years,
+                "keywords": _plain_postings(self._keywords),
+                "authors": _plain_postings(self._authors),
+                "venues": _plain_postings(self._venues),
+                "fields_of_study": _plain_postings(self._fields_of_study),
+                "open_access": _plain_postings(self._open_access),
+                "graphs": _plain_postings(self._graphs),
+            },
+            codec,
+            compression,
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "PaperIndex":
+        """Deserialize an index written by to_bytes()."""
+        plain = serialization.plain_from_bytes(data)
+        if not isinstance(plain, dict) or plain.get("version") != FORMAT_VERSION:
+            raise ValueError("Not a serialized paper index")
+        index = cls()
+        index.paper_ids = [sys.intern(paper_id) for paper_id in plain["paper_ids"]]
+        index.graph_ids = [sys.intern(paper_id) for paper_id in plain["graph_ids"]]
+        index._numbers = {
+            paper_id: number for number, paper_id in enumerate(index.paper_ids)
+        }
+        index._years = list(plain["years"])
+        index._keywords = _postings(plain["keywords"])
+        index._authors = _postings(plain["authors"])
+        index._venues = _postings(plain["venues"])
+        index._fields_of_study = _postings(plain["fields_of_study"])
+        index._open_access = _postings(plain["open_access"])
+        index._graphs = _postings(plain["graphs"])
+        return index
+
+    def save(self, path: str) -> None:
+        """Write the index to a file, to be read back with load()."""
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> "PaperIndex":
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+
+def _plain_postings(postings: Postings) -> Dict[str, List[int]]:
+    return {key: posting.tolist() for key, posting in postings.items()}
+
+
+def _postings(plain: Dict[str, Any]) -> Postings:
+    return {sys.intern(key): array("q", numbers) for key, numbers in plain.items()}
@@ -0,0 +1,191 @@
+"""
+Compact binary serialization of graphs and of the other dataclasses of
+connectedpapers.graph, for shipping them between services and storing them in
+key-value stores.
+
+A serialized value is a short header, naming the codec and the compression of
+the payload, followed by the payload:
+* The codec is msgpack if it is installed, or JSON otherwise (orjson if it is
+  installed).
+* The compression is zstd if zstandard is installed, or zlib otherwise.
+
+from_bytes() reads the header, so values written with any codec and
+compression can be read back wherever the same libraries are installed.
+msgpack and zstandard are optional dependencies: pip install
+connectedpapers-py[binary].
+"""
+
+import dataclasses
+import importlib
+import json
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+from .decoding import decoder_for, loads
+
+try:
+    _msgpack: Any = importlib.import_module("msgpack")
+except ImportError:
+    _msgpack = None
+
+try:
+    _zstandard: Any = importlib.import_module("zstandard")
+except ImportError:
+    _zstandard = None
+
+try:
+    _orjson: Any = importlib.import_module("orjson")
+except ImportError:
+    _orjson = None
+
+MAGIC = b"CPG1"
+
+JSON = "json"
+MSGPACK = "msgpack"
+
+NONE = "none"
+ZLIB = "zlib"
+ZSTD = "zstd"
+
+DEFAULT_ZLIB_LEVEL = 6
+DEFAULT_ZSTD_LEVEL = 3
+
+_CODECS = {JSON: b"j", MSGPACK: b"m"}
+_COMPRESSIONS = {NONE: b"-", ZLIB: b"z", ZSTD: b"s"}
+_HEADER_SIZE = len(MAGIC) + 2
+
+T = TypeVar("T")
+
+
+def default_codec() -> str:
+    return MSGPACK if _msgpack is not None else JSON
+
+
+def default_compression() -> str:
+    return ZSTD if _zstandard is not None else ZLIB
+
+
+def _require(module: Any, name: str) -> Any:
+    if module is None:
+        raise ImportError(
+            f"The {name} format requires the {name} package: "
+            "pip install connectedpapers-py[binary]"
+        )
+    return module
+
+
+_field_names: Dict[type, Tuple[str, ...]] = {}
+
+
+def _plain(value: Any) -> Any:
+    """Convert dataclasses (and the sequence views of compact graphs) to plain data."""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    cls = type(value)
+    names = _field_names.get(cls)
+    if names is None and dataclasses.is_dataclass(value):
+        names = _field_names[cls] = tuple(
+            field.name for field in dataclasses.fields(value)
+        )
+    if names is not None:
+        return {name: _plain(getattr(value, name)) for name in names}
+    return [_plain(item) for item in value]
+
+
+def _encode_json(data: Any) -> bytes:
+    if _orjson is not None:
+        return bytes(_orjson.dumps(data))
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _encode(codec: str, data: Any) -> bytes:
+    if codec == MSGPACK:
+        return bytes(_require(_msgpack, MSGPACK).packb(data, use_bin_type=True))
+    if codec == JSON:
+        return _encode_json(data)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def _decode(codec: bytes, payload: bytes) -> Any:
+    if codec == _CODECS[MSGPACK]:
+        return _require(_msgpack, MSGPACK).unpackb(payload, raw=False)
+    if codec == _CODECS[JSON]:
+        return loads(payload)
+    raise ValueError(f"Unknown codec: {codec!r}")
+
+
+def _compress(compression: str, data: bytes, level: Optional[int]) -> bytes:
+    if compression == ZSTD:
+        zstandard = _require(_zstandard, "zstandard")
+        compressor = zstandard.ZstdCompressor(
+            level=DEFAULT_ZSTD_LEVEL if level is None else level
+        )
+        return bytes(compressor.compress(data))
+    if compression == ZLIB:
+        return zlib.compress(data, DEFAULT_ZLIB_LEVEL if level is None else level)
+    if compression == NONE:
+        return data
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def _decompress(compression: bytes, data: bytes) -> bytes:
+    if compression == _COMPRESSIONS[ZSTD]:
+        return bytes(
+            _require(_zstandard, "zstandard").ZstdDecompressor().decompress(data)
+        )
+    if compression == _COMPRESSIONS[ZLIB]:
+        return zlib.decompress(data)
+    if compression == _COMPRESSIONS[NONE]:
+        return data
+    raise ValueError(f"Unknown compression: {compression!r}")
+
+
+def to_bytes(
+    value: Any,
+    codec: Optional[str] = None,
+    compression: Optional[str] = None,
+    level: Optional[int] = None,
+) -> bytes:
+    """
+    Serialize a dataclass of connectedpapers.graph, such as a Graph or a Paper,
+    or plain data: dicts, lists, strings and numbers.
+
+    Args:
+        value: The value to serialize
+        codec: MSGPACK or JSON (default_codec() by default)
+        compression: ZSTD, ZLIB or NONE (default_compression() by default)
+        level: Compression level, for the compression's default level if None
+    """
+    codec = default_codec() if codec is None else codec
+    compression = default_compression() if compression is None else compression
+    if codec not in _CODECS:
+        raise ValueError(f"Unknown codec: {codec}")
+    if compression not in _COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    payload = _compress(compression, _encode(codec, _plain(value)), level)
+    return MAGIC + _CODECS[codec] + _COMPRESSIONS[compression] + payload
+
+
+def is_serialized(data: bytes) -> bool:
+    """Whether data was written by to_bytes()."""
+    return data[: len(MAGIC)] == MAGIC
+
+
+def plain_from_bytes(data: bytes) -> Any:
+    """Deserialize a value written by to_bytes(), as plain data."""
+    if not is_serialized(data):
+        raise ValueError("Not a serialized connectedpapers value")
+    codec, compression = data[len(MAGIC)], data[len(MAGIC) + 1]
+    return _decode(
+        bytes((codec,)), _decompress(bytes((compression,)), data[_HEADER_SIZE:])
+    )
+
+
+def from_bytes(data: bytes, cls: Type[T]) -> T:
+    """Deserialize a value of class cls written by to_bytes()."""
+    decode: Callable[[Dict[str, Any]], T] = decoder_for(cls)
+    return decode(plain_from_bytes(data))
@@ -0,0 +1,309 @@
+"""
+Spatial queries over the layout positions of papers (Paper.pos).
+
+A SpatialIndex buckets the positions into a uniform grid, and sorts them by
+grid cell, column by column, so that the points of a run of cells in one
+column are contiguous. A query only scans the cells it overlaps: a bounding
+box query costs O(cells overlapped + points found).
+
+spatial_index() builds the index of a graph on first use and caches it for the
+lifetime of the graph, so graphs should not be mutated after indexing.
+SpatialIndex.from_corpus() indexes the papers merged in a GraphCorpus, at the
+position of the first graph each appeared in.
+
+Candidate points are filtered with numpy when it is installed (the numpy
+extra), and in pure Python otherwise.
+"""
+
+import bisect
+import heapq
+import importlib
+import math
+import weakref
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .corpus import GraphCorpus
+from .graph import Graph, PaperID
+
+try:
+    _numpy: Any = importlib.import_module("numpy")
+except ImportError:
+    _numpy = None
+
+DEFAULT_POINTS_PER_CELL = 4
+DEFAULT_MIN_POINTS = 4
+NOISE = -1  # The cluster label of points that belong to no cluster
+
+Ranges = List[Tuple[int, int]]
+
+
+class SpatialIndex:
+    """
+    A grid index of 2-D points. The points of grid cell (column, row) have the
+    key column * rows + row, and points are sorted by key, so the points of
+    cells from_row to to_row of a column are those with keys in
+    [column * rows + from_row, column * rows + to_row].
+    """
+
+    def __init__(
+        self,
+        points: Iterable[Tuple[PaperID, Sequence[float]]],
+        cell_size: Optional[float] = None,
+    ) -> None:
+        """
+        Args:
+            points: (paper ID, position) pairs
+            cell_size: Side of the grid cells; by default, such that there are
+                       DEFAULT_POINTS_PER_CELL points per cell on average
+        """
+        ids: List[PaperID] = []
+        xs: "array[float]" = array("d")
+        ys: "array[float]" = array("d")
+        for paper_id, pos in points:
+            ids.append(paper_id)
+            xs.append(float(pos[0]))
+            ys.append(float(pos[1]))
+        self.min_x = min(xs) if ids else 0.0
+        self.min_y = min(ys) if ids else 0.0
+        self.max_x = max(xs) if ids else 0.0
+        self.max_y = max(ys) if ids else 0.0
+        if cell_size is None:
+            cell_size = self._default_cell_size(len(ids))
+        if not cell_size > 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = cell_size
+        self.columns = int((self.max_x - self.min_x) / cell_size) + 1
+        self.rows = int((self.max_y - self.min_y) / cell_size) + 1
+        keys = [self._key(x, y) for x, y in zip(xs, ys)]
+        order = sorted(range(len(ids)), key=keys.__getitem__)
+        self.node_ids: List[PaperID] = [ids[i] for i in order]
+        self.node_index: Dict[PaperID, int] = {
+            paper_id: i for i, paper_id in enumerate(self.node_ids)
+        }
+        self.xs: "array[float]" = array("d", (xs[i] for i in order))
+        self.ys: "array[float]" = array("d", (ys[i] for i in order))
+        self.keys: "array[int]" = array("q", (keys[i] for i in order))
+
+    @classmethod
+    def from_graph(
+        cls, graph: Graph, cell_size: Optional[float] = None
+    ) -> "SpatialIndex":
+        return cls(
+            ((paper_id, paper.pos) for paper_id, paper in graph.nodes.items()),
+            cell_size,
+        )
+
+    @classmethod
+    def from_corpus(
+        cls, corpus: GraphCorpus, cell_size: Optional[float] = None
+    ) -> "SpatialIndex":
+        return cls(
+            ((paper_id, paper.pos) for paper_id, paper in corpus.papers.items()),
+            cell_size,
+        )
+
+    def _default_cell_size(self, n: int) -> float:
+        area = (self.max_x - self.min_x) * (self.max_y - self.min_y)
+        if n == 0 or area <= 0:
+            # Empty, or all points on a line: size cells along the longest side
+            side = max(self.max_x - self.min_x, self.max_y - self.min_y)
+            return side * DEFAULT_POINTS_PER_CELL / n if n and side > 0 else 1.0
+        return math.sqrt(area * DEFAULT_POINTS_PER_CELL / n)
+
+    def _column(self, x: float) -> int:
+        return int((x - self.min_x) // self.cell_size)
+
+    def _row(self, y: float) -> int:
+        return int((y - self.min_y) // self.cell_size)
+
+    def _key(self, x: float, y: float) -> int:
+        return self._column(x) * self.rows + self._row(y)
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def __contains__(self, paper_id: object) -> bool:
+        return paper_id in self.node_index
+
+    def position(self, paper_id: PaperID) -> Tuple[float, float]:
+        i = self.node_index[paper_id]
+        return self.xs[i], self.ys[i]
+
+    def _ranges(self, min_x: float, min_y: float, max_x: float, max_y: float) -> Ranges:
+        """The index ranges of the points in the cells that overlap a box."""
+        if (
+            not self.node_ids
+            or max_x < self.min_x
+            or max_y < self.min_y
+            or min_x > self.max_x
+            or min_y > self.max_y
+        ):
+            return []
+        first_column = self._column(max(min_x, self.min_x))
+        last_column = self._column(min(max_x, self.max_x))
+        first_row = self._row(max(min_y, self.min_y))
+        last_row = self._row(min(max_y, self.max_y))
+        keys, rows = self.keys, self.rows
+        ranges: Ranges = []
+        for column in range(first_column, last_column + 1):
+            start = bisect.bisect_left(keys, column * rows + first_row)
+            end = bisect.bisect_right(keys, column * rows + last_row, start)
+            if start == end:
+                continue
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        return ranges
+
+    def _numpy_candidates(self, ranges: Ranges) -> Any:
+        """The indices in ranges, as one numpy array."""
+        np = _numpy
+        if not ranges:
+            return np.empty(0, dtype=np.intp)
+        if len(ranges) == 1:
+            return np.arange(ranges[0][0], ranges[0][1])
+        starts, ends = np.array(ranges, dtype=np.intp).T
+        lengths = ends - starts
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return np.arange(int(lengths.sum())) + offsets
+
+    def _numpy_points(self) -> Tuple[Any, Any]:
+        return (
+            _numpy.frombuffer(self.xs, dtype=_numpy.float64),
+            _numpy.frombuffer(self.ys, dtype=_numpy.float64),
+        )
+
+    def _box_indices(
+        self, min_x: float, min_y: float, max_x: float, max_y: float
+    ) -> List[int]:
+        ranges = self._ranges(min_x, min_y, max_x, max_y)
+        if _numpy is not None:
+            candidates = self._numpy_candidates(ranges)
+            xs, ys = self._numpy_points()
+            x, y = xs[candidates], ys[candidates]
+            inside = (x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)
+            return list(candidates[inside].tolist())
+        xs_, ys_ = self.xs, self.ys
+        return [
+            i
+            for start, end in ranges
+            for i in range(start, end)
+            if min_x <= xs_[i] <= max_x and min_y <= ys_[i] <= max_y
+        ]
+
+    def within(
+        self, min_x: float, min_y: float, max_x: float, max_y: float
+    ) -> List[PaperID]:
+        """The papers inside a bounding box, including its edges."""
+        node_ids = self.node_ids
+        return [node_ids[i] for i in self._box_indices(min_x, min_y, max_x, max_y)]
+
+    def _distances(self, x: float, y: float, ranges: Ranges) -> List[Tuple[float, int]]:
+        """(distance, index) of the points in ranges, from (x, y)."""
+        if _numpy is not None:
+            candidates = self._numpy_candidates(ranges)
+            xs, ys = self._numpy_points()
+            distances = _numpy.hypot(xs[candidates] - x, ys[candidates] - y)
+            return list(zip(distances.tolist(), candidates.tolist()))
+        xs_, ys_ = self.xs, self.ys
+        return [
+            (math.hypot(xs_[i] - x, ys_[i] - y), i)
+            for start, end in ranges
+            for i in range(start, end)
+        ]
+
+    def _radius_indices(self, x: float, y: float, radius: float) -> List[int]:
+        ranges = self._ranges(x - radius, y - radius, x + radius, y + radius)
+        if _numpy is not None:
+            candidates = self._numpy_candidates(ranges)
+            xs, ys = self._numpy_points()
+            dx, dy = xs[candidates] - x, ys[candidates] - y
+            return list(candidates[dx * dx + dy * dy <= radius * radius].tolist())
+        return [
+            i for distance, i in self._distances(x, y, ranges) if distance <= radius
+        ]
+
+    def within_radius(self, x: float, y: float, radius: float) -> List[PaperID]:
+        """The papers at most radius away from (x, y)."""
+        node_ids = self.node_ids
+        return [node_ids[i] for i in self._radius_indices(x, y, radius)]
+
+    def nearest(self, x: float, y: float, k: int = 1) -> List[Tuple[PaperID, float]]:
+        """
+        The k papers nearest to (x, y), as (paper ID, distance) pairs from the
+        nearest. Searches squares around (x, y) that double in size until they
+        hold k papers within their inner circle.
+        """
+        if k < 1 or not self.node_ids:
+            return []
+        half = self.cell_size
+        while True:
+            ranges = self._ranges(x - half, y - half, x + half, y + half)
+            found = self._distances(x, y, ranges)
+            covers_all = (
+                x - half <= self.min_x
+                and y - half <= self.min_y
+                and x + half >= self.max_x
+                and y + half >= self.max_y
+            )
+            if len(found) >= k or covers_all:
+                nearest = heapq.nsmallest(k, found)
+                if covers_all or nearest[-1][0] <= half:
+                    return [(self.node_ids[i], distance) for distance, i in nearest]
+            half *= 2
+
+    def nearest_to(self, paper_id: PaperID, k: int = 1) -> List[Tuple[PaperID, float]]:
+        """The k papers nearest to a paper of the index, excluding itself."""
+        x, y = self.position(paper_id)
+        return [
+            (other, distance)
+            for other, distance in self.nearest(x, y, k + 1)
+            if other != paper_id
+        ][:k]
+
+    def clusters(
+        self, radius: float, min_points: int = DEFAULT_MIN_POINTS
+    ) -> Dict[PaperID, int]:
+        """
+        Label dense clusters of papers with DBSCAN: a paper with at least
+        min_points papers (itself included) within radius is a core paper, core
+        papers within radius of each other are in the same cluster, and other
+        papers join the cluster of a core paper within radius, if any.
+
+        Returns:
+            The cluster of every paper, numbered from 0 in the order of the
+            index, or NOISE for papers in no cluster
+        """
+        xs, ys = self.xs, self.ys
+        neighbors = [self._radius_indices(xs[i], ys[i], radius) for i in range(len(xs))]
+        labels = [NOISE] * len(xs)
+        cluster = 0
+        for i, seed_neighbors in enumerate(neighbors):
+            if labels[i] != NOISE or len(seed_neighbors) < min_points:
+                continue
+            labels[i] = cluster
+            stack = [i]
+            while stack:
+                j = stack.pop()
+                if len(neighbors[j]) < min_points:
+                    continue  # A border paper: it doesn't extend the cluster
+                for other in neighbors[j]:
+                    if labels[other] == NOISE:
+                        labels[other] = cluster
+                        stack.append(other)
+            cluster += 1
+        return dict(zip(self.node_ids, labels))
+
+
+_indexes: Dict[int, SpatialIndex] = {}
+
+
+def spatial_index(graph: Graph) -> SpatialIndex:
+    """Return the spatial index of a graph, building it on first use."""
+    index = _indexes.get(id(graph))
+    if index is None:
+        index = _indexes[id(graph)] = SpatialIndex.from_graph(graph)
+        weakref.finalize(graph, _indexes.pop, id(graph), None)
+    return index
@@ -0,0 +1,305 @@
+"""
+Incremental parsing of graph API responses, as their bytes arrive.
+
+GraphStreamParser reads the response body chunk by chunk, and emits every node
+and edge of the graph as soon as its JSON value is complete. Only the outline
+of the document (the response, graph_json, and its nodes and edges) is scanned
+here; each node, edge and other field is handed whole to the json module's C
+decoder. The parser buffers the value being read rather than the whole body.
+The other fields of the response and of the graph are kept until the end.
+
+PaperIDStreamParser does the same for the free access papers response, and
+emits every paper ID of its list as soon as it was read.
+"""
+
+import codecs
+import dataclasses
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .decoding import decode_graph, decoder_for
+from .graph import Edge, Graph, Paper, PaperID
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+# Whole strings, brackets, and the quote of a string that isn't complete yet
+_NESTING = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\]]|"', re.DOTALL)
+_SCALAR_END = re.compile(r"[,}\] \t\n\r]")
+_PAPERS_START = re.compile(r'"papers"[ \t\n\r]*:[ \t\n\r]*\[')
+_ITEM_SEPARATOR = re.compile(r"[ \t\n\r,]*")
+_json_decoder = json.JSONDecoder()
+
+# What a frame expects next
+_KEY, _COLON, _VALUE, _NEXT = range(4)
+
+
+@dataclasses.dataclass
+class StreamedNode:
+    """A node of a graph, emitted as soon as it was parsed."""
+
+    paper_id: PaperID
+    paper: Paper
+
+
+@dataclasses.dataclass
+class StreamedEdge:
+    """An edge of a graph, emitted as soon as it was parsed."""
+
+    edge: Edge
+
+
+StreamEvent = Union[StreamedNode, StreamedEdge]
+
+
+class _Frame:
+    """An object or array of the document outline that the parser is inside of."""
+
+    __slots__ = ("name", "is_object", "expects", "key", "count")
+
+    def __init__(self, name: str, is_object: bool) -> None:
+        self.name = name  # "response", "graph_json", "nodes" or "edges"
+        self.is_object = is_object
+        self.expects = _KEY if is_object else _VALUE
+        self.key = ""  # Key of the current member of an object
+        self.count = 0  # Number of members or items read
+
+
+class _PendingValue:
+    """
+    Tracks the nesting of a value that spans chunks, so that each of its
+    characters is scanned once, however many chunks it spans.
+    """
+
+    __slots__ = ("offset", "depth", "is_scalar")
+
+    def __init__(self, first_char: str) -> None:
+        self.offset = 0  # Offset from the start of the value scanned up to
+        self.depth = 0
+        self.is_scalar = first_char not in '{["'
+
+    def scan(self, buffer: str, start: int) -> bool:
+        """Continue scanning the value at start; True once it is complete."""
+        if self.is_scalar:
+            return _SCALAR_END.search(buffer, start) is not None
+        for match in _NESTING.finditer(buffer, start + self.offset):
+            token = match.group()
+            if token == '"':  # A string that continues in the next chunk
+                self.offset = match.start() - start
+                return False
+            if token[0] == '"':
+                pass
+            elif token == "{" or token == "[":
+                self.depth += 1
+            else:
+                self.depth -= 1
+            if self.depth == 0:
+                return True
+        self.offset = len(buffer) - start
+        return False
+
+
+class GraphStreamParser:
+    """
+    Parses a graph API response incrementally:
+
+        parser = GraphStreamParser()
+        for chunk in chunks:
+            for event in parser.feed(chunk):
+                ...  # StreamedNode or StreamedEdge
+        fields, graph = parser.close()
+
+    close() returns the top-level fields of the response other than graph_json
+    (status, progress...), and the graph without its nodes and edges, or None
+    if the response had no graph.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        # How far the value at _pos, which continues in a later chunk, was scanned
+        self._pending: Optional[_PendingValue] = None
+        self._stack: List[_Frame] = []
+        self._started = False
+        self._has_graph = False
+        self.fields: Dict[str, Any] = {}
+        self.graph_fields: Dict[str, Any] = {}
+
+    @property
+    def buffered_chars(self) -> int:
+        """Number of characters of the body held by the parser."""
+        return len(self._buffer)
+
+    @property
+    def done(self) -> bool:
+        return self._started and not self._stack
+
+    def feed(self, chunk: bytes) -> List[StreamEvent]:
+        """Parse the next chunk of the body, returning the completed nodes and edges."""
+        self._buffer += self._decoder.decode(chunk)
+        events: List[StreamEvent] = []
+        self._parse(events)
+        consumed, self._pos = self._pos, 0
+        self._buffer = self._buffer[consumed:]
+        if self.done and self._buffer.strip():
+            raise ValueError("Unexpected data after the end of the response")
+        return events
+
+    def close(self) -> Tuple[Dict[str, Any], Optional[Graph]]:
+        if not self.done:
+            raise ValueError("Truncated graph response")
+        if not self._has_graph:
+            return self.fields, None
+        return self.fields, decode_graph(dict(self.graph_fields, nodes={}, edges=[]))
+
+    def _parse(self, events: List[StreamEvent]) -> None:
+        buffer = self._buffer
+        stack = self._stack
+        while True:
+            match = _WHITESPACE.match(buffer, self._pos)
+            assert match is not None
+            pos = self._pos = match.end()
+            if pos >= len(buffer):
+                return
+            char = buffer[pos]
+            if not self._started:
+                if char != "{":
+                    raise ValueError("A graph response must be a JSON object")
+                self._started = True
+                stack.append(_Frame("response", True))
+                self._pos += 1
+                continue
+            if not stack:
+                return
+            frame = stack[-1]
+            if frame.expects == _KEY:
+                if char == "}" and frame.count == 0:
+                    self._close()
+                    continue
+                match = _STRING.match(buffer, pos)
+                if match is None:
+                    if char != '"':
+                        raise ValueError(f"Expected a key, got {char!r}")
+                    return  # The key continues in the next chunk
+                key = match.group()
+                frame.key = json.loads(key) if "\\" in key else key[1:-1]
+                frame.expects = _COLON
+                self._pos = match.end()
+            elif frame.expects == _COLON:
+                if char != ":":
+                    raise ValueError(f"Expected ':', got {char!r}")
+                frame.expects = _VALUE
+                self._pos += 1
+            elif frame.expects == _VALUE:
+                if char == "]" and not frame.is_object and frame.count == 0:
+                    self._close()
+                    continue
+                child = self._child_frame(frame, char)
+                if child is not None:
+                    stack.append(child)
+                    self._pos += 1
+                    continue
+                if self._pending is None:
+                    # Most values are complete, so try to decode them right away
+                    try:
+                        value, end = _json_decoder.raw_decode(buffer, pos)
+                    except json.JSONDecodeError:
+                        end = len(buffer)
+                    if end >= len(buffer):  # Incomplete, or a number that may be
+                        self._pending = _PendingValue(char)
+                if self._pending is not None:
+                    if not self._pending.scan(buffer, pos):
+                        return  # The value continues in the next chunk
+                    self._pending = None
+                    value, end = _json_decoder.raw_decode(buffer, pos)
+                self._pos = end
+                self._value(frame, value, events)
+            elif char == ",":
+                frame.expects = _KEY if frame.is_object else _VALUE
+                self._pos += 1
+            elif char == ("}" if frame.is_object else "]"):
+                self._close()
+            else:
+                raise ValueError(
+                    f"Expected ',' or the end of a container, got {char!r}"
+                )
+
+    def _child_frame(self, frame: _Frame, char: str) -> Optional[_Frame]:
+        """The frame of the outline value starting at char, if it is one."""
+        if frame.name == "response" and frame.key == "graph_json" and char == "{":
+            self._has_graph = True
+            return _Frame("graph_json", True)
+        if frame.name == "graph_json":
+            if frame.key == "nodes" and char == "{":
+                return _Frame("nodes", True)
+            if frame.key == "edges" and char == "[":
+                return _Frame("edges", False)
+        return None
+
+    def _close(self) -> None:
+        """Leave the innermost frame, at its closing bracket."""
+        self._pos += 1
+        self._stack.pop()
+        if self._stack:
+            self._end_value(self._stack[-1])
+
+    @staticmethod
+    def _end_value(frame: _Frame) -> None:
+        frame.expects = _NEXT
+        frame.count += 1
+
+    def _value(self, frame: _Frame, value: Any, events: List[StreamEvent]) -> None:
+        self._end_value(frame)
+        if frame.name == "nodes":
+            events.append(StreamedNode(frame.key, decoder_for(Paper)(value)))
+        elif frame.name == "edges":
+            events.append(StreamedEdge(value))
+        elif frame.name == "graph_json":
+            self.graph_fields[frame.key] = value
+        else:
+            self.fields[frame.key] = value
+
+
+class PaperIDStreamParser:
+    """
+    Parses the {"papers": [...]} free access papers response incrementally,
+    returning the paper IDs of every chunk that completes them.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._in_list = False
+        self.done = False
+
+    def feed(self, chunk: bytes) -> List[PaperID]:
+        buffer = self._buffer + self._decoder.decode(chunk)
+        paper_ids: List[PaperID] = []
+        pos = 0
+        if not self._in_list:
+            start = _PAPERS_START.search(buffer)
+            if start is None:
+                self._buffer = buffer
+                return paper_ids
+            self._in_list = True
+            pos = start.end()
+        while not self.done:
+            separator = _ITEM_SEPARATOR.match(buffer, pos)
+            assert separator is not None
+            pos = separator.end()
+            if buffer.startswith("]", pos):
+                self.done = True
+                pos += 1
+                break
+            string = _STRING.match(buffer, pos)
+            if string is None:
+                break  # The next ID continues in a later chunk
+            paper_ids.append(json.loads(string.group()))
+            pos = string.end()
+        self._buffer = buffer[pos:]
+        return paper_ids
+
+    def close(self) -> None:
+        if not self.done:
+            raise ValueError("Truncated free access papers response")
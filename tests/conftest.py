@@ -0,0 +1,11 @@
+from typing import Iterator
+
+import pytest
+
+from tests.mock_server import MockConnectedPapersServer, MockServerThread
+
+
+@pytest.fixture
+def mock_server() -> Iterator[MockConnectedPapersServer]:
+    with MockServerThread() as server:
+        yield server
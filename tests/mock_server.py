@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import random
+import threading
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from aiohttp import web
+
+from connectedpapers.decoding import decode_graph
+from connectedpapers.diff import GRAPH_DIFF, graph_version, make_patch
+from connectedpapers.graph import Graph, PaperID
+
+JsonDict = Dict[str, Any]
+
+
+def make_paper_json(paper_id: PaperID, index: int, rng: random.Random) -> JsonDict:
+    return {
+        "abstract": f"Abstract of paper {index}. " * 8,
+        "arxivId": None,
+        "authors": [
+            {
+                "ids": [str(rng.randrange(10**8))],
+                "name": f"Author {rng.randrange(500)}",
+            }
+            for _ in range(rng.randrange(1, 6))
+        ],
+        "corpusid": index,
+        "doi": f"10.1000/{index}",
+        "externalIds": {
+            "ACL": None,
+            "ArXiv": None,
+            "CorpusId": index,
+            "DBLP": None,
+            "DOI": f"10.1000/{index}",
+            "MAG": str(index),
+            "PubMed": None,
+            "PubMedCentral": None,
+        },
+        "fieldsOfStudy": ["Computer Science"],
+        "id": paper_id,
+        "isOpenAccess": bool(index % 2),
+        "journalName": "Journal of Tests",
+        "journalPages": "1-10",
+        "journalVolume": "1",
+        "magId": str(index),
+        "number_of_authors": 3,
+        "paperId": paper_id,
+        "pdfUrls": [],
+        "pmid": None,
+        "publicationDate": "2020-01-01",
+        "publicationTypes": ["JournalArticle"],
+        "title": f"Paper number {index}",
+        "tldr": f"TLDR of paper {index}.",
+        "url": f"https://example.com/{paper_id}",
+        "venue": f"Venue {index % 7}",
+        "year": 1990 + index % 30,
+    }
+
+
+def make_graph_json(
+    start_id: PaperID, num_nodes: int = 20, edges_per_node: int = 4, seed: int = 0
+) -> JsonDict:
+    """Build a synthetic graph payload shaped like the REST API's graph_json."""
+    rng = random.Random(seed)
+    ids = [start_id] + [f"{seed:04x}{i:036x}" for i in range(1, num_nodes)]
+    nodes: JsonDict = {}
+    path_lengths: Dict[PaperID, float] = {}
+    for index, paper_id in enumerate(ids):
+        paper = make_paper_json(paper_id, index, rng)
+        length = 0.0 if index == 0 else 1.0 + rng.random()
+        paper.update(
+            path=[start_id] if index == 0 else [start_id, paper_id],
+            path_length=length,
+            pos=[rng.uniform(-100, 100), rng.uniform(-100, 100)],
+        )
+        nodes[paper_id] = paper
+        path_lengths[paper_id] = length
+    edges: List[List[Any]] = []
+    for index, paper_id in enumerate(ids[1:], 1):
+        edges.append([start_id, paper_id, rng.random()])
+        for _ in range(edges_per_node - 1):
+            other = ids[rng.randrange(num_nodes)]
+            if other != paper_id:
+                edges.append([paper_id, other, rng.random()])
+    common = [
+        dict(
+            make_paper_json(f"c{i:039x}", num_nodes + i, rng),
+            edges_count=rng.randrange(1, 10),
+            paper_id=f"c{i:039x}",
+            pi_name=None,
+        )
+        for i in range(num_nodes // 4)
+    ]
+    return {
+        "common_authors": [
+            {
+                "id": str(i),
+                "mention_indexes": [0, 1],
+                "mentions": ids[:2],
+                "name": f"Author {i}",
+                "url": f"https://example.com/author/{i}",
+            }
+            for i in range(3)
+        ],
+        "common_citations": [dict(c, local_references=ids[:3]) for c in common],
+        "common_references": [dict(c, local_citations=ids[:3]) for c in common],
+        "edges": edges,
+        "nodes": nodes,
+        "path_lengths": path_lengths,
+        "start_id": start_id,
+    }
+
+
+def make_build_script(
+    paper_id: PaperID,
+    queued: int = 1,
+    progress: Sequence[float] = (25.0, 50.0, 75.0),
+    overloaded: int = 0,
+    num_nodes: int = 20,
+) -> List[JsonDict]:
+    """A script for a graph build: OVERLOADED and QUEUED responses, one
+    IN_PROGRESS response per progress value, and then the FRESH_GRAPH."""
+    return (
+        [{"status": "OVERLOADED"}] * overloaded
+        + [{"status": "QUEUED"}] * queued
+        + [{"status": "IN_PROGRESS", "progress": value} for value in progress]
+        + [
+            {
+                "status": "FRESH_GRAPH",
+                "graph_json": make_graph_json(paper_id, num_nodes=num_nodes),
+            }
+        ]
+    )
+
+
+class MockConnectedPapersServer:
+    """A local stand-in for the Connected Papers REST API.
+
+        Graph requests for a paper are answered from its script, one entry per
+        request, repeating the last entry once the script runs out. Papers without
+        a script get an OLD_GRAPH (or FRESH_GRAPH when fresh_only) response, with a
+        synthetic graph of `graph_nodes` papers that is generated once per paper.
+    A script entry with an "http_status" is sent with that HTTP status.
+
+        Graphs are sent with their graph_version as ETag. A request whose
+        If-None-Match matches the graph gets 304 Not Modified for a FRESH_GRAPH,
+        and other responses without the graph. With `A-IM: graph-diff`, a graph
+        whose If-None-Match version the server sent before is sent as a patch.
+
+        With `compress`, response bodies are compressed with a content coding of
+        the request's Accept-Encoding that aiohttp supports (gzip or deflate).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        graph_nodes: int = 20,
+        edges_per_node: int = 4,
+        compress: bool = False,
+    ) -> None:
+        self.scripts: Dict[PaperID, List[JsonDict]] = {}
+        self.graph_nodes = graph_nodes
+        self.edges_per_node = edges_per_node
+        self._graphs: Dict[PaperID, JsonDict] = {}
+        # The version of each graph_json sent, and the graphs by version
+        self._versions: Dict[int, Tuple[JsonDict, Optional[str]]] = {}
+        self._sent_graphs: Dict[str, Graph] = {}
+        self.http_statuses: List[int] = []
+        self.remaining_uses = 100
+        self.free_access_papers: List[PaperID] = []
+        self.graph_requests: List[Tuple[PaperID, bool]] = []
+        self.peers: Set[Tuple[str, int]] = set()
+        self.latency = latency
+        self.compress = compress
+        self.accept_encodings: List[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def start(self, port: int = 0) -> str:
+        app = web.Application(middlewares=[self._compression])
+        app.router.add_get("/papers-api/graph/{fresh}/{paper_id}", self._graph)
+        app.router.add_get("/papers-api/remaining-usages", self._remaining_usages)
+        app.router.add_get("/papers-api/free-access-papers", self._free_access)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _compression(
+        self,
+        request: web.Request,
+        handler: Callable[[web.Request], Awaitable[web.StreamResponse]],
+    ) -> web.StreamResponse:
+        self.accept_encodings.append(request.headers.get("Accept-Encoding", ""))
+        response = await handler(request)
+        if self.compress and response.status != 304:
+            response.enable_compression()
+        return response
+
+    def _record_peer(self, request: web.Request) -> None:
+        if request.transport is not None:
+            peer = request.transport.get_extra_info("peername")
+            self.peers.add((peer[0], peer[1]))
+
+    def graph_json(self, paper_id: PaperID) -> JsonDict:
+        graph = self._graphs.get(paper_id)
+        if graph is None:
+            graph = self._graphs[paper_id] = make_graph_json(
+                paper_id, self.graph_nodes, self.edges_per_node
+            )
+        return graph
+
+    def graph_response(self, paper_id: PaperID, fresh_only: bool) -> JsonDict:
+        script = self.scripts.get(paper_id)
+        if not script:
+            status = "FRESH_GRAPH" if fresh_only else "OLD_GRAPH"
+            return {"status": status, "graph_json": self.graph_json(paper_id)}
+        return script.pop(0) if len(script) > 1 else script[0]
+
+    async def _graph(self, request: web.Request) -> web.Response:
+        self._record_peer(request)
+        paper_id = request.match_info["paper_id"]
+        fresh_only = request.match_info["fresh"] == "1"
+        self.graph_requests.append((paper_id, fresh_only))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            response = dict(self.graph_response(paper_id, fresh_only))
+        finally:
+            self.in_flight -= 1
+        http_status = response.pop("http_status", None)
+        if http_status is not None:
+            return self._respond(response, http_status)
+        response.setdefault("remaining_requests", self.remaining_uses)
+        graph_json = response.get("graph_json")
+        version = None if graph_json is None else self.version_of(graph_json)
+        if version is None:
+            return self._respond(response)
+        headers = {"ETag": f'"{version}"'}
+        held = request.headers.get("If-None-Match", "").strip('"')
+        if held == version:
+            if response["status"] == "FRESH_GRAPH":
+                return self._respond(None, 304, headers)
+            del response["graph_json"]
+        elif (
+            GRAPH_DIFF in request.headers.get("A-IM", "") and held in self._sent_graphs
+        ):
+            del response["graph_json"]
+            response["graph_diff"] = make_patch(
+                self._sent_graphs[held], self._sent_graphs[version]
+            )
+            return self._respond(response, 226, headers)
+        return self._respond(response, 200, headers)
+
+    def version_of(self, graph_json: JsonDict) -> Optional[str]:
+        """The graph_version of a graph_json, or None if it isn't a valid graph."""
+        entry = self._versions.get(id(graph_json))
+        if entry is None:
+            try:
+                graph = decode_graph(graph_json)
+            except (KeyError, TypeError, ValueError):
+                entry = self._versions[id(graph_json)] = (graph_json, None)
+            else:
+                version = graph_version(graph)
+                entry = self._versions[id(graph_json)] = (graph_json, version)
+                self._sent_graphs[version] = graph
+        return entry[1]
+
+    def _respond(
+        self,
+        body: Optional[JsonDict],
+        status: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> web.Response:
+        self.http_statuses.append(status)
+        if body is None:
+            return web.Response(status=status, headers=headers)
+        return web.json_response(body, status=status, headers=headers)
+
+    async def _remaining_usages(self, request: web.Request) -> web.Response:
+        self._record_peer(request)
+        return web.json_response({"remaining_uses": self.remaining_uses})
+
+    async def _free_access(self, request: web.Request) -> web.Response:
+        self._record_peer(request)
+        return web.json_response({"papers": self.free_access_papers})
+
+
+class MockServerThread:
+    """Runs a MockConnectedPapersServer on a private event loop thread, so that
+    both sync and async client calls can be made against it from tests."""
+
+    def __init__(self, server: Optional[MockConnectedPapersServer] = None) -> None:
+        self.server = server or MockConnectedPapersServer()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def __enter__(self) -> MockConnectedPapersServer:
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self._loop).result()
+        return self.server
+
+    def __exit__(self, *exc_info: Any) -> None:
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+async def _serve(server: MockConnectedPapersServer, port: int) -> None:
+    url = await server.start(port)
+    print(f"Mock Connected Papers API at {url}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    """Serve the mock API, for running the client against it by hand."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--graph-nodes", type=int, default=20)
+    parser.add_argument("--edges-per-node", type=int, default=4)
+    parser.add_argument("--compress", action="store_true")
+    args = parser.parse_args()
+    server = MockConnectedPapersServer(
+        args.latency, args.graph_nodes, args.edges_per_node, args.compress
+    )
+    try:
+        asyncio.run(_serve(server, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import gc
+import math
+from typing import Dict, List, cast
+
+import pytest
+
+from connectedpapers import analysis
+from connectedpapers.analysis import GraphIndex, graph_index
+from connectedpapers.compact import compact_graph
+from connectedpapers.decoding import decode_graph
+from connectedpapers.graph import Edge, Graph, PaperID
+from tests.mock_server import make_graph_json
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+def make_graph(edges: List[Edge], path_lengths: Dict[PaperID, float]) -> Graph:
+    """A graph of papers a, b, c, d and e with the given edges."""
+    graph = decode_graph(make_graph_json("a", num_nodes=5))
+    nodes = list(graph.nodes.values())
+    graph.nodes = {paper_id: paper for paper_id, paper in zip("abcde", nodes)}
+    graph.edges = edges
+    graph.path_lengths = path_lengths
+    return graph
+
+
+@pytest.fixture
+def graph() -> Graph:
+    # a - b - c is cheaper than a - c; e is isolated
+    return make_graph(
+        [["a", "b", 1.0], ["b", "c", 2.0], ["a", "c", 5.0], ["c", "d", 1.0]],
+        {"a": 0.0, "b": 1.0, "c": 3.0, "d": 4.0},
+    )
+
+
+def test_neighbors(graph: Graph) -> None:
+    index = graph_index(graph)
+    assert sorted(index.neighbors("c")) == [("a", 5.0), ("b", 2.0), ("d", 1.0)]
+    assert index.neighbors("e") == []
+    assert index.degree("c") == 3
+    assert index.top_similar("c", 2) == [("a", 5.0), ("b", 2.0)]
+
+
+def test_neighbors_match_linear_scan() -> None:
+    graph = decode_graph(make_graph_json(PAPER_ID, num_nodes=200, edges_per_node=6))
+    index = graph_index(graph)
+    for paper_id in graph.nodes:
+        expected: Dict[PaperID, float] = {}
+        for source, target, weight in graph.edges:
+            if paper_id in (source, target) and source != target:
+                other = cast(PaperID, target if source == paper_id else source)
+                expected[other] = max(expected.get(other, -math.inf), float(weight))
+        assert dict(index.neighbors(paper_id)) == expected
+
+
+def test_parallel_edges_keep_highest_weight() -> None:
+    graph = make_graph([["a", "b", 1.0], ["b", "a", 3.0], ["a", "a", 1.0]], {})
+    assert graph_index(graph).neighbors("a") == [("b", 3.0)]
+
+
+def weight_as_length(weight: float) -> float:
+    return weight
+
+
+@pytest.fixture(params=["python", "numpy"])
+def backend(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> str:
+    """Run a test with the pure Python and the numpy implementations."""
+    if request.param == "numpy":
+        monkeypatch.setattr(analysis, "_numpy", pytest.importorskip("numpy"))
+    else:
+        monkeypatch.setattr(analysis, "_numpy", None)
+    return cast(str, request.param)
+
+
+def test_shortest_paths(graph: Graph) -> None:
+    index = graph_index(graph)
+    lengths = index.shortest_path_lengths(cost=weight_as_length)
+    assert lengths == {"a": 0.0, "b": 1.0, "c": 3.0, "d": 4.0}
+    assert index.shortest_path("a", "d", weight_as_length) == ["a", "b", "c", "d"]
+    assert index.shortest_path("a", "e") is None
+    # By default, edges with a higher similarity are shorter
+    assert index.shortest_path("a", "d") == ["a", "c", "d"]
+    assert index.shortest_path_lengths()["c"] == pytest.approx(0.2)
+    hops = index.shortest_path_lengths("d", cost=lambda weight: 1.0)
+    assert hops == {"d": 0.0, "c": 1.0, "a": 2.0, "b": 2.0}
+
+
+def test_compare_path_lengths(graph: Graph) -> None:
+    index = graph_index(graph)
+    assert index.compare_path_lengths(weight_as_length) == {}
+    assert index.compare_path_lengths(cost=lambda weight: 1.0) == {
+        "c": (1.0, 3.0),
+        "d": (2.0, 4.0),
+    }
+    unreachable = make_graph(graph.edges, {"a": 0.0, "e": 2.0})
+    assert GraphIndex(unreachable).compare_path_lengths(weight_as_length) == {
+        "e": (math.inf, 2.0)
+    }
+
+
+def test_centrality(graph: Graph, backend: str) -> None:
+    index = graph_index(graph)
+    assert index.degree_centrality() == {
+        "a": 0.5,
+        "b": 0.5,
+        "c": 0.75,
+        "d": 0.25,
+        "e": 0.0,
+    }
+    assert index.degree_centrality(weighted=True)["c"] == 2.0
+    ranks = index.pagerank()
+    assert sum(ranks.values()) == pytest.approx(1.0)
+    assert max(ranks, key=ranks.__getitem__) == "c"
+    # Every node of an unweighted cycle has the same rank
+    cycle = make_graph([["a", "b", 1.0], ["b", "c", 1.0], ["c", "a", 1.0]], {})
+    cycle_ranks = graph_index(cycle).pagerank(weighted=False)
+    for paper_id in "abc":
+        assert cycle_ranks[paper_id] == pytest.approx(cycle_ranks["a"])
+
+
+def test_index_is_cached_per_graph() -> None:
+    graph = make_graph([["a", "b", 1.0]], {})
+    index = graph_index(graph)
+    assert graph_index(graph) is index
+    other = make_graph([["a", "b", 1.0]], {})
+    assert graph_index(other) is not index
+    keys = {id(graph), id(other)}
+    del graph, index, other
+    gc.collect()
+    assert not keys & analysis._indexes.keys()
+
+
+def test_numpy_matches_python(monkeypatch: pytest.MonkeyPatch) -> None:
+    numpy = pytest.importorskip("numpy")
+    graph = decode_graph(make_graph_json(PAPER_ID, num_nodes=300, edges_per_node=6))
+    index = GraphIndex(graph)
+    monkeypatch.setattr(analysis, "_numpy", None)
+    expected = (index.pagerank(), index.degree_centrality(weighted=True))
+    monkeypatch.setattr(analysis, "_numpy", numpy)
+    ranks, degrees = index.pagerank(), index.degree_centrality(weighted=True)
+    for paper_id in graph.nodes:
+        assert ranks[paper_id] == pytest.approx(expected[0][paper_id])
+        assert degrees[paper_id] == pytest.approx(expected[1][paper_id])
+
+
+def test_compact_graph_index() -> None:
+    graph = decode_graph(make_graph_json(PAPER_ID, num_nodes=100))
+    index = graph_index(graph)
+    compact_index = graph_index(compact_graph(graph))
+    assert compact_index.node_ids == index.node_ids
+    assert compact_index.neighbors(PAPER_ID) == index.neighbors(PAPER_ID)
+    assert compact_index.pagerank() == index.pagerank()
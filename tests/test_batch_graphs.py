@@ -0,0 +1,107 @@
+import asyncio
+from typing import AsyncIterator, List, Tuple
+
+import pytest
+
+from connectedpapers import ConnectedPapersClient
+from connectedpapers.connected_papers_client import GraphResponse, GraphResponseStatuses
+from tests.mock_server import MockConnectedPapersServer, make_graph_json
+
+PAPER_IDS = [f"{i:040x}" for i in range(12)]
+
+
+@pytest.mark.asyncio
+async def test_batch_respects_max_concurrency(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    mock_server.latency = 0.05
+    async with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        results = await client.get_graphs_async(PAPER_IDS, max_concurrency=3)
+    assert set(results) == set(PAPER_IDS)
+    assert all(r.status == GraphResponseStatuses.FRESH_GRAPH for r in results.values())
+    assert mock_server.max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_batch_yields_in_completion_order_and_reports_status(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    slow_id, fast_id, bad_id = PAPER_IDS[:3]
+    mock_server.scripts[slow_id] = [
+        {"status": "IN_PROGRESS", "progress": 50.0},
+        {"status": "FRESH_GRAPH", "graph_json": make_graph_json(slow_id)},
+    ]
+    mock_server.scripts[bad_id] = [{"status": "BAD_ID"}]
+    updates: List[Tuple[str, GraphResponse]] = []
+    async with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        order = [
+            paper_id
+            async for paper_id, _ in client.get_graphs_async_iterator(
+                [slow_id, fast_id, bad_id, fast_id],
+                on_update=lambda paper_id, r: updates.append((paper_id, r)),
+            )
+        ]
+    assert order[-1] == slow_id
+    assert sorted(order) == sorted([slow_id, fast_id, bad_id])
+    slow_statuses = [r.status for paper_id, r in updates if paper_id == slow_id]
+    assert slow_statuses == [
+        GraphResponseStatuses.IN_PROGRESS,
+        GraphResponseStatuses.FRESH_GRAPH,
+    ]
+    assert (bad_id, GraphResponseStatuses.BAD_ID) in [
+        (paper_id, r.status) for paper_id, r in updates
+    ]
+
+
+@pytest.mark.asyncio
+async def test_closing_batch_early_cancels_fetches(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    mock_server.latency = 0.1
+    async with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        iterator = client.get_graphs_async_iterator(PAPER_IDS, max_concurrency=2)
+        async for _ in iterator:
+            break
+        await iterator.aclose()
+        await asyncio.sleep(0.5)
+        # Only the requests already sent when the iterator was closed
+        assert len(mock_server.graph_requests) <= 4
+
+
+@pytest.mark.asyncio
+async def test_batch_stops_when_client_closes(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    mock_server.latency = 0.1
+    client = ConnectedPapersClient(server_addr=mock_server.url)
+    iterator = client.get_graphs_async_iterator(PAPER_IDS, max_concurrency=2)
+    async for _ in iterator:
+        break
+    await client.aclose()
+    await asyncio.sleep(0.5)
+    assert len(mock_server.graph_requests) <= 4
+    assert client._sessions.get(asyncio.get_running_loop()) is None
+    await iterator.aclose()
+
+
+def test_batch_sync(mock_server: MockConnectedPapersServer) -> None:
+    client = ConnectedPapersClient(server_addr=mock_server.url)
+    results = client.get_graphs_sync(PAPER_IDS[:4], fresh_only=False)
+    assert [r.status for r in results.values()] == [GraphResponseStatuses.OLD_GRAPH] * 4
+
+
+@pytest.mark.asyncio
+async def test_batch_reads_async_iterables(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    async def paper_ids() -> AsyncIterator[str]:
+        for paper_id in PAPER_IDS[:4]:
+            yield paper_id
+        raise RuntimeError("Lost the paper IDs")
+
+    async with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        results = await client.get_graphs_async(PAPER_IDS[:2] + PAPER_IDS[:1])
+        assert set(results) == set(PAPER_IDS[:2])
+        with pytest.raises(RuntimeError, match="Lost"):
+            await client.get_graphs_async(paper_ids(), max_concurrency=2)
+    assert len(mock_server.graph_requests) == 6
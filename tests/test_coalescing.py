@@ -0,0 +1,95 @@
+import asyncio
+from typing import AsyncIterator, List
+
+import pytest
+
+from connectedpapers import ConnectedPapersClient
+from connectedpapers.coalescing import SingleFlight
+from connectedpapers.connected_papers_client import GraphResponseStatuses
+from connectedpapers.polling import FixedPolling
+from connectedpapers.rate_limit import PRIORITY_HIGH, PRIORITY_LOW
+from tests.mock_server import MockConnectedPapersServer, make_graph_json
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_poller(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    mock_server.scripts[PAPER_ID] = [
+        {"status": "QUEUED"},
+        {"status": "IN_PROGRESS", "progress": 50.0},
+        {"status": "FRESH_GRAPH", "graph_json": make_graph_json(PAPER_ID)},
+    ]
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, polling=FixedPolling(0.05), memory_cache_size=16
+    ) as client:
+        results = await asyncio.gather(
+            *[client.get_graph_async(PAPER_ID) for _ in range(5)]
+        )
+        assert len(mock_server.graph_requests) == 3
+        assert all(r.status == GraphResponseStatuses.FRESH_GRAPH for r in results)
+        assert all(r.graph_json is results[0].graph_json for r in results)
+
+        # Completed graphs are then served from the in-memory LRU
+        again = await client.get_graph_async(PAPER_ID)
+        assert again.graph_json is results[0].graph_json
+        assert len(mock_server.graph_requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_requests_of_other_priorities_are_not_coalesced(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    mock_server.scripts[PAPER_ID] = [
+        {"status": "FRESH_GRAPH", "graph_json": make_graph_json(PAPER_ID)}
+    ]
+    mock_server.latency = 0.1
+    async with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        await asyncio.gather(
+            client.get_graph_async(PAPER_ID, priority=PRIORITY_LOW),
+            client.get_graph_async(PAPER_ID, priority=PRIORITY_LOW),
+            client.get_graph_async(PAPER_ID, priority=PRIORITY_HIGH),
+        )
+    assert len(mock_server.graph_requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_is_off_by_default(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    async with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        first = await client.get_graph_async(PAPER_ID)
+        assert first.graph_json is not None
+        first.graph_json.edges.clear()
+        second = await client.get_graph_async(PAPER_ID)
+        assert second.graph_json is not None and second.graph_json.edges
+    assert len(mock_server.graph_requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancels_upstream_when_subscribers_leave() -> None:
+    produced: List[int] = []
+    cancelled = asyncio.Event()
+
+    async def source() -> AsyncIterator[int]:
+        try:
+            for i in range(100):
+                produced.append(i)
+                yield i
+                await asyncio.sleep(0.01)
+        finally:
+            cancelled.set()
+
+    flights: SingleFlight[int] = SingleFlight()
+    first = flights.iterate("key", source)
+    second = flights.iterate("key", source)
+    assert await first.__anext__() == 0
+    assert await second.__anext__() == 0
+    assert flights.in_flight() == 1
+    await first.aclose()
+    await second.aclose()
+    assert flights.in_flight() == 0
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert len(produced) < 100
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+
+from connectedpapers import columnar
+from connectedpapers.compact import compact_graph
+from connectedpapers.decoding import decode_graph
+from connectedpapers.graph import Graph
+from tests.mock_server import make_graph_json
+
+pa = pytest.importorskip("pyarrow")
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+def test_graph_tables_have_stable_schemas() -> None:
+    graph = decode_graph(make_graph_json(PAPER_ID))
+    tables = columnar.graph_tables(graph)
+    assert set(tables) == set(columnar.TABLES)
+    for name, table in tables.items():
+        assert table.schema.equals(columnar.schemas()[name])
+        assert table.schema.metadata[b"start_id"] == PAPER_ID.encode()
+    assert tables["nodes"].num_rows == len(graph.nodes)
+    assert tables["edges"].num_rows == len(graph.edges)
+    assert tables["nodes"].column("node_id").to_pylist() == list(graph.nodes)
+    # Tables of different graphs can be concatenated
+    other = columnar.graph_tables(decode_graph(make_graph_json("b" * 40)))
+    combined = pa.concat_tables([tables["edges"], other["edges"]])
+    assert combined.num_rows == len(graph.edges) * 2
+
+
+@pytest.mark.parametrize("format", ["arrow", "parquet"])
+def test_write_and_load_graph(tmp_path: Path, format: str) -> None:
+    graph = decode_graph(make_graph_json(PAPER_ID))
+    columnar.write_graph(compact_graph(graph), str(tmp_path), format)
+    assert (tmp_path / f"nodes.{format}").exists()
+    loaded = columnar.load_graph(str(tmp_path))
+    assert isinstance(loaded, Graph)
+    assert loaded.start_id == PAPER_ID
+    assert len(loaded.nodes) == len(graph.nodes)
+    assert loaded.nodes[PAPER_ID] == graph.nodes[PAPER_ID]
+    assert PAPER_ID in loaded.nodes and "missing" not in loaded.nodes
+    assert list(loaded.nodes) == list(graph.nodes)
+    assert list(loaded.edges) == graph.edges
+    assert loaded.edges[-1] == graph.edges[-1]
+    assert loaded.edges[1:3] == graph.edges[1:3]
+    assert loaded.path_lengths[PAPER_ID] == graph.path_lengths[PAPER_ID]
+    assert loaded.common_citations == graph.common_citations
+    assert loaded.to_graph() == graph
+
+
+def test_load_arrow_graph_maps_files(tmp_path: Path) -> None:
+    graph = decode_graph(make_graph_json(PAPER_ID, num_nodes=500))
+    columnar.write_graph(graph, str(tmp_path))
+    allocated = pa.total_allocated_bytes()
+    loaded = columnar.load_graph(str(tmp_path))
+    nodes_size = loaded.tables["nodes"].nbytes
+    # The node and edge columns point into the mapped files
+    assert pa.total_allocated_bytes() - allocated < nodes_size / 10
+
+
+def test_load_graph_missing_table(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError):
+        columnar.load_graph(str(tmp_path))
+    with pytest.raises(ValueError):
+        columnar.write_graph(decode_graph(make_graph_json(PAPER_ID)), "x", "csv")
@@ -0,0 +1,96 @@
+import gc
+import json
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List
+
+from connectedpapers import ConnectedPapersClient, GraphCache
+from connectedpapers.compact import CompactGraph, compact_graph
+from connectedpapers.decoding import decode_graph, loads
+from connectedpapers.graph import Graph
+from tests.mock_server import MockConnectedPapersServer, make_graph_json
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+def test_graph_papers_have_no_instance_dict() -> None:
+    graph = decode_graph(make_graph_json(PAPER_ID))
+    paper = graph.nodes[PAPER_ID]
+    assert not hasattr(paper, "__dict__")
+    assert not hasattr(paper.authors[0], "__dict__")
+    assert not hasattr(paper.externalIds, "__dict__")
+
+
+def test_compact_graph_keeps_attribute_access() -> None:
+    graph = decode_graph(make_graph_json(PAPER_ID))
+    compact = compact_graph(graph)
+    assert isinstance(compact, Graph)
+    assert compact_graph(compact) is compact
+    assert compact.start_id == graph.start_id
+    assert len(compact.edges) == len(graph.edges)
+    assert list(compact.edges) == graph.edges
+    assert compact.edges[3] == graph.edges[3]
+    assert compact.edges[-2:] == graph.edges[-2:]
+    for paper_id, paper in graph.nodes.items():
+        compact_paper = compact.nodes[paper_id]
+        assert compact_paper.title == paper.title
+        assert compact_paper.pos == paper.pos
+        x, y = compact_paper.pos
+        assert [x, y] == paper.pos
+    assert compact.to_graph() == graph
+
+
+def test_compact_graph_shares_strings_between_graphs() -> None:
+    graph_json = make_graph_json(PAPER_ID)
+    graph_json["nodes"][PAPER_ID]["pdfUrls"] = ["https://example.org/paper.pdf"]
+    body = json.dumps(graph_json)
+    first = compact_graph(decode_graph(loads(body)))
+    second = compact_graph(decode_graph(loads(body)))
+    first_paper = first.nodes[PAPER_ID]
+    second_paper = second.nodes[PAPER_ID]
+    assert first_paper.venue is second_paper.venue
+    assert first_paper.authors[0].name is second_paper.authors[0].name
+    assert first_paper.fieldsOfStudy is second_paper.fieldsOfStudy
+    assert first_paper.pdfUrls is not None and second_paper.pdfUrls is not None
+    assert first_paper.pdfUrls[0] is second_paper.pdfUrls[0]
+
+
+def test_compact_graphs_use_less_memory() -> None:
+    bodies = [
+        json.dumps(make_graph_json(PAPER_ID, num_nodes=200, seed=seed)).encode()
+        for seed in range(5)
+    ]
+
+    def measure(load: Callable[[bytes], Graph]) -> int:
+        # Warm up first, so one-off growth of interpreter-wide tables (such as
+        # the interned strings) isn't counted against the graphs
+        for body in bodies:
+            load(body)
+        gc.collect()
+        tracemalloc.start()
+        graphs: List[Graph] = [load(body) for body in bodies]
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        assert len(graphs) == len(bodies)
+        return size
+
+    plain = measure(lambda body: decode_graph(loads(body)))
+    compact = measure(lambda body: compact_graph(decode_graph(loads(body))))
+    # About 1.75 times smaller, mostly from interned strings and edge columns
+    assert compact < 0.6 * plain
+    assert isinstance(compact_graph(decode_graph(loads(bodies[0]))), CompactGraph)
+
+
+def test_client_returns_compact_graphs(
+    tmp_path: Path, mock_server: MockConnectedPapersServer
+) -> None:
+    cache = GraphCache(str(tmp_path / "graphs.db"))
+    client = ConnectedPapersClient(
+        server_addr=mock_server.url, cache=cache, compact_graphs=True
+    )
+    response = client.get_graph_sync(PAPER_ID)
+    assert isinstance(response.graph_json, CompactGraph)
+    cached = cache.get(PAPER_ID)
+    assert cached is not None
+    assert cached.graph == response.graph_json.to_graph()
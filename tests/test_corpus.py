@@ -0,0 +1,91 @@
+import pytest
+
+from connectedpapers.analysis import graph_index
+from connectedpapers.compact import compact_graph
+from connectedpapers.corpus import EdgeWeightPolicy, GraphCorpus
+from connectedpapers.decoding import decode_graph
+from connectedpapers.graph import Graph
+from tests.mock_server import make_graph_json
+
+SEED_A = "a" * 40
+SEED_B = "b" * 40
+
+
+def make_graph(start_id: str, seed: int = 0) -> Graph:
+    # Graphs with the same seed share their non-start papers and common papers
+    return decode_graph(make_graph_json(start_id, num_nodes=30, seed=seed))
+
+
+def test_papers_are_deduplicated() -> None:
+    graph_a = make_graph(SEED_A)
+    graph_b = make_graph(SEED_B)
+    corpus = GraphCorpus()
+    assert corpus.add_all([graph_a, graph_b]) == 2
+    assert len(corpus) == len(set(graph_a.nodes) | set(graph_b.nodes)) == 31
+    assert corpus.seed_ids == [SEED_A, SEED_B]
+    shared_id = list(graph_b.nodes)[1]
+    assert corpus.papers[shared_id] is graph_a.nodes[shared_id]
+    assert corpus.paper_graph_counts[shared_id] == 2
+    assert corpus.paper_graph_counts[SEED_B] == 1
+    assert not corpus.add(make_graph(SEED_A, seed=1))
+    assert len(corpus) == 31
+
+
+@pytest.mark.parametrize(
+    "policy, expected",
+    [
+        (EdgeWeightPolicy.MAX, 0.75),
+        (EdgeWeightPolicy.MIN, 0.25),
+        (EdgeWeightPolicy.MEAN, 0.5),
+        (EdgeWeightPolicy.SUM, 1.0),
+        (EdgeWeightPolicy.LAST, 0.25),
+    ],
+)
+def test_edge_weight_policy(policy: EdgeWeightPolicy, expected: float) -> None:
+    graph_a = make_graph(SEED_A)
+    graph_b = make_graph(SEED_B)
+    x, y = list(graph_a.nodes)[1:3]
+    # Edges listed in both directions by one graph count once
+    graph_a.edges = [[x, y, 0.75], [y, x, 0.75]]
+    graph_b.edges = [[y, x, 0.25], [SEED_B, x, 0.5], [x, SEED_B, 0.5]]
+    corpus = GraphCorpus(edge_policy=policy)
+    corpus.add_all([graph_a, graph_b])
+    assert corpus.edge_weight(x, y) == expected
+    assert corpus.edge_weight(y, x) == expected
+    assert corpus.edge_count(x, y) == 2
+    assert corpus.edge_weight(SEED_B, x) == 0.5
+    assert corpus.edge_count(SEED_B, x) == 1
+    assert corpus.edge_weight(SEED_A, x) is None
+    assert sorted(weight for _, _, weight in corpus.edges()) == sorted([expected, 0.5])
+
+
+def test_common_papers_and_authors_are_aggregated() -> None:
+    graph_a = make_graph(SEED_A)
+    graph_b = make_graph(SEED_B)
+    corpus = GraphCorpus()
+    corpus.add_all([graph_a, graph_b])
+    citation = graph_a.common_citations[0]
+    entry = corpus.common_citations[citation.paper_id]
+    assert entry.record is citation
+    assert entry.graph_count == 2
+    assert entry.count == citation.edges_count + graph_b.common_citations[0].edges_count
+    assert entry.local_ids == set(citation.local_references) | set(
+        graph_b.common_citations[0].local_references
+    )
+    assert len(corpus.common_references) == len(graph_a.common_references)
+    author = graph_a.common_authors[0]
+    assert corpus.common_authors[author.id].graph_count == 2
+    top = corpus.top_common_citations(3)
+    assert len(top) == 3
+    assert all(entry.graph_count == 2 for entry in top)
+
+
+def test_corpus_graph_can_be_indexed() -> None:
+    corpus = GraphCorpus()
+    corpus.add_all([make_graph(SEED_A), compact_graph(make_graph(SEED_B))])
+    graph = corpus.to_graph()
+    assert graph.start_id == SEED_A
+    assert len(graph.nodes) == len(corpus)
+    index = graph_index(graph)
+    assert {paper_id for paper_id, _ in index.neighbors(SEED_B)} <= set(corpus.papers)
+    assert index.shortest_path(SEED_A, SEED_B) is not None
@@ -0,0 +1,136 @@
+import copy
+import json
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, cast
+
+import dacite
+import pytest
+
+from connectedpapers import ConnectedPapersClient, GraphCache
+from connectedpapers.connected_papers_client import (
+    GraphResponseStatuses,
+    decode_graph_response,
+)
+from connectedpapers.decoding import (
+    HEAVY_FIELDS,
+    LazyCommonCitation,
+    LazyPaper,
+    decode_graph,
+    decoder_for,
+)
+from connectedpapers.graph import Graph, Paper, PaperAuthor
+from tests.mock_server import MockConnectedPapersServer, make_graph_json
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+def test_decode_graph_matches_dacite() -> None:
+    data = make_graph_json(PAPER_ID, num_nodes=50)
+    assert decode_graph(data) == dacite.from_dict(data_class=Graph, data=data)
+
+
+def test_missing_optional_fields_decode_as_none() -> None:
+    data = make_graph_json(PAPER_ID)
+    del data["nodes"][PAPER_ID]["abstract"]
+    assert decode_graph(data).nodes[PAPER_ID].abstract is None
+    with pytest.raises(KeyError):
+        decoder_for(PaperAuthor)({"ids": []})
+
+
+def test_decode_graph_response() -> None:
+    body = json.dumps(
+        {"status": "FRESH_GRAPH", "graph_json": make_graph_json(PAPER_ID)}
+    ).encode()
+    response = decode_graph_response(body)
+    assert response.status == GraphResponseStatuses.FRESH_GRAPH
+    assert response.graph_json is not None
+    assert response.graph_json.start_id == PAPER_ID
+    assert response.progress is None
+
+    unknown = decode_graph_response(b'{"status": "SOMETHING_NEW", "progress": 3}')
+    assert unknown.status == GraphResponseStatuses.ERROR
+    assert unknown.progress == 3
+
+
+def test_lazy_fields_decode_on_access() -> None:
+    data = make_graph_json(PAPER_ID, num_nodes=30)
+    graph = decode_graph(data)
+    lazy = decode_graph(copy.deepcopy(data), lazy=True)
+    paper = lazy.nodes[PAPER_ID]
+    assert isinstance(paper, LazyPaper) and isinstance(paper, Paper)
+    assert isinstance(lazy.common_citations[0], LazyCommonCitation)
+    assert paper.is_loaded("title") and paper.is_loaded("pos")
+    assert not any(paper.is_loaded(name) for name in HEAVY_FIELDS)
+    assert paper.authors == graph.nodes[PAPER_ID].authors
+    assert isinstance(paper.authors[0], PaperAuthor)
+    assert paper.is_loaded("authors")
+    # Equal to the fully decoded graph, in either order, and after copies
+    assert lazy == graph and graph == lazy
+    assert pickle.loads(pickle.dumps(lazy)) == graph
+    assert copy.deepcopy(lazy) == graph
+
+
+def test_lazy_fields_decode_once_across_threads() -> None:
+    graph = decode_graph(make_graph_json(PAPER_ID, num_nodes=200), lazy=True)
+    papers = list(graph.nodes.values())
+    barrier = threading.Barrier(8)
+
+    def read_abstracts() -> List[Optional[str]]:
+        barrier.wait()
+        return [paper.abstract for paper in papers]
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: read_abstracts(), range(8)))
+    assert all(result == results[0] for result in results)
+    assert all(cast(LazyPaper, paper).is_loaded("abstract") for paper in papers)
+
+
+def test_paper_fields_projection() -> None:
+    data = make_graph_json(PAPER_ID)
+    graph = decode_graph(data, paper_fields=["id", "title", "year", "pos"])
+    paper = graph.nodes[PAPER_ID]
+    assert paper.title == data["nodes"][PAPER_ID]["title"]
+    assert paper.pos == data["nodes"][PAPER_ID]["pos"]
+    assert "abstract=..." in repr(paper)
+    with pytest.raises(AttributeError, match="paper_fields"):
+        paper.abstract
+    with pytest.raises(AttributeError):
+        paper.no_such_field  # type: ignore[attr-defined]
+    # A lazy projection decodes the other fields on access instead
+    lazy = decode_graph(data, paper_fields=["id"], lazy=True)
+    assert lazy.nodes[PAPER_ID].abstract == data["nodes"][PAPER_ID]["abstract"]
+    with pytest.raises(ValueError):
+        decode_graph(data, paper_fields=["titel"])
+
+
+def test_lazy_fields_report_missing_required_keys() -> None:
+    data = make_graph_json(PAPER_ID)
+    del data["nodes"][PAPER_ID]["authors"]
+    with pytest.raises(KeyError):
+        decode_graph(data, lazy=True)
+
+
+@pytest.mark.asyncio
+async def test_client_paper_fields(mock_server: MockConnectedPapersServer) -> None:
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, paper_fields=["id", "title"], lazy_fields=True
+    ) as client:
+        response = await client.get_graph_async(PAPER_ID)
+    assert response.graph_json is not None
+    paper = response.graph_json.nodes[PAPER_ID]
+    assert isinstance(paper, LazyPaper)
+    assert not paper.is_loaded("year")
+    assert paper == decode_graph(mock_server.graph_json(PAPER_ID)).nodes[PAPER_ID]
+    with pytest.raises(ValueError):
+        ConnectedPapersClient(paper_fields=["id"], compact_graphs=True)
+
+
+def test_client_lazy_fields_reject_cache(tmp_path: Path) -> None:
+    cache = GraphCache(str(tmp_path / "graphs.db"))
+    with pytest.raises(ValueError):
+        ConnectedPapersClient(lazy_fields=True, cache=cache)
+    with pytest.raises(ValueError):
+        ConnectedPapersClient(paper_fields=["id"], lazy_fields=True, cache=cache)
@@ -0,0 +1,145 @@
+import copy
+import gc
+from typing import Any, Dict
+
+import pytest
+
+from connectedpapers import ConnectedPapersClient, diff
+from connectedpapers.compact import compact_graph
+from connectedpapers.connected_papers_client import (
+    GraphResponseStatuses,
+    GraphTransfer,
+)
+from connectedpapers.decoding import decode_graph
+from connectedpapers.diff import apply_patch, diff_graphs, graph_version, make_patch
+from connectedpapers.polling import FixedPolling
+from tests.mock_server import MockConnectedPapersServer, make_graph_json
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+def changed_graph_json(graph_json: Dict[str, Any]) -> Dict[str, Any]:
+    """A copy of a graph_json with one paper removed, one changed and one edge added."""
+    changed = copy.deepcopy(graph_json)
+    paper_ids = list(changed["nodes"])
+    removed = paper_ids[3]
+    del changed["nodes"][removed]
+    del changed["path_lengths"][removed]
+    changed["edges"] = [edge for edge in changed["edges"] if removed not in edge[:2]]
+    changed["edges"].append([PAPER_ID, paper_ids[5], 0.5])
+    changed["nodes"][paper_ids[7]]["title"] = "A new title"
+    return changed
+
+
+def test_patch_round_trip() -> None:
+    old_json = make_graph_json(PAPER_ID, num_nodes=50)
+    old, new = decode_graph(old_json), decode_graph(changed_graph_json(old_json))
+    paper_ids = list(old.nodes)
+    diff = diff_graphs(old, new)
+    assert diff.removed_papers == [paper_ids[3]]
+    assert diff.changed_papers == [paper_ids[7]]
+    assert diff.added_papers == []
+    assert diff.added_edges == [[PAPER_ID, paper_ids[5], 0.5]]
+    assert all(paper_ids[3] in edge[:2] for edge in diff.removed_edges)
+    assert diff_graphs(old, old).empty and not diff.empty
+
+    patched, patch_diff = apply_patch(old, make_patch(old, new))
+    assert patch_diff == diff
+    assert graph_version(patched) == graph_version(new) != graph_version(old)
+    assert patched.nodes[paper_ids[1]] is old.nodes[paper_ids[1]]
+    assert paper_ids[3] in old.nodes  # The patched graph is a copy
+    with pytest.raises(ValueError):
+        apply_patch(new, make_patch(old, new))
+
+
+def test_graph_version_ignores_representation() -> None:
+    graph = decode_graph(make_graph_json(PAPER_ID))
+    assert graph_version(compact_graph(graph)) == graph_version(graph)
+    reordered = copy.copy(graph)
+    reordered.edges = list(reversed(graph.edges))
+    assert graph_version(reordered) == graph_version(graph)
+
+
+@pytest.mark.asyncio
+async def test_refresh_not_modified(mock_server: MockConnectedPapersServer) -> None:
+    async with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        response = await client.get_graph_async(PAPER_ID)
+        assert response.graph_json is not None
+        refresh = await client.refresh_graph_async(PAPER_ID, response.graph_json)
+    assert refresh.transfer == GraphTransfer.NOT_MODIFIED
+    assert refresh.status == GraphResponseStatuses.FRESH_GRAPH
+    assert refresh.graph is response.graph_json and refresh.diff.empty
+    assert refresh.version == graph_version(response.graph_json)
+    assert mock_server.http_statuses == [200, 304]
+
+
+@pytest.mark.asyncio
+async def test_refresh_applies_patch(mock_server: MockConnectedPapersServer) -> None:
+    old_json = make_graph_json(PAPER_ID, num_nodes=50)
+    new_json = changed_graph_json(old_json)
+    mock_server.scripts[PAPER_ID] = [{"status": "OLD_GRAPH", "graph_json": old_json}]
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, polling=FixedPolling(0.01)
+    ) as client:
+        response = await client.get_graph_async(PAPER_ID, fresh_only=False)
+        assert response.graph_json is not None
+        old = response.graph_json
+        mock_server.scripts[PAPER_ID] = [
+            {"status": "OLD_GRAPH", "graph_json": old_json},
+            {"status": "IN_PROGRESS", "progress": 50.0, "graph_json": old_json},
+            {"status": "FRESH_GRAPH", "graph_json": new_json},
+        ]
+        refresh = await client.refresh_graph_async(PAPER_ID, old)
+    assert refresh.transfer == GraphTransfer.PATCH
+    assert refresh.status == GraphResponseStatuses.FRESH_GRAPH
+    assert refresh.version == graph_version(decode_graph(new_json))
+    assert graph_version(refresh.graph) == refresh.version
+    assert refresh.diff.changed_papers == [list(old_json["nodes"])[7]]
+    # The old graph wasn't sent again while the new one was being built
+    assert mock_server.http_statuses == [200, 200, 200, 226]
+    assert client.metrics.counter("graph.responses.IN_PROGRESS") == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_downloads_unknown_versions(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    # A graph the server never sent can't be patched
+    held_json = make_graph_json(PAPER_ID, seed=1)
+    async with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        refresh = await client.refresh_graph_async(PAPER_ID, decode_graph(held_json))
+    assert refresh.transfer == GraphTransfer.FULL
+    assert refresh.version == graph_version(refresh.graph)
+    assert len(refresh.diff.added_papers) == 19
+    assert mock_server.http_statuses == [200]
+
+
+def test_graph_version_is_cached() -> None:
+    graph = decode_graph(make_graph_json(PAPER_ID))
+    version = graph_version(graph)
+    key = id(graph)
+    assert diff._versions[key] == version
+    graph.edges.append([PAPER_ID, PAPER_ID, 1.0])  # Not noticed once cached
+    assert graph_version(graph) == version
+    del graph
+    gc.collect()
+    assert key not in diff._versions
+
+
+@pytest.mark.asyncio
+async def test_received_graphs_keep_their_version(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    with pytest.raises(ValueError):
+        graph_version(decode_graph(make_graph_json(PAPER_ID), paper_fields=["id"]))
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, paper_fields=["id", "title"]
+    ) as client:
+        response = await client.get_graph_async(PAPER_ID)
+        assert response.graph_json is not None
+        # A projection is refreshed with the version the server sent
+        refresh = await client.refresh_graph_async(PAPER_ID, response.graph_json)
+    assert refresh.transfer == GraphTransfer.NOT_MODIFIED
+    assert refresh.version == graph_version(
+        decode_graph(mock_server.graph_json(PAPER_ID))
+    )
@@ -0,0 +1,74 @@
+import time
+from pathlib import Path
+
+import dacite
+import pytest
+
+from connectedpapers import ConnectedPapersClient, GraphCache
+from connectedpapers.connected_papers_client import GraphResponseStatuses
+from connectedpapers.graph import Graph
+from tests.mock_server import MockConnectedPapersServer, make_graph_json
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+def make_graph(paper_id: str = PAPER_ID) -> Graph:
+    return dacite.from_dict(data_class=Graph, data=make_graph_json(paper_id))
+
+
+def test_cache_roundtrip_and_freshness(tmp_path: Path) -> None:
+    cache = GraphCache(str(tmp_path / "graphs.db"), fresh_ttl=60)
+    graph = make_graph()
+    assert cache.get(PAPER_ID) is None
+    cache.put(PAPER_ID, graph, fresh=True)
+    cached = cache.get(PAPER_ID, fresh_only=True)
+    assert cached is not None and cached.fresh
+    assert cached.graph == graph
+
+    cache.put(PAPER_ID, graph, fresh=True, fetched_at=time.time() - 120)
+    assert cache.get(PAPER_ID, fresh_only=True) is None
+    stale = cache.get(PAPER_ID, fresh_only=False)
+    assert stale is not None and not stale.fresh
+
+    cache.put(PAPER_ID, graph, fresh=False)
+    assert cache.get(PAPER_ID, fresh_only=True) is None
+
+
+def test_cache_ttl_and_eviction(tmp_path: Path) -> None:
+    cache = GraphCache(str(tmp_path / "graphs.db"), ttl=60)
+    cache.put(PAPER_ID, make_graph(), fresh=True, fetched_at=time.time() - 120)
+    assert cache.get(PAPER_ID) is None
+    assert len(cache) == 0
+
+    paper_ids = [f"{i:040x}" for i in range(4)]
+    for paper_id in paper_ids:
+        cache.put(paper_id, make_graph(paper_id), fresh=True)
+    cache.get(paper_ids[0])  # Touch the oldest entry so that it is kept
+    cache.max_bytes = cache.total_bytes() - 1
+    cache.put("new", make_graph("new"), fresh=True)
+    assert [paper_id in cache for paper_id in paper_ids] == [True, False, False, True]
+    assert "new" in cache
+    assert cache.total_bytes() <= cache.max_bytes
+
+
+@pytest.mark.asyncio
+async def test_client_answers_from_cache(
+    tmp_path: Path, mock_server: MockConnectedPapersServer
+) -> None:
+    cache = GraphCache(str(tmp_path / "graphs.db"))
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, cache=cache
+    ) as client:
+        first = await client.get_graph_async(PAPER_ID, fresh_only=False)
+        assert first.status == GraphResponseStatuses.OLD_GRAPH
+        second = await client.get_graph_async(PAPER_ID, fresh_only=False)
+        assert second.status == GraphResponseStatuses.OLD_GRAPH
+        assert second.graph_json == first.graph_json
+        assert len(mock_server.graph_requests) == 1
+
+        # An OLD_GRAPH can't answer a fresh_only request
+        fresh = await client.get_graph_async(PAPER_ID, fresh_only=True)
+        assert fresh.status == GraphResponseStatuses.FRESH_GRAPH
+        assert len(mock_server.graph_requests) == 2
+        await client.get_graph_async(PAPER_ID, fresh_only=True)
+        assert len(mock_server.graph_requests) == 2
@@ -0,0 +1,130 @@
+import io
+import json
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from connectedpapers.__main__ import main
+from connectedpapers.connected_papers_client import GraphResponseStatuses
+from connectedpapers.harvest import (
+    CHECKPOINT_FILE,
+    HarvestOptions,
+    harvest,
+    iter_graphs,
+    read_checkpoint,
+    read_paper_ids,
+    shard_of,
+    shard_path,
+)
+from tests.mock_server import MockConnectedPapersServer, make_graph_json
+
+PAPER_IDS = [f"{i:040x}" for i in range(10)]
+
+
+def test_read_paper_ids() -> None:
+    lines = io.StringIO("a\n\n b \na\nc")
+    assert read_paper_ids(lines) == ["a", "b", "c"]
+
+
+def test_harvest_resumes(
+    mock_server: MockConnectedPapersServer, tmp_path: Path
+) -> None:
+    mock_server.scripts[PAPER_IDS[0]] = [{"status": "BAD_ID"}]
+    mock_server.scripts[PAPER_IDS[1]] = [{"status": "ERROR"}]
+    options = HarvestOptions(output=str(tmp_path), server_addr=mock_server.url)
+    summary = harvest(PAPER_IDS, options)
+    assert summary.completed == 9 and summary.failed == 1
+    assert summary.statuses["FRESH_GRAPH"] == 8
+    checkpoint = read_checkpoint(str(tmp_path))
+    assert checkpoint[PAPER_IDS[0]] == GraphResponseStatuses.BAD_ID
+    assert checkpoint[PAPER_IDS[1]] == GraphResponseStatuses.ERROR
+    graphs = dict(iter_graphs(str(tmp_path)))
+    assert sorted(graphs) == PAPER_IDS[2:]
+    assert graphs[PAPER_IDS[5]].start_id == PAPER_IDS[5]
+    assert Path(shard_path(str(tmp_path), shard_of(PAPER_IDS[5], 64))).exists()
+
+    # A line cut short by a crash is ignored
+    with open(tmp_path / CHECKPOINT_FILE, "a") as file:
+        file.write('{"paper_id": "')
+    mock_server.graph_requests.clear()
+    mock_server.scripts[PAPER_IDS[1]] = [
+        {"status": "FRESH_GRAPH", "graph_json": make_graph_json(PAPER_IDS[1])}
+    ]
+    summary = harvest(PAPER_IDS, options)
+    assert summary.skipped == 9 and summary.completed == 1
+    assert [paper_id for paper_id, _ in mock_server.graph_requests] == [PAPER_IDS[1]]
+    assert read_checkpoint(str(tmp_path))[PAPER_IDS[1]] == (
+        GraphResponseStatuses.FRESH_GRAPH
+    )
+    assert PAPER_IDS[1] in dict(iter_graphs(str(tmp_path)))
+
+
+def test_harvest_paper_budget(
+    mock_server: MockConnectedPapersServer, tmp_path: Path
+) -> None:
+    options = HarvestOptions(
+        output=str(tmp_path), server_addr=mock_server.url, max_papers=3
+    )
+    summary = harvest(PAPER_IDS, options)
+    assert summary.completed == 3 and summary.not_started == 7
+    assert len(mock_server.graph_requests) == 3
+    options = HarvestOptions(output=str(tmp_path), server_addr=mock_server.url)
+    summary = harvest(PAPER_IDS, options)
+    assert summary.skipped == 3 and summary.completed == 7
+
+
+def test_harvest_worker_processes(
+    mock_server: MockConnectedPapersServer, tmp_path: Path
+) -> None:
+    results: List[str] = []
+    options = HarvestOptions(
+        output=str(tmp_path), server_addr=mock_server.url, workers=3, shards=8
+    )
+    summary = harvest(PAPER_IDS, options, lambda paper_id, _: results.append(paper_id))
+    assert summary.completed == 10
+    assert sorted(results) == PAPER_IDS
+    assert sorted(paper_id for paper_id, _ in iter_graphs(str(tmp_path))) == PAPER_IDS
+    assert len(mock_server.graph_requests) == 10
+
+
+def test_harvest_budget_shared_by_processes(
+    mock_server: MockConnectedPapersServer, tmp_path: Path
+) -> None:
+    options = HarvestOptions(
+        output=str(tmp_path),
+        server_addr=mock_server.url,
+        workers=3,
+        shards=8,
+        max_papers=4,
+    )
+    summary = harvest(PAPER_IDS, options)
+    assert summary.completed == 4 and summary.not_started == 6
+    assert len(mock_server.graph_requests) == 4
+
+
+def test_harvest_command(
+    mock_server: MockConnectedPapersServer,
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    mock_server.scripts[PAPER_IDS[0]] = [{"status": "ERROR"}]
+    ids_file = tmp_path / "ids.txt"
+    ids_file.write_text("\n".join(PAPER_IDS[:4]))
+    output = tmp_path / "out"
+    arguments = [
+        "harvest",
+        str(ids_file),
+        "--output",
+        str(output),
+        "--server",
+        mock_server.url,
+        "--workers",
+        "1",
+    ]
+    assert main(arguments) == 1
+    assert "Completed: 3, failed: 1" in capsys.readouterr().out
+    lines = (output / CHECKPOINT_FILE).read_text().splitlines()
+    assert len(lines) == 4
+    assert json.loads(lines[0])["status"] in ("ERROR", "FRESH_GRAPH")
+    assert main([]) == 2
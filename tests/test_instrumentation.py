@@ -0,0 +1,178 @@
+import math
+from typing import List, Optional, Tuple
+
+import pytest
+
+from connectedpapers import ConnectedPapersClient, connected_papers_client
+from connectedpapers.connected_papers_client import (
+    BadResponseError,
+    GraphResponseStatuses,
+)
+from connectedpapers.instrumentation import (
+    Histogram,
+    Instrumentation,
+    MetricsRegistry,
+    Observer,
+    OpenTelemetryObserver,
+    Span,
+)
+from connectedpapers.polling import FixedPolling
+from tests.mock_server import MockConnectedPapersServer, make_build_script
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+class RecordingObserver(Observer):
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+        self.counts: List[Tuple[str, float, Optional[Span]]] = []
+
+    def span_ended(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def counted(self, name: str, value: float, span: Optional[Span]) -> None:
+        self.counts.append((name, value, span))
+
+    def named(self, name: str) -> List[Span]:
+        return [span for span in self.spans if span.name == name]
+
+
+def test_histogram() -> None:
+    histogram = Histogram(bounds=(1.0, 2.0, 4.0))
+    assert math.isnan(histogram.mean) and math.isnan(histogram.quantile(0.5))
+    for value in (0.5, 1.5, 1.5, 3.0, 10.0):
+        histogram.record(value)
+    assert histogram.buckets == [1, 2, 1, 1]
+    assert histogram.count == 5 and histogram.mean == pytest.approx(3.3)
+    assert histogram.quantile(0.5) == 2.0
+    assert histogram.quantile(1.0) == 10.0
+    assert histogram.min == 0.5 and histogram.max == 10.0
+
+
+def test_instrumentation_spans_and_counters() -> None:
+    metrics = MetricsRegistry()
+    observer = RecordingObserver()
+    instrumentation = Instrumentation([metrics, observer])
+    with instrumentation.span("outer", size=1) as outer:
+        with pytest.raises(ValueError):
+            with instrumentation.span("inner", outer):
+                raise ValueError()
+        instrumentation.count("things", 2, outer)
+    inner, recorded_outer = observer.spans
+    assert inner.parent is recorded_outer is outer
+    assert inner.attributes == {"error": "ValueError"}
+    assert outer.end is not None and outer.duration >= inner.duration
+    assert observer.counts == [("things", 2, outer)]
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"] == {"things": 2}
+    assert snapshot["histograms"]["outer"]["count"] == 1
+    metrics.reset()
+    assert metrics.counter("things") == 0 and metrics.histogram("outer") is None
+
+
+@pytest.mark.asyncio
+async def test_client_reports_graph_phases(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    mock_server.scripts[PAPER_ID] = make_build_script(PAPER_ID, queued=1)
+    observer = RecordingObserver()
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, polling=FixedPolling(0.01), observers=[observer]
+    ) as client:
+        response = await client.get_graph_async(PAPER_ID)
+    assert response.status == GraphResponseStatuses.FRESH_GRAPH
+    metrics = client.metrics
+    assert metrics.counter("graph.responses.QUEUED") == 1
+    assert metrics.counter("graph.responses.IN_PROGRESS") == 3
+    assert metrics.counter("graph.responses.FRESH_GRAPH") == 1
+    assert metrics.counter("http.bytes_received") > 0
+    for name, count in [
+        ("graph", 1),
+        ("graph.fetch", 1),
+        ("graph.wait.queued", 1),
+        ("graph.wait.in_progress", 3),
+        ("http.request", 5),
+        ("http.decode", 5),
+    ]:
+        histogram = metrics.histogram(name)
+        assert histogram is not None and histogram.count == count, name
+
+    (graph,) = observer.named("graph")
+    (fetch,) = observer.named("graph.fetch")
+    assert graph.attributes["status"] == fetch.attributes["status"] == "FRESH_GRAPH"
+    assert all(span.parent is fetch for span in observer.named("http.request"))
+    assert all(
+        span.attributes["http_status"] == 200 for span in observer.named("http.request")
+    )
+
+
+@pytest.mark.asyncio
+async def test_client_counts_retries(
+    mock_server: MockConnectedPapersServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(connected_papers_client, "SLEEP_TIME_AFTER_ERROR", 0.0)
+    mock_server.scripts[PAPER_ID] = [{"http_status": 503}]
+    async with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        with pytest.raises(BadResponseError) as error:
+            await client.get_graph_async(PAPER_ID)
+    assert error.value.status == 503
+    assert client.metrics.counter("graph.errors") == 3
+    assert client.metrics.counter("graph.retries") == 2
+    backoff = client.metrics.histogram("graph.backoff.error")
+    assert backoff is not None and backoff.count == 2
+
+
+@pytest.mark.asyncio
+async def test_client_does_not_retry_bugs(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    # A graph that fails to decode
+    mock_server.scripts[PAPER_ID] = [{"status": "FRESH_GRAPH", "graph_json": {}}]
+    async with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        with pytest.raises(KeyError):
+            await client.get_graph_async(PAPER_ID)
+    assert len(mock_server.graph_requests) == 1
+    assert client.metrics.counter("graph.retries") == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_hits_are_counted(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, memory_cache_size=4
+    ) as client:
+        await client.get_graph_async(PAPER_ID)
+        await client.get_graph_async(PAPER_ID)
+    assert client.metrics.counter("graph.cache_hits.memory") == 1
+    assert len(mock_server.graph_requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_opentelemetry_observer(mock_server: MockConnectedPapersServer) -> None:
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    observer = OpenTelemetryObserver(provider.get_tracer("tests"))
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, observers=[observer]
+    ) as client:
+        await client.get_graph_async(PAPER_ID)
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    fetch = spans["connectedpapers.graph.fetch"]
+    request = spans["connectedpapers.http.request"]
+    assert fetch.attributes is not None
+    assert fetch.attributes["paper_id"] == PAPER_ID
+    assert request.parent is not None
+    assert request.parent.span_id == fetch.context.span_id
+    assert [event.name for event in fetch.events] == [
+        "http.bytes_received",
+        "graph.responses.FRESH_GRAPH",
+    ]
@@ -0,0 +1,69 @@
+import subprocess
+import sys
+from typing import List
+
+import pytest
+
+HEAVY_MODULES = ("aiohttp", "nest_asyncio", "dacite")
+
+
+def imported_heavy_modules(code: str) -> List[str]:
+    """Run code in a fresh interpreter, and list the heavy modules it imported."""
+    check = f"import sys; print(*(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", f"{code}\n{check}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return result.stdout.split()
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import connectedpapers",
+        "from connectedpapers import GraphCache",
+        "from connectedpapers.graph import Graph",
+        "import connectedpapers.serialization, connectedpapers.decoding",
+        "import connectedpapers.search, connectedpapers.spatial",
+        "from connectedpapers import ConnectedPapersClient; ConnectedPapersClient()",
+    ],
+)
+def test_network_stack_is_imported_lazily(code: str) -> None:
+    assert imported_heavy_modules(code) == []
+
+
+def test_network_stack_is_imported_on_first_request() -> None:
+    code = "\n".join(
+        [
+            "import asyncio",
+            "from connectedpapers import ConnectedPapersClient",
+            "client = ConnectedPapersClient(server_addr='http://127.0.0.1:9')",
+            "asyncio.run(client._get_session())",
+        ]
+    )
+    assert imported_heavy_modules(code) == ["aiohttp"]
+
+
+def test_lazy_attributes() -> None:
+    import connectedpapers
+
+    assert "ConnectedPapersClient" in dir(connectedpapers)
+    assert connectedpapers.GraphCache.__name__ == "GraphCache"
+    with pytest.raises(AttributeError):
+        connectedpapers.NoSuchThing
+
+
+def test_decoders_are_compiled_on_first_use() -> None:
+    modules = "columnar, compact, connected_papers_client, decoding, streaming"
+    code = "\n".join(
+        [
+            f"from connectedpapers import {modules}",
+            "print(len(decoding._decoders))",
+        ]
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    )
+    assert result.stdout.split() == ["0"]
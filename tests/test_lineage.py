@@ -0,0 +1,110 @@
+import gc
+import random
+from typing import List
+
+import pytest
+
+from connectedpapers import lineage
+from connectedpapers.decoding import decode_graph
+from connectedpapers.graph import Graph, PaperID
+from connectedpapers.lineage import LineageIndex, lineage_index
+from tests.mock_server import make_graph_json
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+@pytest.fixture
+def graph() -> Graph:
+    """A graph whose paths form a random tree, several hops deep."""
+    graph = decode_graph(make_graph_json(PAPER_ID, num_nodes=300))
+    rng = random.Random(0)
+    ids = list(graph.nodes)
+    for index, paper_id in enumerate(ids[1:], 1):
+        parent = graph.nodes[ids[rng.randrange(max(0, index - 5), index)]]
+        paper = graph.nodes[paper_id]
+        paper.path = parent.path + [paper_id]
+        paper.path_length = parent.path_length + rng.random()
+        graph.path_lengths[paper_id] = paper.path_length
+    return graph
+
+
+def _common_prefix(a: List[PaperID], b: List[PaperID]) -> List[PaperID]:
+    prefix = []
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        prefix.append(x)
+    return prefix
+
+
+def test_lineage_matches_paths(graph: Graph) -> None:
+    index = LineageIndex(graph)
+    assert len(index) == len(graph.nodes)
+    assert index.parent(PAPER_ID) is None
+    assert index.depth(PAPER_ID) == 0
+    assert max(index.depths) > 10
+    rng = random.Random(1)
+    ids = list(graph.nodes)
+    for _ in range(300):
+        a, b = rng.choice(ids), rng.choice(ids)
+        path_a, path_b = graph.nodes[a].path, graph.nodes[b].path
+        assert index.lineage(a) == path_a
+        assert index.depth(a) == len(path_a) - 1
+        assert index.parent(a) == (path_a[-2] if len(path_a) > 1 else None)
+        common = _common_prefix(path_a, path_b)
+        assert index.lowest_common_ancestor(a, b) == common[-1]
+        assert index.common_lineage(a, b) == common
+        assert index.is_ancestor(a, b) == (a in path_b)
+        shared = len(common)
+        up, down = path_a[::-1], path_b[shared:]
+        assert index.tree_path(a, b) == up[: len(up) - shared + 1] + down
+        hops = rng.randrange(len(path_a) + 1)
+        assert index.ancestor(a, hops) == (
+            path_a[-1 - hops] if hops < len(path_a) else None
+        )
+        assert sorted(index.descendants(a)) == sorted(
+            paper_id
+            for paper_id, paper in graph.nodes.items()
+            if a in paper.path and paper_id != a
+        )
+
+
+def test_within_distance(graph: Graph) -> None:
+    index = LineageIndex(graph)
+    for low, high in [(0.0, 0.0), (0.0, 2.5), (1.0, 3.0), (5.0, 1000.0)]:
+        found = index.within_distance(high, low)
+        assert sorted(found) == sorted(
+            paper_id
+            for paper_id, length in graph.path_lengths.items()
+            if low <= length <= high
+        )
+        lengths = [index.path_length(paper_id) for paper_id in found]
+        assert lengths == sorted(lengths)
+
+
+def test_inconsistent_paths() -> None:
+    graph = decode_graph(make_graph_json(PAPER_ID, num_nodes=6))
+    a, b, c, d, e = list(graph.nodes)[1:]
+    graph.nodes[a].path = [PAPER_ID, "not in the graph", d, a]
+    graph.nodes[b].path = [b, a, PAPER_ID]  # A path to the start paper
+    graph.nodes[c].path = [PAPER_ID, d, c]  # c and d are each other's parent
+    graph.nodes[d].path = [PAPER_ID, c, d]
+    graph.nodes[e].path = []
+    del graph.nodes[PAPER_ID]
+    index = LineageIndex(graph)
+    assert index.lineage(e) == [PAPER_ID, e]
+    # Only the edge closing the cycle is cut: the papers hanging from the
+    # cycle keep their parents
+    assert index.lineage(c) == [PAPER_ID, d, c]
+    assert index.lineage(b) == [PAPER_ID, d, a, b]
+    assert index.lowest_common_ancestor(b, c) == d
+    assert len(index.descendants(PAPER_ID)) == 5
+
+
+def test_lineage_index_is_cached() -> None:
+    graph = decode_graph(make_graph_json(PAPER_ID))
+    index = lineage_index(graph)
+    assert lineage_index(graph) is index
+    del graph
+    gc.collect()
+    assert not lineage._indexes
@@ -1,31 +1,26 @@
 import asyncio
 
+import pytest
+
 from connectedpapers import ConnectedPapersClient
 from connectedpapers.connected_papers_client import GraphResponse, GraphResponseStatuses
-from connectedpapers.consts import TEST_TOKEN
-from tests.test_connected_papers_api import TEST_FAKE_PAPER_ID
-
-
-async def wrapper_for_old_graph(no_nest: bool = False) -> GraphResponse:
-    connected_papers_api = ConnectedPapersClient(access_token=TEST_TOKEN, verbose=True)
-    if no_nest:
-        connected_papers_api.nested_asyncio = False
-    old_graph = connected_papers_api.get_graph_sync(
-        TEST_FAKE_PAPER_ID, fresh_only=False
-    )
-    return old_graph
-
+from tests.mock_server import MockConnectedPapersServer
 
-def sync_wrapper_2(no_nest: bool = False) -> GraphResponse:
-    loop = asyncio.new_event_loop()
-    return loop.run_until_complete(wrapper_for_old_graph(no_nest))
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
 
 
-async def async_wrapper_2(no_nest: bool = False) -> GraphResponse:
-    return sync_wrapper_2(no_nest)
+async def wrapper_for_old_graph(server_addr: str, nest: bool) -> GraphResponse:
+    connected_papers_api = ConnectedPapersClient(
+        server_addr=server_addr, verbose=True, nested_asyncio=nest
+    )
+    try:
+        # A synchronous call from code running in an event loop
+        return connected_papers_api.get_graph_sync(PAPER_ID, fresh_only=False)
+    finally:
+        connected_papers_api.close()
 
 
-def test_nested_asyncio() -> None:
-    loop = asyncio.new_event_loop()
-    result: GraphResponse = loop.run_until_complete(async_wrapper_2())
+@pytest.mark.parametrize("nest", [False, True])
+def test_nested_asyncio(mock_server: MockConnectedPapersServer, nest: bool) -> None:
+    result = asyncio.run(wrapper_for_old_graph(mock_server.url, nest))
     assert result.status == GraphResponseStatuses.OLD_GRAPH
@@ -0,0 +1,182 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from connectedpapers import ConnectedPapersClient
+from connectedpapers.connected_papers_client import (
+    SLEEP_TIME_BETWEEN_CHECKS,
+    GraphResponseStatuses,
+)
+from connectedpapers.polling import (
+    AdaptivePolling,
+    FixedPolling,
+    PollingStrategy,
+    PollSchedule,
+    TimerWheel,
+    shared_timer_wheel,
+)
+from tests.mock_server import (
+    MockConnectedPapersServer,
+    make_build_script,
+    make_graph_json,
+)
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_strategy(**kwargs: float) -> AdaptivePolling:
+    strategy = AdaptivePolling(jitter=0.0, **kwargs)
+    strategy.clock = FakeClock()
+    return strategy
+
+
+def test_fixed_polling() -> None:
+    schedule = FixedPolling(2.0).schedule()
+    assert schedule.next_delay(None) == 2.0
+    assert schedule.next_delay(50.0) == 2.0
+    assert schedule.eta() is None
+    assert FixedPolling().interval == SLEEP_TIME_BETWEEN_CHECKS
+
+
+def test_strategies_are_abstract() -> None:
+    class Incomplete(PollingStrategy):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()  # type: ignore[abstract]
+    with pytest.raises(TypeError):
+        PollSchedule()  # type: ignore[abstract]
+
+
+def test_adaptive_polling_backs_off_while_queued() -> None:
+    schedule = make_strategy(interval=1.0, queued_backoff=2.0).schedule()
+    delays = [schedule.next_delay(None) for _ in range(6)]
+    assert delays == [1.0, 2.0, 4.0, 8.0, 10.0, 10.0]
+
+
+def test_adaptive_polling_tightens_near_completion() -> None:
+    strategy = make_strategy(eta_fraction=0.5)
+    clock = strategy.clock
+    assert isinstance(clock, FakeClock)
+    schedule = strategy.schedule()
+    assert schedule.next_delay(10.0) == 1.0  # No rate yet
+    assert schedule.eta() is None
+    clock.now = 8.0
+    assert schedule.next_delay(50.0) == 5.0  # 5%/s, 10s to go
+    assert schedule.eta() == pytest.approx(10.0)
+    clock.now = 16.0
+    assert schedule.next_delay(90.0) == 1.0
+    clock.now = 17.0
+    assert schedule.next_delay(98.0) == 0.25  # Clamped to min_interval
+
+
+def test_adaptive_polling_jitter_stays_in_bounds() -> None:
+    strategy = AdaptivePolling(interval=2.0, jitter=0.25)
+    delays = {strategy.schedule().next_delay(None) for _ in range(50)}
+    assert len(delays) > 1
+    assert all(1.5 <= delay <= 2.5 for delay in delays)
+
+
+def test_adaptive_polling_rejects_bad_bounds() -> None:
+    with pytest.raises(ValueError):
+        AdaptivePolling(min_interval=5.0, max_interval=1.0)
+
+
+@pytest.mark.asyncio
+async def test_timer_wheel_wakes_sleepers_in_order() -> None:
+    wheel = TimerWheel(resolution=0.01)
+    woken: List[int] = []
+
+    async def sleeper(index: int, delay: float) -> None:
+        await wheel.sleep(delay)
+        woken.append(index)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    # Delays are a few ticks apart, so a slow start doesn't reorder them
+    tasks = [asyncio.create_task(sleeper(i, 0.25 - i * 0.05)) for i in range(5)]
+    tasks += [asyncio.create_task(sleeper(10 + i, 0.125)) for i in range(100)]
+    await asyncio.sleep(0)
+    assert wheel.pending() == 105
+    await asyncio.gather(*tasks)
+    assert loop.time() - start >= 0.24
+    assert woken[:2] == [4, 3]
+    assert woken[-3:] == [2, 1, 0]
+    assert wheel.pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_timer_wheel_sleep_can_be_cancelled() -> None:
+    wheel = TimerWheel(resolution=0.01)
+    task = asyncio.create_task(wheel.sleep(10.0))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert wheel.pending() == 0
+    await asyncio.wait_for(wheel.sleep(0.02), timeout=1.0)
+
+
+@pytest.mark.asyncio
+async def test_shared_timer_wheel_is_per_loop() -> None:
+    assert shared_timer_wheel() is shared_timer_wheel()
+
+
+class RecordingPolling(PollingStrategy):
+    def __init__(self) -> None:
+        self.progress: List[object] = []
+
+    def schedule(self) -> PollSchedule:
+        strategy = self
+
+        class Schedule(PollSchedule):
+            def next_delay(self, progress: object) -> float:
+                strategy.progress.append(progress)
+                return 0.01
+
+        return Schedule()
+
+
+@pytest.mark.asyncio
+async def test_client_polls_with_strategy(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    mock_server.scripts[PAPER_ID] = [
+        {"status": "QUEUED"},
+        {"status": "IN_PROGRESS", "progress": 30.0},
+        {"status": "IN_PROGRESS"},
+        {"status": "FRESH_GRAPH", "graph_json": make_graph_json(PAPER_ID)},
+    ]
+    polling = RecordingPolling()
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, polling=polling
+    ) as client:
+        response = await client.get_graph_async(PAPER_ID)
+    assert response.status == GraphResponseStatuses.FRESH_GRAPH
+    assert polling.progress == [None, 30.0, 0.0]
+
+
+@pytest.mark.asyncio
+async def test_client_follows_build_script(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    mock_server.scripts[PAPER_ID] = make_build_script(
+        PAPER_ID, queued=2, progress=(10.0, 90.0), num_nodes=50
+    )
+    polling = RecordingPolling()
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, polling=polling
+    ) as client:
+        response = await client.get_graph_async(PAPER_ID)
+    assert response.graph_json is not None and len(response.graph_json.nodes) == 50
+    assert polling.progress == [None, None, 10.0, 90.0]
+    assert len(mock_server.graph_requests) == 5
@@ -0,0 +1,94 @@
+import json
+from typing import List
+
+import pytest
+
+from connectedpapers import ConnectedPapersClient
+from connectedpapers.connected_papers_client import GraphResponseStatuses
+from connectedpapers.streaming import PaperIDStreamParser
+from tests.mock_server import MockConnectedPapersServer
+
+PAPER_IDS = [f"{i:040x}" for i in range(20)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 41, 1 << 20])
+def test_paper_id_parser(chunk_size: int) -> None:
+    body = json.dumps({"papers": PAPER_IDS + ['odd "id", ]']}, indent=1).encode()
+    parser = PaperIDStreamParser()
+    paper_ids: List[str] = []
+    for start in range(0, len(body), chunk_size):
+        end = start + chunk_size
+        paper_ids.extend(parser.feed(body[start:end]))
+    parser.close()
+    assert paper_ids == PAPER_IDS + ['odd "id", ]']
+
+
+def test_paper_id_parser_reports_truncation() -> None:
+    parser = PaperIDStreamParser()
+    assert parser.feed(b'{"papers": ["a", "b') == ["a"]
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_free_access_papers(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    mock_server.free_access_papers = PAPER_IDS
+    async with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        streamed = [
+            paper_id
+            async for paper_id in client.stream_free_access_papers_async_iterator(
+                chunk_size=64
+            )
+        ]
+    assert streamed == PAPER_IDS
+
+
+@pytest.mark.asyncio
+async def test_prefetch_fills_the_cache(mock_server: MockConnectedPapersServer) -> None:
+    mock_server.free_access_papers = PAPER_IDS
+    mock_server.latency = 0.02
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, memory_cache_size=len(PAPER_IDS)
+    ) as client:
+        statuses = await client.prefetch_free_access_papers_async(max_concurrency=4)
+        assert statuses == {
+            paper_id: GraphResponseStatuses.OLD_GRAPH for paper_id in PAPER_IDS
+        }
+        assert mock_server.max_in_flight == 4
+        assert all(fresh is False for _, fresh in mock_server.graph_requests)
+        requests = len(mock_server.graph_requests)
+        response = await client.get_graph_async(PAPER_IDS[3], fresh_only=False)
+        assert response.status == GraphResponseStatuses.OLD_GRAPH
+        assert len(mock_server.graph_requests) == requests
+        assert client.metrics.counter("graph.cache_hits.memory") == 1
+
+
+@pytest.mark.asyncio
+async def test_prefetch_budget(mock_server: MockConnectedPapersServer) -> None:
+    mock_server.free_access_papers = PAPER_IDS
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, memory_cache_size=100
+    ) as client:
+        statuses = await client.prefetch_free_access_papers_async(
+            max_concurrency=2, max_papers=5
+        )
+    assert set(statuses) == set(PAPER_IDS[:5])
+    assert len(mock_server.graph_requests) == 5
+
+    # Prefetching stops at the quota reserve
+    mock_server.graph_requests.clear()
+    mock_server.remaining_uses = 3
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, memory_cache_size=100, quota_reserve=3
+    ) as client:
+        statuses = await client.prefetch_free_access_papers_async(max_concurrency=1)
+    assert list(statuses) == PAPER_IDS[:1]
+    assert len(mock_server.graph_requests) == 1
+
+
+def test_prefetch_needs_a_cache(mock_server: MockConnectedPapersServer) -> None:
+    with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        with pytest.raises(ValueError, match="cache"):
+            client.prefetch_free_access_papers_sync()
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+from typing import List
+
+import pytest
+
+from connectedpapers import ConnectedPapersClient
+from connectedpapers.connected_papers_client import GraphResponseStatuses
+from connectedpapers.rate_limit import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    QuotaTracker,
+    RateLimiter,
+)
+from tests.mock_server import MockConnectedPapersServer
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_paces_requests() -> None:
+    limiter = RateLimiter(requests_per_minute=600, burst=2)  # 10 per second
+    start = time.monotonic()
+    for _ in range(6):
+        await limiter.acquire()
+    # The burst is free, the next 4 requests wait 0.1s each
+    assert 0.35 <= time.monotonic() - start < 1.0
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_serves_by_priority() -> None:
+    limiter = RateLimiter(requests_per_minute=1200, burst=1)
+    await limiter.acquire()  # Empty the bucket
+    order: List[str] = []
+
+    async def request(name: str, priority: int) -> None:
+        await limiter.acquire(priority)
+        order.append(name)
+
+    tasks = [asyncio.create_task(request(f"low{i}", PRIORITY_LOW)) for i in range(3)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(request("high", PRIORITY_HIGH)))
+    tasks.append(asyncio.create_task(request("normal", 0)))
+    await asyncio.gather(*tasks)
+    # Requests that come later but with a higher priority are served first
+    assert order == ["high", "normal", "low0", "low1", "low2"]
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_waiter_can_be_cancelled() -> None:
+    limiter = RateLimiter(requests_per_minute=600, burst=1)
+    await limiter.acquire()
+    head = asyncio.create_task(limiter.acquire())
+    second = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.waiting() == 2
+    head.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await head
+    await asyncio.wait_for(second, timeout=1.0)
+    assert limiter.waiting() == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_pause() -> None:
+    limiter = RateLimiter(requests_per_minute=6000, burst=5)
+    limiter.pause(0.2)
+    start = time.monotonic()
+    await limiter.acquire()
+    assert time.monotonic() - start >= 0.15
+
+
+def test_rate_limiter_is_shared_between_threads() -> None:
+    limiter = RateLimiter(requests_per_minute=1200, burst=1)  # 20 per second
+
+    def run() -> None:
+        async def requests() -> None:
+            for _ in range(3):
+                await limiter.acquire()
+
+        asyncio.run(requests())
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - start >= 0.35  # 9 requests, 1 of them free
+
+
+def test_quota_tracker() -> None:
+    quota = QuotaTracker()
+    assert quota.allows()
+    quota.update(0)
+    assert quota.allows()  # No reserve, the server decides
+    quota = QuotaTracker(reserve=10)
+    assert quota.allows()
+    quota.update(11)
+    quota.update(None)
+    assert quota.remaining == 11
+    assert quota.allows(PRIORITY_LOW)
+    quota.update(10)
+    assert not quota.allows()
+    assert quota.allows(PRIORITY_HIGH)
+    quota.update(0)
+    assert not quota.allows(PRIORITY_HIGH)
+
+
+@pytest.mark.asyncio
+async def test_client_keeps_quota_reserve(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    mock_server.remaining_uses = 5
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, quota_reserve=5
+    ) as client:
+        response = await client.get_graph_async(PAPER_ID)
+        assert response.status == GraphResponseStatuses.FRESH_GRAPH
+        assert client.quota.remaining == 5
+        response = await client.get_graph_async("b" * 40)
+        assert response.status == GraphResponseStatuses.OUT_OF_REQUESTS
+        assert response.remaining_requests == 5
+        assert len(mock_server.graph_requests) == 1
+        response = await client.get_graph_async("b" * 40, priority=PRIORITY_HIGH)
+        assert response.status == GraphResponseStatuses.FRESH_GRAPH
+        mock_server.remaining_uses = 50
+        assert await client.get_remaining_usages_async() == 50
+        assert client.quota.allows()
+
+
+@pytest.mark.asyncio
+async def test_client_rate_limit(mock_server: MockConnectedPapersServer) -> None:
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, requests_per_minute=600, burst=1
+    ) as client:
+        start = time.monotonic()
+        await client.get_graphs_async([f"{i:040x}" for i in range(5)])
+        assert time.monotonic() - start >= 0.35
+    assert len(mock_server.graph_requests) == 5
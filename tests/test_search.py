@@ -0,0 +1,131 @@
+import random
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from connectedpapers.decoding import decode_graph
+from connectedpapers.graph import BasePaper, Graph
+from connectedpapers.search import PaperIndex, keywords
+from tests.mock_server import make_graph_json
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+@pytest.fixture
+def graphs() -> List[Graph]:
+    return [
+        decode_graph(make_graph_json(f"{seed:040x}", num_nodes=60, seed=seed))
+        for seed in range(3)
+    ]
+
+
+def _papers(graphs: List[Graph]) -> List[BasePaper]:
+    papers: List[BasePaper] = []
+    seen = set()
+    for graph in graphs:
+        entries: List[BasePaper] = list(graph.nodes.values())
+        entries.extend(graph.common_citations)
+        entries.extend(graph.common_references)
+        for paper in entries:
+            if paper.id not in seen:
+                seen.add(paper.id)
+                papers.append(paper)
+    return papers
+
+
+def _scan(
+    papers: List[BasePaper],
+    text: Optional[str] = None,
+    author: Optional[str] = None,
+    venue: Optional[str] = None,
+    min_year: Optional[int] = None,
+    max_year: Optional[int] = None,
+    open_access: Optional[bool] = None,
+) -> List[str]:
+    return [
+        paper.id
+        for paper in papers
+        if (
+            text is None
+            or keywords(text)
+            <= keywords(paper.title) | keywords(paper.abstract) | keywords(paper.tldr)
+        )
+        and (author is None or any(author in a.ids for a in paper.authors))
+        and (venue is None or (paper.venue or "").lower() == venue.lower())
+        and (min_year is None or (paper.year or 0) >= min_year)
+        and (max_year is None or (paper.year or 10**6) <= max_year)
+        and (open_access is None or paper.isOpenAccess == open_access)
+    ]
+
+
+def test_search_matches_linear_scan(graphs: List[Graph]) -> None:
+    index = PaperIndex()
+    assert index.add_all(graphs) == 3
+    papers = _papers(graphs)
+    assert len(index) == len(papers)
+    rng = random.Random(0)
+    for _ in range(200):
+        paper = rng.choice(papers)
+        text = rng.choice([None, "paper", f"number {paper.corpusid}", "tldr 3"])
+        author = rng.choice([None, paper.authors[0].ids[0]])
+        venue = rng.choice([None, "VENUE 3", paper.venue])
+        min_year = rng.choice([None, rng.randrange(1985, 2025)])
+        max_year = rng.choice([None, rng.randrange(1985, 2025)])
+        open_access = rng.choice([None, True, False])
+        assert index.search(
+            text,
+            authors=[] if author is None else [author],
+            venue=venue,
+            min_year=min_year,
+            max_year=max_year,
+            open_access=open_access,
+        ) == _scan(papers, text, author, venue, min_year, max_year, open_access)
+
+
+def test_search_filters(graphs: List[Graph]) -> None:
+    index = PaperIndex()
+    index.add(graphs[0])
+    assert index.search() == index.paper_ids
+    assert index.search("no such words") == []
+    assert index.search(fields_of_study=["computer  science"]) == index.paper_ids
+    assert index.search(graph=graphs[0].start_id) == index.paper_ids
+    assert index.search(graph=graphs[1].start_id) == []
+    assert index.search(min_year=2000, max_year=2000) == [
+        paper_id for paper_id, paper in graphs[0].nodes.items() if paper.year == 2000
+    ] + [paper.id for paper in graphs[0].common_citations if paper.year == 2000]
+
+
+def test_search_is_incremental(graphs: List[Graph]) -> None:
+    index = PaperIndex()
+    index.add(graphs[0])
+    first = index.search(min_year=1995, max_year=2005)
+    assert not index.add(graphs[0])
+    index.add(graphs[1])
+    assert PAPER_ID not in index
+    assert graphs[1].start_id in index
+    both = index.search(min_year=1995, max_year=2005)
+    assert both[: len(first)] == first
+    assert both == _scan(_papers(graphs[:2]), min_year=1995, max_year=2005)
+    # A paper in two graphs is in the results of both
+    shared = graphs[0].common_citations[0].paper_id
+    assert shared in index.search(graph=graphs[1].start_id)
+
+
+def test_persisted_index(graphs: List[Graph], tmp_path: Path) -> None:
+    index = PaperIndex()
+    index.add_all(graphs[:2])
+    path = str(tmp_path / "papers.index")
+    index.save(path)
+    reopened = PaperIndex.load(path)
+    assert reopened.paper_ids == index.paper_ids
+    for query in ["paper number", "abstract 7"]:
+        assert reopened.search(query, min_year=2000) == index.search(
+            query, min_year=2000
+        )
+    # A reopened index keeps growing
+    assert not reopened.add(graphs[0])
+    assert reopened.add(graphs[2])
+    assert len(reopened) == len(_papers(graphs))
+    with pytest.raises(ValueError):
+        PaperIndex.from_bytes(graphs[0].to_bytes())
@@ -0,0 +1,133 @@
+import json
+from typing import Any, Dict, List
+
+import pytest
+
+from connectedpapers import ConnectedPapersClient
+from connectedpapers import serialization as serialization_module
+from connectedpapers.compact import compact_graph
+from connectedpapers.connected_papers_client import GraphResponseStatuses
+from connectedpapers.decoding import decode_graph
+from connectedpapers.graph import Graph, Paper
+from connectedpapers.instrumentation import Observer, Span
+from connectedpapers.serialization import (
+    JSON,
+    MSGPACK,
+    NONE,
+    ZLIB,
+    ZSTD,
+    from_bytes,
+    is_serialized,
+    to_bytes,
+)
+from tests.mock_server import (
+    MockConnectedPapersServer,
+    MockServerThread,
+    make_graph_json,
+)
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+@pytest.fixture
+def graph_json() -> Dict[str, Any]:
+    data = make_graph_json(PAPER_ID, num_nodes=30)
+    # Optional fields, both set and unset
+    paper = data["nodes"][PAPER_ID]
+    paper["abstract"] = None
+    paper["externalIds"]["DOI"] = "10.1000/1"
+    return data
+
+
+def _require(codec: str, compression: str) -> None:
+    if codec == MSGPACK:
+        pytest.importorskip("msgpack")
+    if compression == ZSTD:
+        pytest.importorskip("zstandard")
+
+
+@pytest.mark.parametrize("codec", [JSON, MSGPACK])
+@pytest.mark.parametrize("compression", [NONE, ZLIB, ZSTD])
+def test_graph_round_trip(
+    graph_json: Dict[str, Any], codec: str, compression: str
+) -> None:
+    _require(codec, compression)
+    graph = decode_graph(graph_json)
+    data = graph.to_bytes(codec, compression)
+    assert is_serialized(data)
+    assert Graph.from_bytes(data) == graph
+
+
+def test_compact_graph_round_trip(graph_json: Dict[str, Any]) -> None:
+    graph = decode_graph(graph_json)
+    assert Graph.from_bytes(compact_graph(graph).to_bytes()) == graph
+
+
+def test_paper_round_trip(graph_json: Dict[str, Any]) -> None:
+    paper = decode_graph(graph_json).nodes[PAPER_ID]
+    assert from_bytes(to_bytes(paper), Paper) == paper
+
+
+def test_binary_is_smaller_than_json(graph_json: Dict[str, Any]) -> None:
+    graph = decode_graph(graph_json)
+    assert len(graph.to_bytes()) < len(json.dumps(graph_json)) / 2
+
+
+def test_missing_library_is_reported(
+    graph_json: Dict[str, Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    pytest.importorskip("msgpack")
+    data = decode_graph(graph_json).to_bytes(MSGPACK, ZLIB)
+    monkeypatch.setattr(serialization_module, "_msgpack", None)
+    assert serialization_module.default_codec() == JSON
+    with pytest.raises(ImportError, match="connectedpapers-py\\[binary\\]"):
+        Graph.from_bytes(data)
+
+
+def test_invalid_data() -> None:
+    with pytest.raises(ValueError):
+        Graph.from_bytes(b"{}")
+    with pytest.raises(ValueError):
+        to_bytes(None, codec="cbor")
+
+
+class RequestRecorder(Observer):
+    def __init__(self) -> None:
+        self.requests: List[Span] = []
+
+    def span_ended(self, span: Span) -> None:
+        if span.name == "http.request":
+            self.requests.append(span)
+
+
+@pytest.mark.asyncio
+async def test_client_negotiates_compression() -> None:
+    recorder = RequestRecorder()
+    with MockServerThread(MockConnectedPapersServer(compress=True)) as server:
+        async with ConnectedPapersClient(
+            server_addr=server.url, observers=[recorder]
+        ) as client:
+            response = await client.get_graph_async(PAPER_ID)
+            assert response.status == GraphResponseStatuses.FRESH_GRAPH
+            streamed = [
+                item async for item in client.stream_graph_async_iterator(PAPER_ID)
+            ]
+            assert streamed
+    assert len(server.accept_encodings) == 2
+    assert all("gzip" in value for value in server.accept_encodings)
+    assert len(recorder.requests) == 2
+    assert all(
+        span.attributes["content_encoding"] in ("gzip", "deflate")
+        for span in recorder.requests
+    )
+
+
+@pytest.mark.asyncio
+async def test_client_accept_encoding(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, accept_encoding="identity"
+    ) as client:
+        await client.get_graph_async(PAPER_ID)
+    assert mock_server.accept_encodings == ["identity"]
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from connectedpapers import ConnectedPapersClient
+from connectedpapers.connected_papers_client import GraphResponseStatuses
+from tests.mock_server import MockConnectedPapersServer
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+@pytest.mark.asyncio
+async def test_calls_reuse_pooled_connection(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    async with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        for _ in range(5):
+            assert await client.get_remaining_usages_async() == 100
+        await client.get_free_access_papers_async()
+        response = await client.get_graph_async(PAPER_ID, fresh_only=False)
+        assert response.status == GraphResponseStatuses.OLD_GRAPH
+    assert len(mock_server.peers) == 1
+
+
+@pytest.mark.asyncio
+async def test_aclose_releases_session(mock_server: MockConnectedPapersServer) -> None:
+    client = ConnectedPapersClient(server_addr=mock_server.url)
+    await client.get_remaining_usages_async()
+    session = await client._get_session()
+    await client.aclose()
+    assert session.closed and client.closed
+    # A closed client doesn't open a new session
+    with pytest.raises(RuntimeError):
+        await client.get_remaining_usages_async()
+    assert client._sessions.get(asyncio.get_running_loop()) is None
+    assert len(mock_server.peers) == 1
+
+
+def test_sync_calls_use_mock_server(mock_server: MockConnectedPapersServer) -> None:
+    client = ConnectedPapersClient(server_addr=mock_server.url)
+    response = client.get_graph_sync(PAPER_ID, fresh_only=False)
+    assert response.status == GraphResponseStatuses.OLD_GRAPH
+    assert response.graph_json is not None
+    assert response.graph_json.start_id == PAPER_ID
+    assert client.get_remaining_usages_sync() == 100
@@ -0,0 +1,123 @@
+import gc
+import math
+import random
+from typing import List, Sequence, Tuple, cast
+
+import pytest
+
+from connectedpapers import spatial
+from connectedpapers.compact import compact_graph
+from connectedpapers.corpus import GraphCorpus
+from connectedpapers.decoding import decode_graph
+from connectedpapers.spatial import NOISE, SpatialIndex, spatial_index
+from tests.mock_server import make_graph_json
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+Points = List[Tuple[str, Sequence[float]]]
+
+
+@pytest.fixture(params=["python", "numpy"])
+def backend(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> str:
+    """Run a test with the pure Python and the numpy implementations."""
+    if request.param == "numpy":
+        monkeypatch.setattr(spatial, "_numpy", pytest.importorskip("numpy"))
+    else:
+        monkeypatch.setattr(spatial, "_numpy", None)
+    return cast(str, request.param)
+
+
+@pytest.fixture
+def points() -> Points:
+    rng = random.Random(0)
+    return [(str(i), [rng.gauss(0, 10), rng.gauss(0, 10)]) for i in range(1000)]
+
+
+def test_within_matches_linear_scan(points: Points, backend: str) -> None:
+    index = SpatialIndex(points)
+    rng = random.Random(1)
+    for _ in range(100):
+        min_x, min_y = rng.uniform(-40, 30), rng.uniform(-40, 30)
+        max_x, max_y = min_x + rng.uniform(0, 20), min_y + rng.uniform(0, 20)
+        expected = {
+            paper_id
+            for paper_id, (x, y) in points
+            if min_x <= x <= max_x and min_y <= y <= max_y
+        }
+        assert set(index.within(min_x, min_y, max_x, max_y)) == expected
+    assert len(index.within(-math.inf, -math.inf, math.inf, math.inf)) == len(points)
+    assert index.within(100, 100, 200, 200) == []
+
+
+def test_nearest_matches_linear_scan(points: Points, backend: str) -> None:
+    index = SpatialIndex(points)
+    rng = random.Random(2)
+    for _ in range(100):
+        x, y = rng.uniform(-60, 60), rng.uniform(-60, 60)
+        k = rng.randint(1, 30)
+        expected = sorted(math.hypot(px - x, py - y) for _, (px, py) in points)[:k]
+        nearest = index.nearest(x, y, k)
+        assert [distance for _, distance in nearest] == pytest.approx(expected)
+    assert len(index.nearest(0, 0, 5000)) == len(points)
+
+
+def test_radius_and_nearest_to(points: Points, backend: str) -> None:
+    index = SpatialIndex(points)
+    x, y = index.position("7")
+    expected = {
+        paper_id for paper_id, (px, py) in points if math.hypot(px - x, py - y) <= 3.0
+    }
+    assert set(index.within_radius(x, y, 3.0)) == expected
+    nearest = index.nearest_to("7", 3)
+    assert len(nearest) == 3 and "7" not in dict(nearest)
+    assert nearest == index.nearest(x, y, 4)[1:]
+
+
+def test_clusters(backend: str) -> None:
+    rng = random.Random(3)
+    blobs = [(0.0, 0.0), (50.0, 50.0), (-50.0, 30.0)]
+    points: Points = [
+        (f"{b}-{i}", [cx + rng.gauss(0, 1), cy + rng.gauss(0, 1)])
+        for b, (cx, cy) in enumerate(blobs)
+        for i in range(50)
+    ]
+    points.append(("outlier", [100.0, -100.0]))
+    labels = SpatialIndex(points).clusters(radius=2.0, min_points=5)
+    assert labels["outlier"] == NOISE
+    for b in range(len(blobs)):
+        blob = {labels[f"{b}-{i}"] for i in range(50)} - {NOISE}
+        assert len(blob) == 1
+    assert len(set(labels.values()) - {NOISE}) == len(blobs)
+
+
+def test_degenerate_indexes(backend: str) -> None:
+    empty = SpatialIndex([])
+    assert empty.within(0, 0, 1, 1) == [] and empty.nearest(0, 0) == []
+    line = SpatialIndex([(str(i), [float(i), 1.0]) for i in range(10)])
+    assert sorted(line.within(2, 0, 4, 2)) == ["2", "3", "4"]
+    [(nearest, distance)] = line.nearest(8.9, 1.0)
+    assert nearest == "9" and distance == pytest.approx(0.1)
+    same = SpatialIndex([("a", [1.0, 1.0]), ("b", [1.0, 1.0])])
+    assert sorted(same.within(1, 1, 1, 1)) == ["a", "b"]
+    with pytest.raises(ValueError):
+        SpatialIndex([], cell_size=0)
+
+
+def test_graph_and_corpus_indexes() -> None:
+    graph = decode_graph(make_graph_json(PAPER_ID, num_nodes=100))
+    index = spatial_index(graph)
+    assert spatial_index(graph) is index
+    assert len(index) == 100 and PAPER_ID in index
+    assert index.position(PAPER_ID) == tuple(graph.nodes[PAPER_ID].pos)
+    compact_index = spatial_index(compact_graph(graph))
+    assert compact_index.node_ids == index.node_ids
+    key = id(graph)
+    del graph, index
+    gc.collect()
+    assert key not in spatial._indexes
+
+    corpus = GraphCorpus()
+    corpus.add(decode_graph(make_graph_json("a" * 40, num_nodes=30, seed=1)))
+    corpus.add(decode_graph(make_graph_json("b" * 40, num_nodes=30, seed=2)))
+    corpus_index = SpatialIndex.from_corpus(corpus)
+    assert len(corpus_index) == len(corpus)
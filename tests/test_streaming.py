@@ -0,0 +1,118 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+
+from connectedpapers import ConnectedPapersClient
+from connectedpapers.connected_papers_client import GraphResponse, GraphResponseStatuses
+from connectedpapers.decoding import decode_graph
+from connectedpapers.graph import Edge, Graph, Paper, PaperID
+from connectedpapers.streaming import GraphStreamParser, StreamedEdge, StreamedNode
+from tests.mock_server import MockConnectedPapersServer, make_graph_json
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+def parse(
+    body: bytes, chunk_size: int
+) -> Tuple[Dict[str, Any], Optional[Graph], Dict[PaperID, Paper], List[Edge]]:
+    parser = GraphStreamParser()
+    nodes: Dict[PaperID, Paper] = {}
+    edges: List[Edge] = []
+    for start in range(0, len(body), chunk_size):
+        end = start + chunk_size
+        for event in parser.feed(body[start:end]):
+            if isinstance(event, StreamedNode):
+                nodes[event.paper_id] = event.paper
+            else:
+                edges.append(event.edge)
+    fields, graph = parser.close()
+    return fields, graph, nodes, edges
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000, 1 << 20])
+def test_parser_matches_full_decode(chunk_size: int) -> None:
+    graph_json = make_graph_json(PAPER_ID, num_nodes=30)
+    # Structural characters, escapes and multi-byte characters inside strings
+    graph_json["nodes"][PAPER_ID]["title"] = 'Ünïcödé "quoted" {x} [y], z: \\ 論文'
+    graph_json["nodes"]['odd "key"'] = graph_json["nodes"].pop(
+        list(graph_json["nodes"])[-1]
+    )
+    body = json.dumps(
+        {"status": "FRESH_GRAPH", "graph_json": graph_json, "remaining_requests": 7},
+        ensure_ascii=False,
+        indent=1 if chunk_size == 7 else None,
+    ).encode("utf-8")
+    fields, graph, nodes, edges = parse(body, chunk_size)
+    assert fields == {"status": "FRESH_GRAPH", "remaining_requests": 7}
+    assert graph is not None
+    assert graph.nodes == {} and graph.edges == []
+    graph.nodes, graph.edges = nodes, edges
+    assert graph == decode_graph(graph_json)
+
+
+def test_parser_without_graph() -> None:
+    body = b'{"status": "IN_PROGRESS", "progress": 42.5, "graph_json": null}'
+    fields, graph, nodes, edges = parse(body, 3)
+    assert fields == {"status": "IN_PROGRESS", "progress": 42.5, "graph_json": None}
+    assert graph is None and nodes == {} and edges == []
+
+
+def test_parser_buffers_one_value_at_a_time() -> None:
+    graph_json = make_graph_json(PAPER_ID, num_nodes=500)
+    graph_json["common_citations"] = graph_json["common_references"] = []
+    body = json.dumps({"status": "FRESH_GRAPH", "graph_json": graph_json}).encode()
+    node_size = max(len(json.dumps(node)) for node in graph_json["nodes"].values())
+    parser = GraphStreamParser()
+    peak = 0
+    for start in range(0, len(body), 4096):
+        end = start + 4096
+        parser.feed(body[start:end])
+        peak = max(peak, parser.buffered_chars)
+    parser.close()
+    assert peak < 4096 + max(node_size, len(json.dumps(graph_json["path_lengths"])))
+    assert peak < len(body) / 10
+
+
+def test_parser_rejects_bad_input() -> None:
+    with pytest.raises(ValueError):
+        GraphStreamParser().feed(b"[1, 2]")
+    parser = GraphStreamParser()
+    parser.feed(b'{"status": "FRESH_GRAPH", "graph_json": {"nodes": {')
+    with pytest.raises(ValueError):
+        parser.close()
+    parser = GraphStreamParser()
+    with pytest.raises(ValueError):
+        parser.feed(b'{"status": "ERROR"} trailing')
+
+
+@pytest.mark.asyncio
+async def test_client_streams_graph(mock_server: MockConnectedPapersServer) -> None:
+    graph_json = make_graph_json(PAPER_ID, num_nodes=200)
+    mock_server.scripts[PAPER_ID] = [{"status": "QUEUED"}]
+    async with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        items = [
+            item async for item in client.stream_graph_async_iterator(PAPER_ID, True)
+        ]
+        assert items == [
+            GraphResponse(status=GraphResponseStatuses.QUEUED, remaining_requests=100)
+        ]
+
+        mock_server.scripts[PAPER_ID] = [
+            {"status": "FRESH_GRAPH", "graph_json": graph_json}
+        ]
+        nodes: Dict[PaperID, Paper] = {}
+        edges: List[Edge] = []
+        async for item in client.stream_graph_async_iterator(
+            PAPER_ID, True, chunk_size=4096
+        ):
+            if isinstance(item, StreamedNode):
+                nodes[item.paper_id] = item.paper
+            elif isinstance(item, StreamedEdge):
+                edges.append(item.edge)
+            else:
+                response = item
+    assert response.status == GraphResponseStatuses.FRESH_GRAPH
+    assert response.graph_json is not None
+    response.graph_json.nodes, response.graph_json.edges = nodes, edges
+    assert response.graph_json == decode_graph(graph_json)
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pytest
+
+from connectedpapers import ConnectedPapersClient
+from connectedpapers.connected_papers_client import GraphResponseStatuses
+from connectedpapers.loop_thread import LoopThread
+from tests.mock_server import MockConnectedPapersServer
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+def test_loop_thread_runs_coroutines() -> None:
+    loop_thread = LoopThread()
+    assert not loop_thread.running
+
+    async def thread_name() -> str:
+        return threading.current_thread().name
+
+    assert loop_thread.run(thread_name()) == loop_thread.name
+    loop = loop_thread.loop
+    assert loop_thread.run(thread_name()) == loop_thread.name
+    assert loop_thread.loop is loop
+    loop_thread.stop()
+    assert not loop_thread.running and loop.is_closed()
+    assert loop_thread.run(thread_name()) == loop_thread.name  # Restarted
+    loop_thread.stop()
+
+
+def test_loop_thread_stop_fails_waiting_calls() -> None:
+    loop_thread = LoopThread()
+    started = threading.Event()
+    errors: List[BaseException] = []
+
+    async def forever() -> None:
+        started.set()
+        await asyncio.sleep(3600)
+
+    def wait() -> None:
+        try:
+            loop_thread.run(forever())
+        except BaseException as e:
+            errors.append(e)
+
+    waiters = [threading.Thread(target=wait) for _ in range(3)]
+    for waiter in waiters:
+        waiter.start()
+    assert started.wait(5)
+    loop_thread.stop()
+    for waiter in waiters:
+        waiter.join(5)
+        assert not waiter.is_alive()
+    assert len(errors) == 3
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert not loop_thread.running
+
+
+def test_loop_thread_refuses_calls_from_its_loop() -> None:
+    loop_thread = LoopThread()
+
+    async def nested() -> None:
+        async def inner() -> None:
+            pass
+
+        loop_thread.run(inner())
+
+    with pytest.raises(RuntimeError):
+        loop_thread.run(nested())
+    loop_thread.stop()
+
+
+def test_sync_calls_from_many_threads(mock_server: MockConnectedPapersServer) -> None:
+    with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        paper_ids = [f"{i:040x}" for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(client.get_graph_sync, paper_ids))
+            usages: List[int] = list(
+                executor.map(lambda _: client.get_remaining_usages_sync(), range(8))
+            )
+        assert all(
+            response.status == GraphResponseStatuses.FRESH_GRAPH
+            for response in responses
+        )
+        assert usages == [100] * 8
+        # All calls ran on the one background loop, and shared its session
+        assert len(client._sessions) == 1
+    assert not client._loop_thread.running
+    assert len(client._sessions) == 0
+
+
+def test_sync_call_inside_running_loop(mock_server: MockConnectedPapersServer) -> None:
+    client = ConnectedPapersClient(server_addr=mock_server.url)
+
+    async def caller() -> int:
+        return client.get_remaining_usages_sync()
+
+    assert asyncio.run(caller()) == 100
+    client.close()
+    client.close()
+
+
+def test_sync_call_after_close(mock_server: MockConnectedPapersServer) -> None:
+    client = ConnectedPapersClient(server_addr=mock_server.url)
+    assert client.get_remaining_usages_sync() == 100
+    client.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        client.get_remaining_usages_sync()
+    # The background loop isn't started again
+    assert not client._loop_thread.running
+
+
+def test_private_loop_with_nest_asyncio(mock_server: MockConnectedPapersServer) -> None:
+    client = ConnectedPapersClient(server_addr=mock_server.url, nested_asyncio=True)
+    assert client.get_remaining_usages_sync() == 100
+    assert not client._loop_thread.running
@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+import pytest
+
+from connectedpapers import ConnectedPapersClient, connected_papers_client
+from connectedpapers.connected_papers_client import GraphResponseStatuses
+from connectedpapers.decoding import decode_graph
+from connectedpapers.polling import FixedPolling
+from tests.mock_server import (
+    MockConnectedPapersServer,
+    MockServerThread,
+    make_graph_json,
+)
+
+PAPER_ID = "9397e7acd062245d37350f5c05faf56e9cfae0d6"
+
+
+@pytest.mark.asyncio
+async def test_timeout_stops_polling(mock_server: MockConnectedPapersServer) -> None:
+    mock_server.scripts[PAPER_ID] = [{"status": "QUEUED"}]
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, polling=FixedPolling(0.05)
+    ) as client:
+        start = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            await client.get_graph_async(PAPER_ID, timeout=0.3)
+        assert time.perf_counter() - start < 1.0
+        assert client._graph_flights.in_flight() == 0
+        polls = len(mock_server.graph_requests)
+        assert polls > 1
+        await asyncio.sleep(0.2)
+        assert len(mock_server.graph_requests) == polls
+
+
+@pytest.mark.asyncio
+async def test_timeout_bounds_overload_backoff(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    mock_server.scripts[PAPER_ID] = [{"status": "OVERLOADED"}]
+    async with ConnectedPapersClient(server_addr=mock_server.url) as client:
+        start = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            await client.get_graph_async(PAPER_ID, timeout=0.2)
+        assert time.perf_counter() - start < 1.0
+
+
+@pytest.mark.asyncio
+async def test_coalesced_calls_keep_their_own_deadlines(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    mock_server.scripts[PAPER_ID] = [{"status": "QUEUED"}]
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, polling=FixedPolling(0.05)
+    ) as client:
+        patient = asyncio.ensure_future(client.get_graph_async(PAPER_ID, timeout=0.6))
+        with pytest.raises(asyncio.TimeoutError):
+            await client.get_graph_async(PAPER_ID, timeout=0.1)
+        assert client._graph_flights.in_flight() == 1
+        with pytest.raises(asyncio.TimeoutError):
+            await patient
+        assert client._graph_flights.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_read_timeout_is_retried(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(connected_papers_client, "SLEEP_TIME_AFTER_ERROR", 0)
+    with MockServerThread(MockConnectedPapersServer(latency=1.0)) as server:
+        async with ConnectedPapersClient(
+            server_addr=server.url, read_timeout=0.1
+        ) as client:
+            with pytest.raises(asyncio.TimeoutError):
+                await client.get_graph_async(PAPER_ID)
+            assert client.metrics.counter("graph.retries") == 2
+        assert len(server.graph_requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_closed_client_stops_without_retrying(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    mock_server.scripts[PAPER_ID] = [{"status": "QUEUED"}]
+    client = ConnectedPapersClient(
+        server_addr=mock_server.url, polling=FixedPolling(0.1)
+    )
+    task = asyncio.ensure_future(client.get_graph_async(PAPER_ID))
+    await asyncio.sleep(0.05)
+    await client.aclose()
+    start = time.perf_counter()
+    with pytest.raises(RuntimeError, match="closed"):
+        await task
+    assert time.perf_counter() - start < 1.0
+    assert client.metrics.counter("graph.retries") == 0
+
+
+def test_sync_timeout(mock_server: MockConnectedPapersServer) -> None:
+    mock_server.scripts[PAPER_ID] = [{"status": "QUEUED"}]
+    with ConnectedPapersClient(
+        server_addr=mock_server.url, polling=FixedPolling(0.05)
+    ) as client:
+        with pytest.raises(asyncio.TimeoutError):
+            client.get_graph_sync(PAPER_ID, timeout=0.2)
+        # The client is still usable after a timeout
+        response = client.get_graph_sync("other", fresh_only=False, timeout=5.0)
+        assert response.status == GraphResponseStatuses.OLD_GRAPH
+
+
+@pytest.mark.asyncio
+async def test_batch_timeout_yields_last_status(
+    mock_server: MockConnectedPapersServer,
+) -> None:
+    mock_server.scripts[PAPER_ID] = [{"status": "QUEUED"}]
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, polling=FixedPolling(0.05)
+    ) as client:
+        results = await client.get_graphs_async(
+            [PAPER_ID, "other"], fresh_only=False, timeout=0.2
+        )
+    assert results[PAPER_ID].status == GraphResponseStatuses.QUEUED
+    assert results["other"].status == GraphResponseStatuses.OLD_GRAPH
+
+
+@pytest.mark.asyncio
+async def test_refresh_timeout(mock_server: MockConnectedPapersServer) -> None:
+    graph = decode_graph(make_graph_json(PAPER_ID))
+    mock_server.scripts[PAPER_ID] = [{"status": "QUEUED"}]
+    async with ConnectedPapersClient(
+        server_addr=mock_server.url, polling=FixedPolling(0.05)
+    ) as client:
+        with pytest.raises(asyncio.TimeoutError):
+            await client.refresh_graph_async(PAPER_ID, graph, timeout=0.2)